@@ -2,13 +2,14 @@ import streamlit as st
 import json
 import os
 from datetime import datetime
+from query_rewriter import strip_runtime_keys
 
 def export_chat_history():
     """Export chat history to JSON"""
     if 'messages' in st.session_state and st.session_state.messages:
         chat_data = {
             'export_date': datetime.now().isoformat(),
-            'messages': st.session_state.messages,
+            'messages': strip_runtime_keys(st.session_state.messages),
             'total_messages': len(st.session_state.messages)
         }
         return json.dumps(chat_data, indent=2)
@@ -78,9 +79,226 @@ def admin_panel():
         st.metric("Knowledge Base Items", len(st.session_state.chatbot.knowledge_base) if 'chatbot' in st.session_state else 0)
     
     with info_col2:
-        st.metric("LLM Endpoint Status", "🟢 Connected" if True else "🔴 Disconnected")
+        if 'chatbot' in st.session_state:
+            endpoints = st.session_state.chatbot.llm_pool.snapshot()
+            states = [endpoint['breaker']['state'] for endpoint in endpoints]
+            healthy = states.count("closed")
+            if healthy == len(states):
+                status = "🟢 Connected"
+            elif healthy:
+                status = f"🟡 Degraded ({healthy}/{len(states)} up)"
+            elif "half_open" in states:
+                status = "🟡 Probing"
+            else:
+                status = "🔴 Disconnected"
+            st.metric("LLM Endpoint Status", status,
+                      help=f"Consecutive failures: {sum(e['breaker']['consecutive_failures'] for e in endpoints)} • "
+                           f"Times opened: {sum(e['breaker']['trips'] for e in endpoints)} • "
+                           f"Answered from knowledge base: {sum(e['breaker']['short_circuited'] for e in endpoints)}")
+            if not healthy:
+                retry_in = min(e['breaker']['retry_in_s'] for e in endpoints)
+                st.caption(f"Using knowledge base fallback; next probe in {retry_in:.0f}s")
+        else:
+            st.metric("LLM Endpoint Status", "⚪ Not initialised")
         st.metric("Embedding Model", "all-MiniLM-L6-v2")
     
+    # LLM latency, with connection setup reported separately from generation
+    if 'chatbot' in st.session_state:
+        st.subheader("⏱️ LLM Latency")
+        endpoints = st.session_state.chatbot.llm_pool.snapshot()
+        for endpoint in endpoints:
+            if len(endpoints) > 1:
+                st.caption(f"**{endpoint['endpoint']}** • {endpoint['outstanding']} in flight • "
+                           f"p95 {endpoint['p95_total_ms']:.0f} ms • circuit {endpoint['breaker']['state']}")
+            lat_col1, lat_col2, lat_col3, lat_col4, lat_col5 = st.columns(5)
+            with lat_col1:
+                st.metric("LLM Requests", endpoint['requests'])
+            with lat_col2:
+                st.metric("Avg Connection Setup", f"{endpoint['avg_connect_ms']:.0f} ms")
+            with lat_col3:
+                st.metric("Avg Generation", f"{endpoint['avg_generation_ms']:.0f} ms")
+            with lat_col4:
+                st.metric("Avg Time to First Token", f"{endpoint['avg_first_token_ms']:.0f} ms")
+            with lat_col5:
+                st.metric("Connection Reuse", f"{endpoint['connection_reuse_pct']:.0f}%")
+        hedging = st.session_state.chatbot.llm_pool.hedge_stats()
+        if hedging['enabled']:
+            st.caption(f"Hedged requests: {hedging['sent']} sent • {hedging['won']} answered first by the backup")
+    
+    # Prompt token usage
+    if 'chatbot' in st.session_state:
+        st.subheader("🧮 Prompt Tokens")
+        prompt_usage = st.session_state.chatbot.prompt_builder.summary()
+        p_col1, p_col2, p_col3 = st.columns(3)
+        with p_col1:
+            st.metric("Avg Prompt Tokens", f"{prompt_usage['avg_prompt_tokens']:.0f}",
+                      help=f"Budget: {prompt_usage['budget']} tokens")
+        with p_col2:
+            st.metric("Max Prompt Tokens", prompt_usage['max_prompt_tokens'])
+        with p_col3:
+            st.metric("Tokenization Cache Hits", f"{prompt_usage['tokenization_cache_hit_pct']:.0f}%")
+        if not prompt_usage['exact_tokenizer']:
+            st.caption("Model tokenizer not available locally - token counts are estimates")
+    
+    # Usage accounting and OpenAI rate limiting
+    if 'chatbot' in st.session_state:
+        st.subheader("💳 LLM Usage")
+        chatbot = st.session_state.chatbot
+        session_usage = chatbot.usage.session_usage(chatbot.usage_session_id)
+        daily_usage = chatbot.usage.daily_usage(7)
+        today = daily_usage[0] if daily_usage and daily_usage[0]['day'] == datetime.now().date().isoformat() else None
+        u_col1, u_col2, u_col3, u_col4 = st.columns(4)
+        with u_col1:
+            st.metric("This Session", f"{session_usage['requests']} requests")
+        with u_col2:
+            st.metric("Session Tokens", session_usage['prompt_tokens'] + session_usage['completion_tokens'],
+                      help=f"Prompt {session_usage['prompt_tokens']} • Completion {session_usage['completion_tokens']}")
+        with u_col3:
+            st.metric("Today", f"{today['requests'] if today else 0} requests")
+        with u_col4:
+            st.metric("Today's Tokens", today['prompt_tokens'] + today['completion_tokens'] if today else 0,
+                      help=f"Rate-limited responses today: {today['rate_limited'] if today else 0}")
+        
+        if chatbot.rate_limiter is not None:
+            quota = chatbot.rate_limiter.snapshot()
+            st.caption(f"Quota available: {quota['requests_available']}/{quota['requests_per_minute']} requests • "
+                       f"{quota['tokens_available']}/{quota['tokens_per_minute']} tokens per minute • "
+                       f"{quota['throttled']} queued briefly • {quota['rate_limited']} rate-limited by OpenAI")
+            if quota['paused_for_s'] > 0:
+                st.caption(f"Paused after a 429 for another {quota['paused_for_s']:.0f}s")
+        
+        if daily_usage:
+            st.write("**Daily usage:**")
+            st.table([{
+                'Day': day['day'],
+                'Requests': day['requests'],
+                'Prompt Tokens': day['prompt_tokens'],
+                'Completion Tokens': day['completion_tokens'],
+                'Rate Limited': day['rate_limited']
+            } for day in daily_usage])
+    
+    # LLM request scheduler
+    if 'chatbot' in st.session_state:
+        st.subheader("🚦 LLM Request Queue")
+        queue = st.session_state.chatbot.llm_scheduler.snapshot()
+        q_col1, q_col2, q_col3, q_col4 = st.columns(4)
+        with q_col1:
+            st.metric("In Flight", f"{queue['in_flight']}/{queue['max_concurrency']}")
+        with q_col2:
+            st.metric("Queued", queue['queued'], help=f"Rejected or timed out: {queue['rejected']}")
+        with q_col3:
+            st.metric("Avg Queue Wait", f"{queue['avg_queue_wait_ms']:.0f} ms")
+        with q_col4:
+            st.metric("P95 Queue Wait", f"{queue['p95_queue_wait_ms']:.0f} ms")
+        st.caption(f"Served: {queue['emergency_granted']} emergency • {queue['routine_granted']} routine")
+    
+    # Request coalescing across sessions
+    if 'chatbot' in st.session_state:
+        st.subheader("🔁 Coalesced Requests")
+        flight_stats = st.session_state.chatbot.singleflight.stats()
+        if flight_stats:
+            flight_cols = st.columns(len(flight_stats))
+            for col, (kind, counts) in zip(flight_cols, flight_stats.items()):
+                with col:
+                    st.metric(f"{kind.title()} Calls Saved", counts['saved'],
+                              help=f"{counts['executed']} {kind} calls executed")
+        else:
+            st.caption("No requests yet")
+    
+    # Fast-path answers
+    if 'chatbot' in st.session_state:
+        st.subheader("⚡ Fast-Path Answers")
+        fast_stats = st.session_state.chatbot.fast_paths.stats()
+        st.caption(f"Rules version {fast_stats['version']} • "
+                   f"{fast_stats['misses']['fast_path']} questions went on to search and the LLM")
+        st.table([{'Rule': rule['id'], 'Stage': rule['stage'], 'Hits': rule['hits']}
+                  for rule in fast_stats['rules']])
+        drug_stats = st.session_state.chatbot.drug_index.stats()
+        st.caption(f"💊 Drug-name index: {drug_stats['names']} names • "
+                   f"{drug_stats['corrections']} questions had drug names corrected • "
+                   f"{drug_stats['ambiguous']} ambiguous names left as typed")
+    
+    # Query normalisation: how often questions repeat verbatim versus once normalised
+    if 'chatbot' in st.session_state:
+        st.subheader("🔤 Query Normalisation")
+        norm_stats = st.session_state.chatbot.query_normalizer.stats()
+        n_col1, n_col2, n_col3 = st.columns(3)
+        with n_col1:
+            st.metric("Questions Normalised", norm_stats['queries'],
+                      help=f"{norm_stats['rewritten']} were rewritten (spelling, units, abbreviations or filler)")
+        with n_col2:
+            st.metric("Repeat Rate (raw text)", f"{norm_stats['raw_repeat_pct']:.0f}%",
+                      help="Questions matching a recent one by case and whitespace only, as caches were keyed before")
+        with n_col3:
+            st.metric("Repeat Rate (normalised)", f"{norm_stats['normalised_repeat_pct']:.0f}%",
+                      delta=f"{norm_stats['normalised_repeat_pct'] - norm_stats['raw_repeat_pct']:+.0f} pts",
+                      help="Questions matching a recent one after normalisation, as caches are keyed now")
+    
+    # Off-topic guard decisions, for tuning the threshold
+    if 'chatbot' in st.session_state and st.session_state.chatbot.topic_guard is not None:
+        st.subheader("🧭 Off-Topic Guard")
+        guard = st.session_state.chatbot.topic_guard
+        guard_stats = guard.stats()
+        g_col1, g_col2, g_col3 = st.columns(3)
+        with g_col1:
+            st.metric("Questions Checked", guard_stats['checked'])
+        with g_col2:
+            st.metric("Refused", guard_stats['refused'], help=f"{guard_stats['refusal_rate_pct']:.0f}% of checked questions")
+        with g_col3:
+            st.metric("Threshold", f"{guard_stats['threshold']:.2f}",
+                      help=f"Cosine similarity to the nearest of {guard_stats['centroids']} topic centroids")
+        decisions = guard.recent_decisions(20)
+        if decisions:
+            st.write("**Recent decisions:**")
+            st.table([{
+                'Question': decision['query'],
+                'Score': f"{decision['score']:.3f}",
+                'Nearest Topic': decision['topic'],
+                'Decision': 'Allowed' if decision['on_topic'] else 'Refused'
+            } for decision in decisions])
+    
+    # Semantic response cache
+    if 'chatbot' in st.session_state and st.session_state.chatbot.response_cache is not None:
+        st.subheader("🗃️ Response Cache")
+        response_cache = st.session_state.chatbot.response_cache
+        cache_stats = response_cache.stats()
+        c_col1, c_col2, c_col3 = st.columns(3)
+        with c_col1:
+            st.metric("Cached Answers", cache_stats['entries'])
+        with c_col2:
+            st.metric("Cache Hit Rate", f"{cache_stats['hit_rate_pct']:.0f}%",
+                      help=f"{cache_stats['hits']} hits from {cache_stats['lookups']} lookups")
+        with c_col3:
+            st.metric("Similarity Threshold", f"{cache_stats['threshold']:.2f}")
+        
+        top_entries = response_cache.top_entries(10)
+        if top_entries:
+            st.write("**Most reused answers:**")
+            st.table([{
+                'Question': entry['query'],
+                'Hits': entry['hit_count'],
+                'Cached': datetime.fromtimestamp(entry['created_at']).strftime('%Y-%m-%d %H:%M')
+            } for entry in top_entries])
+        
+        if st.button("🧹 Clear Response Cache"):
+            response_cache.clear()
+            st.success("Response cache cleared")
+    
+    # Answers prepared ahead of time for the suggested follow-up questions
+    if 'chatbot' in st.session_state and st.session_state.chatbot.prefetcher is not None:
+        st.subheader("🔮 Prefetch")
+        prefetch_stats = st.session_state.chatbot.prefetcher.stats()
+        p_col1, p_col2, p_col3 = st.columns(3)
+        with p_col1:
+            st.metric("Prefetched", f"{prefetch_stats['completed']}/{prefetch_stats['scheduled']}",
+                      help=f"{prefetch_stats['skipped']} suggestions skipped by the budget")
+        with p_col2:
+            st.metric("Prefetch Hit Rate", f"{prefetch_stats['hit_rate_pct']:.0f}%",
+                      help=f"{prefetch_stats['hits']} suggestions clicked, saving {prefetch_stats['saved_seconds']:.1f}s")
+        with p_col3:
+            st.metric("Wasted", prefetch_stats['wasted'],
+                      help=f"{prefetch_stats['wasted_seconds']:.1f}s spent on suggestions nobody clicked")
+    
     # Knowledge Base Management
     st.subheader("📚 Knowledge Base Management")
     
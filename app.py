@@ -9,37 +9,200 @@ import pickle
 import os
 from datetime import datetime
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import yaml
 import pandas as pd
 import re
 import uuid
+import hashlib
+import itertools
+import concurrent.futures
+import functools
+import threading
+from llm_pool import get_shared_pool
+from llm_scheduler import LLMScheduler, SchedulerFull, get_shared_scheduler
+from singleflight import get_shared_group
+from response_cache import context_key, get_shared_cache
+from prompt_builder import PromptBuilder, get_token_counter, TOKENS_PER_MESSAGE
+from fast_path import get_shared_engine
+from drug_index import correction_note, get_shared_drug_index
+from query_normalizer import get_shared_normalizer, normalize_query, query_key
+from prefetch import Prefetcher
+import topic_guard
+import conversation_state
+import query_rewriter
+import calculators
+import vital_signs
+import toxicology
+import resus_sheet
+from pews import get_shared_pews
+from rate_limiter import backoff_delay, get_shared_limiter, get_shared_usage, parse_retry_after
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Finishes LLM answers that overran their deadline, shared by all sessions
+_background_answers: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_background_answers_lock = threading.Lock()
+
+# Folds each finished turn into its conversation's rolling summary, off the answer path
+_conversation_updates = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="conversation-state")
+
+PROVISIONAL_NOTICE = "⏳ *Provisional answer from the knowledge base - the full answer will replace it shortly.*"
+
+def load_config(path: str = "config.yaml") -> Dict[str, Any]:
+    """Load application configuration, returning an empty config if the file is missing"""
+    try:
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return yaml.safe_load(f) or {}
+    except Exception as e:
+        logger.error(f"Error loading config {path}: {e}")
+    return {}
+
+def load_secrets() -> Dict[str, Any]:
+    """Read Streamlit secrets, returning an empty dict when no secrets.toml is configured"""
+    try:
+        return dict(st.secrets)
+    except (FileNotFoundError, KeyError):
+        return {}
+
+def get_background_answers(workers: int = 34) -> concurrent.futures.ThreadPoolExecutor:
+    """Return the process-wide pool finishing LLM answers past their deadline
+    
+    Sized to the LLM scheduler's concurrency plus queue, so waiting answers queue in the
+    scheduler by priority rather than behind each other here.
+    """
+    global _background_answers
+    with _background_answers_lock:
+        if _background_answers is None:
+            _background_answers = concurrent.futures.ThreadPoolExecutor(max_workers=workers,
+                                                                        thread_name_prefix="background-answer")
+        return _background_answers
+
 class NursingChatbot:
+    # Queries mentioning these are treated as emergencies (KKH Baby Bear Book Section 01 context, LLM priority lane)
+    EMERGENCY_KEYWORDS = ['emergency', 'cardiac arrest', 'anaphylaxis', 'shock', 'seizure', 
+                          'respiratory failure', 'code blue', 'cpr', 'resuscitation', 'critical',
+                          'poisoning', 'overdose', 'paracetamol', 'abcde', 'unconscious']
+    
     def __init__(self):
+        self.config = load_config()
+        llm_config = self.config.get('llm', {})
+        
         # Use cloud-based LLM service for Streamlit Cloud deployment
         # Check if we're running on Streamlit Cloud
-        if hasattr(st, 'secrets') and 'OPENAI_API_KEY' in st.secrets:
+        secrets = load_secrets()
+        if 'OPENAI_API_KEY' in secrets:
             self.llm_endpoint = "https://api.openai.com/v1/chat/completions"
-            self.api_key = st.secrets["OPENAI_API_KEY"]
+            self.api_key = secrets["OPENAI_API_KEY"]
             self.model_name = "gpt-3.5-turbo"
             self.use_openai = True
         else:
-            # Fallback to local LLM for development
-            self.llm_endpoint = "http://10.175.5.70:1234/v1/chat/completions"
+            # Local LM Studio boxes on the ward network; requests are spread across all of them
+            self.llm_endpoint = llm_config.get('endpoint', "http://10.175.5.70:1234/v1/chat/completions")
             self.api_key = None
             self.model_name = "phi-2"
             self.use_openai = False
+        
+        # Stream tokens into the chat UI instead of waiting for the full completion
+        self.stream_responses = llm_config.get('stream', True)
+        
+        # Shared pool of keep-alive clients so connections are reused across questions and sessions
+        self.llm_endpoints = [self.llm_endpoint] if self.use_openai else (llm_config.get('endpoints') or [self.llm_endpoint])
+        
+        # LLM_ENDPOINT overrides the local endpoints, e.g. to point at mock_llm_server.py offline
+        if not self.use_openai and os.environ.get('LLM_ENDPOINT'):
+            self.llm_endpoint = os.environ['LLM_ENDPOINT']
+            self.llm_endpoints = [self.llm_endpoint]
+        self.llm_pool = get_shared_pool(
+            self.llm_endpoints,
+            api_key=self.api_key,
+            preferred_model=self.model_name,
+            discover_models=not self.use_openai,
+            hedge=llm_config.get('hedge_requests', False),
+            hedge_min_samples=llm_config.get('hedge_min_samples', 20),
+            connect_timeout=llm_config.get('connect_timeout', 3.05),
+            read_timeout=llm_config.get('read_timeout', llm_config.get('timeout', 30)),
+            pool_maxsize=llm_config.get('pool_maxsize', 10),
+            model_ttl=llm_config.get('model_cache_ttl', 600),
+            model_retry_ttl=llm_config.get('model_retry_ttl', 10),
+            failure_threshold=llm_config.get('breaker_failure_threshold', 3),
+            reset_timeout=llm_config.get('breaker_reset_timeout', 30)
+        )
+        
+        # Shared scheduler bounding concurrent LLM requests, with emergencies served first
+        self.llm_scheduler = get_shared_scheduler(
+            max_concurrency=llm_config.get('max_concurrency', 2),
+            max_queue=llm_config.get('max_queue', 32)
+        )
+        self.queue_timeout = llm_config.get('queue_timeout', 20)
+        self.background_answers = get_background_answers(
+            llm_config.get('max_concurrency', 2) + llm_config.get('max_queue', 32))
+        
+        # OpenAI quota is per API key, so the limiter is shared by every session; usage is tracked in all modes
+        self.rate_limiter = get_shared_limiter(
+            requests_per_minute=llm_config.get('openai_requests_per_minute', 60),
+            tokens_per_minute=llm_config.get('openai_tokens_per_minute', 40000)
+        ) if self.use_openai else None
+        self.rate_limit_max_wait = llm_config.get('rate_limit_max_wait', 10)
+        self.max_retries = llm_config.get('max_retries', 2)
+        self.usage = get_shared_usage()
+        self.usage_session_id = uuid.uuid4().hex[:8]
+        
+        # Seconds the nurse waits before getting the provisional knowledge base answer (0 = wait for the LLM)
+        self.answer_deadline = llm_config.get('answer_deadline', 4)
+        
+        # Identical in-flight searches and LLM calls (from any session) share one computation
+        self.singleflight = get_shared_group()
+        
+        # Prompts are fitted to a token budget for the target model; the local model gets a smaller one
+        self.prompt_builder = PromptBuilder(
+            get_token_counter(self.model_name),
+            max_prompt_tokens=llm_config.get('prompt_budget_tokens', 1024 if self.use_openai else 512),
+            question_tokens=llm_config.get('question_budget_tokens', 128),
+            history_tokens=llm_config.get('history_budget_tokens', 192 if self.use_openai else 96)
+        )
+            
+        # One canonical form of each question for the fast paths and cache keys
+        self.query_normalizer = get_shared_normalizer()
+            
+        # Canned answers for common questions, maintained by clinical leads in a data file
+        self.fast_paths = get_shared_engine(self.config.get('fast_paths', {}).get('path', 'fast_paths.yaml'))
             
         self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
         self.knowledge_base = {}
         self.index = None
         self.load_knowledge_base()
         
+        # Typo-tolerant drug names from drug_names.yaml and the knowledge base
+        self.drug_index_path = self.config.get('drug_index', {}).get('path', 'drug_names.yaml')
+        self.drug_index = get_shared_drug_index(self.knowledge_base_texts(), self.kb_content_hash(), self.drug_index_path)
+        
+        # Off-topic questions are refused from topic centroids before retrieval or the LLM
+        self.topic_guard = None
+        self.load_topic_guard()
+        
+        # Semantic cache of LLM answers, shared by all sessions and tied to the knowledge base version
+        cache_config = self.config.get('cache', {})
+        self.response_cache = None
+        if cache_config.get('enabled', True):
+            self.response_cache = get_shared_cache(
+                db_path=cache_config.get('path', 'response_cache.sqlite3'),
+                threshold=cache_config.get('similarity_threshold', 0.92),
+                max_entries=cache_config.get('max_entries', 2000)
+            )
+            self.response_cache.set_kb_version(self.kb_content_hash())
+        
+        # Answers to the suggested follow-up questions are prepared while the nurse reads
+        prefetch_config = self.config.get('prefetch', {})
+        self.prefetcher = None
+        if prefetch_config.get('enabled', True):
+            self.prefetcher = Prefetcher(max_questions=prefetch_config.get('max_questions', 3),
+                                         time_budget=prefetch_config.get('time_budget', 30))
+        self.prefetch_llm = prefetch_config.get('llm_answers', False)
+        
     def load_knowledge_base(self):
         """Load nursing knowledge base and create vector index"""
         try:
@@ -284,17 +447,25 @@ class NursingChatbot:
             pickle.dump(self.knowledge_base, f)
         logger.info("Knowledge base initialized and saved")
     
+    def knowledge_base_entries(self) -> List[Tuple[str, str]]:
+        """(category, text) of every knowledge base entry, in index order"""
+        entries = []
+        for section, category in self.knowledge_base.items():
+            for item in category.values():
+                if not isinstance(item, dict):
+                    continue
+                text = item.get('content') or item.get('formula') or item.get('formulas')
+                if text:
+                    entries.append((item.get('category', section), text))
+        return entries
+    
+    def knowledge_base_texts(self) -> List[str]:
+        """Text of every knowledge base entry, in index order"""
+        return [text for _, text in self.knowledge_base_entries()]
+    
     def create_vector_index(self):
         """Create FAISS vector index for knowledge base"""
-        documents = []
-        for category in self.knowledge_base.values():
-            for item in category.values():
-                if isinstance(item, dict) and 'content' in item:
-                    documents.append(item['content'])
-                elif isinstance(item, dict) and 'formula' in item:
-                    documents.append(item['formula'])
-                elif isinstance(item, dict) and 'formulas' in item:
-                    documents.append(item['formulas'])
+        documents = self.knowledge_base_texts()
         
         if documents:
             embeddings = self.embedding_model.encode(documents)
@@ -318,9 +489,64 @@ class NursingChatbot:
         # Reload everything
         self.initialize_knowledge_base()
         self.create_vector_index()
+        self.drug_index = get_shared_drug_index(self.knowledge_base_texts(), self.kb_content_hash(), self.drug_index_path)
+        self.load_topic_guard()
+        if self.response_cache is not None:
+            self.response_cache.set_kb_version(self.kb_content_hash())
         logger.info("Knowledge base forcefully reloaded")
     
-    def search_knowledge_base(self, query: str, top_k: int = 5) -> List[str]:
+    def load_topic_guard(self):
+        """Topic centroids for the current knowledge base, built once and saved alongside the index"""
+        guard_config = self.config.get('topic_guard', {})
+        if not guard_config.get('enabled', True):
+            return
+        try:
+            self.topic_guard = topic_guard.get_shared_topic_guard(
+                self.knowledge_base_entries, self.embedding_model.encode, self.kb_content_hash(),
+                path=guard_config.get('path', 'topic_centroids.npz'),
+                threshold=guard_config.get('threshold', 0.2)
+            )
+        except Exception as e:
+            logger.error(f"Topic guard unavailable, all questions will be answered: {e}")
+            self.topic_guard = None
+    
+    def is_off_topic(self, user_input: str, query_embedding: np.ndarray, chat_history: List[Dict] = None) -> bool:
+        """True if the question is clearly unrelated to the knowledge base
+        
+        Emergencies and short follow-ups within a conversation ("and for a toddler?") are
+        never refused, since their wording alone says little about the topic.
+        """
+        if self.topic_guard is None or self.is_emergency_query(user_input):
+            return False
+        if chat_history and len(user_input.split()) < 6:
+            return False
+        return not self.topic_guard.check(query_embedding, user_input)['on_topic']
+    
+    def kb_content_hash(self) -> str:
+        """Hash of the knowledge base content, used to invalidate cached answers when it changes"""
+        serialized = json.dumps(self.knowledge_base, sort_keys=True, default=str)
+        return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+    
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed a single query with the knowledge base embedding model"""
+        return self.embedding_model.encode([text])[0]
+    
+    def normalise_query_key(self, text: str) -> str:
+        """Key used to recognise identical questions, insensitive to spelling variants, units and filler"""
+        return query_key(text)
+    
+    def search_knowledge_base(self, query: str, top_k: int = 5, embedding: Optional[np.ndarray] = None) -> List[str]:
+        """Search knowledge base, sharing the embedding and search with identical concurrent queries
+        
+        An embedding already computed for the query (or blended with the conversation topic)
+        is searched with directly instead of encoding the query again.
+        """
+        key = ("retrieval", self.normalise_query_key(query), top_k)
+        if embedding is not None:
+            key += (hashlib.sha1(np.asarray(embedding, dtype=np.float32).tobytes()).hexdigest(),)
+        return list(self.singleflight.do(key, self._search_knowledge_base, query, top_k, embedding))
+    
+    def _search_knowledge_base(self, query: str, top_k: int = 5, embedding: Optional[np.ndarray] = None) -> List[str]:
         """Search knowledge base using semantic similarity with improved ranking"""
         if not self.index:
             return []
@@ -332,7 +558,10 @@ class NursingChatbot:
         # Increase search scope to get more diverse results
         search_k = min(top_k * 2, 10)  # Search more documents initially
         
-        query_embedding = self.embedding_model.encode([query])
+        if embedding is None:
+            query_embedding = self.embedding_model.encode([query])
+        else:
+            query_embedding = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
         scores, indices = self.index.search(query_embedding.astype('float32'), search_k)
         
         results = []
@@ -398,25 +627,7 @@ class NursingChatbot:
     
     def calculate_fluid_requirements(self, weight_kg: float) -> Dict[str, float]:
         """Calculate pediatric fluid requirements using Holliday-Segar method"""
-        daily_ml = 0
-        hourly_ml = 0
-        
-        if weight_kg <= 10:
-            daily_ml = weight_kg * 100
-            hourly_ml = weight_kg * 4
-        elif weight_kg <= 20:
-            daily_ml = 1000 + (weight_kg - 10) * 50
-            hourly_ml = 40 + (weight_kg - 10) * 2
-        else:
-            daily_ml = 1500 + (weight_kg - 20) * 20
-            hourly_ml = 60 + (weight_kg - 20) * 1
-        
-        return {
-            "weight_kg": weight_kg,
-            "daily_ml": daily_ml,
-            "hourly_ml": hourly_ml,
-            "daily_liters": daily_ml / 1000
-        }
+        return calculators.fluid_requirements(weight_kg)
     
     def clean_content(self, text: str) -> str:
         """Extract only direct facts from knowledge base content"""
@@ -506,16 +717,8 @@ class NursingChatbot:
         
         return result[:300] if len(result) > 300 else result  # Increased limit for detailed bullet format
     
-    def clean_response(self, response: str) -> str:
-        """Clean response to ensure only bullet points are returned"""
-        import re
-        
-        if not response:
-            return "• Not available"
-        
-        # First, clean the raw response
-        response = response.strip()
-        
+    def scrub_response(self, response: str) -> str:
+        """Remove quiz, exercise and code content and correct known-wrong vital sign ranges"""
         # Remove quiz-style multiple choice content
         response = re.sub(r'[A-D]\)\s*[^•\n]*(?:•|$)', '', response, flags=re.IGNORECASE)  # Remove A) B) C) D) options
         response = re.sub(r'•\s*[A-D]\)\s*[^•\n]*', '', response, flags=re.IGNORECASE)  # Remove • A) B) C) D) options
@@ -540,7 +743,10 @@ class NursingChatbot:
         response = re.sub(r'100-160 bpm', '120-180 bpm', response, flags=re.IGNORECASE)
         response = re.sub(r'100 and 160 beats', '120-180 beats', response, flags=re.IGNORECASE)
         
-        # Remove unwanted prefixes and formatting
+        return response
+    
+    def strip_response_prefix(self, response: str) -> str:
+        """Remove introductory phrases such as "Here are" from the start of a response"""
         prefixes_to_remove = [
             "Here are", "The key points are", "Based on", "According to",
             "In summary", "To summarize", "The main", "Key points:",
@@ -549,49 +755,66 @@ class NursingChatbot:
         
         for prefix in prefixes_to_remove:
             if response.lower().startswith(prefix.lower()):
-                response = response[len(prefix):].strip()
-                break
+                return response[len(prefix):].strip()
+        return response
+    
+    def format_bullet_line(self, line: str) -> str:
+        """Convert one response line to a "• " bullet, or return "" if the line should be dropped"""
+        line = line.strip()
+        
+        # Skip empty lines
+        if not line:
+            return ""
+        
+        # Skip quiz-style options
+        if re.match(r'^[A-D]\)', line, re.IGNORECASE):
+            return ""
+        if any(quiz_text in line.lower() for quiz_text in ['all of the above', 'none of the above']):
+            return ""
+        
+        # Skip exercise content
+        if any(exercise_text in line.lower() for exercise_text in [
+            'exercise', '# exercise', '## exercise', '* exercise', '** exercise',
+            'write a python', 'python script', 'with statement', 'open and read',
+            'file.txt', '# solution', 'import', 'programming', 'coding', 'script'
+        ]):
+            return ""
+        
+        # Convert numbered lists to bullet points
+        if line.startswith(('1.', '2.', '3.', '4.', '5.')):
+            line = '• ' + line[2:].strip()
+        
+        # Convert existing bullet formats to consistent format
+        elif line.startswith(('-', '*', '•')):
+            if not line.startswith('•'):
+                line = '• ' + line[1:].strip()
+        
+        # If line doesn't start with bullet, make it one
+        elif len(line) > 5 and not any(skip in line.lower() for skip in ['example', 'note:', 'remember']):
+            line = '• ' + line
+        
+        # Add valid bullet points
+        if line.startswith('•') and len(line) > 3:
+            return line
+        return ""
+    
+    def clean_response(self, response: str) -> str:
+        """Clean response to ensure only bullet points are returned"""
+        if not response:
+            return "• Not available"
+        
+        # First, clean the raw response
+        response = self.scrub_response(response.strip())
+        
+        # Remove unwanted prefixes and formatting
+        response = self.strip_response_prefix(response)
         
         # Split into lines and extract content
-        lines = response.split('\n')
         bullet_points = []
         
-        for line in lines:
-            line = line.strip()
-            
-            # Skip empty lines
-            if not line:
-                continue
-            
-            # Skip quiz-style options
-            if re.match(r'^[A-D]\)', line, re.IGNORECASE):
-                continue
-            if any(quiz_text in line.lower() for quiz_text in ['all of the above', 'none of the above']):
-                continue
-            
-            # Skip exercise content
-            if any(exercise_text in line.lower() for exercise_text in [
-                'exercise', '# exercise', '## exercise', '* exercise', '** exercise',
-                'write a python', 'python script', 'with statement', 'open and read',
-                'file.txt', '# solution', 'import', 'programming', 'coding', 'script'
-            ]):
-                continue
-            
-            # Convert numbered lists to bullet points
-            if line.startswith(('1.', '2.', '3.', '4.', '5.')):
-                line = '• ' + line[2:].strip()
-            
-            # Convert existing bullet formats to consistent format
-            elif line.startswith(('-', '*', '•')):
-                if not line.startswith('•'):
-                    line = '• ' + line[1:].strip()
-            
-            # If line doesn't start with bullet, make it one
-            elif len(line) > 5 and not any(skip in line.lower() for skip in ['example', 'note:', 'remember']):
-                line = '• ' + line
-            
-            # Add valid bullet points
-            if line.startswith('•') and len(line) > 3:
+        for line in response.split('\n'):
+            line = self.format_bullet_line(line)
+            if line:
                 bullet_points.append(line)
                 
                 # Stop at 4 bullet points for detailed responses
@@ -620,10 +843,7 @@ class NursingChatbot:
         # Fix incorrect neonatal heart rate ranges with correct KKH Baby Bear Book values
         if any(pattern in final_response.lower() for pattern in ['100 and 160', '100-160', 'between 100 and 160']):
             if 'neonate' in final_response.lower() or 'newborn' in final_response.lower():
-                return """• Neonatal heart rate: 120-180 beats per minute (KKH Baby Bear Book)
-• Neonatal respiratory rate: 40-60 breaths per minute  
-• Neonatal blood pressure: 60-80 mmHg systolic
-• Temperature: 36.5-37.5°C (axillary measurement preferred)"""
+                return vital_signs.describe_band("Neonate")
         
         # Fix incomplete heart rate responses (when content is truncated)
         if any(pattern in final_response.lower() for pattern in [
@@ -632,10 +852,7 @@ class NursingChatbot:
             'heart rate of a newborn is',
             'newborn is .'
         ]) and not any(number in final_response for number in ['120', '180', 'bpm']):
-            return """• Neonatal heart rate: 120-180 beats per minute (KKH Baby Bear Book)
-• Neonatal respiratory rate: 40-60 breaths per minute  
-• Neonatal blood pressure: 60-80 mmHg systolic
-• Temperature: 36.5-37.5°C (axillary measurement preferred)"""
+            return vital_signs.describe_band("Neonate")
         
         # Fix incomplete "Call for" responses
         if 'call for _' in final_response.lower() or '• call for' in final_response.lower():
@@ -650,8 +867,12 @@ class NursingChatbot:
         
         return final_response
     
-    def query_llm(self, prompt: str, context: str = "") -> str:
-        """Query the LLM (OpenAI for cloud deployment, local LM Studio for development)"""
+    def build_llm_payload(self, prompt: str, context: str = "", history: List[Dict] = None,
+                          guidance: str = "") -> Dict[str, Any]:
+        """Build the chat completion payload for the active backend (OpenAI or local LM Studio)
+        
+        context holds KB passages separated by blank lines; guidance is appended to the system prompt.
+        """
         
         # Check if this is a clinical scenario request (needs more detailed response)
         is_scenario = any(keyword in prompt.lower() for keyword in [
@@ -682,114 +903,200 @@ RULES:
 - Start immediately with •
 - Focus on actionable nursing information"""
         
-        full_prompt = f"{system_prompt}\n\nContext: {context[:400]}...\n\nNurse's Question: {prompt}\n\nBob's Response:"
+        if guidance:
+            system_prompt = f"{system_prompt}\n\n{guidance}"
+        
+        # Fit system prompt, history, KB evidence and question into the token budget
+        prompt_parts = self.prompt_builder.build(system_prompt, prompt, context.split("\n\n") if context else [], history)
+        breakdown = prompt_parts['breakdown']
+        logger.info(f"Prompt tokens: {prompt_parts['prompt_tokens']} (system {breakdown['system']}, "
+                    f"history {breakdown['history']}, evidence {breakdown['evidence']}, question {breakdown['question']})")
         
         if self.use_openai:
             # OpenAI API call for cloud deployment
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}"
-            }
-            
-            payload = {
+            return {
                 "model": self.model_name,
-                "messages": [
-                    {"role": "system", "content": system_prompt[:500]},
-                    {"role": "user", "content": prompt[:300]}
-                ],
+                "messages": prompt_parts['messages'],
                 "temperature": 0.3,
                 "max_tokens": 150 if is_scenario else 120,
                 "top_p": 0.7
             }
-            
+        
+        # More conservative payload to avoid prediction errors
+        return {
+            "model": "",  # Filled in with the model discovered via /v1/models
+            "messages": prompt_parts['messages'],  # Smaller token budget for the local model
+            "temperature": 0.3,      # Even lower temperature for conciseness
+            "max_tokens": 150 if is_scenario else 120,  # Increased for detailed bullet points
+            "stream": False,
+            "top_p": 0.7,           # More focused sampling
+            "frequency_penalty": 0.0,
+            "presence_penalty": 0.0
+        }
+    
+    def is_emergency_query(self, text: str) -> bool:
+        """True if the text mentions any emergency keyword (cardiac arrest, anaphylaxis, poisoning...)"""
+        return any(keyword in text.lower() for keyword in self.EMERGENCY_KEYWORDS)
+    
+    def query_priority(self, prompt: str) -> int:
+        """Scheduler priority for an LLM request - emergencies jump ahead of routine questions"""
+        return LLMScheduler.EMERGENCY if self.is_emergency_query(prompt) else LLMScheduler.ROUTINE
+    
+    def query_llm(self, prompt: str, context: str = "", history: List[Dict] = None, guidance: str = "") -> str:
+        """Query the LLM (OpenAI for cloud deployment, local LM Studio for development)"""
+        response = self.try_query_llm(prompt, context, history, guidance)
+        if response is None:
+            return self.get_fallback_response(prompt, context)
+        return response
+    
+    def try_query_llm(self, prompt: str, context: str = "", history: List[Dict] = None, guidance: str = "",
+                      priority: Optional[int] = None) -> Optional[str]:
+        """Query the LLM, returning None instead of a fallback answer when it is unavailable"""
+        # Backend known to be down - answer from the knowledge base without waiting on timeouts
+        if not self.llm_pool.allow_request():
+            logger.info("All LLM circuits open, using fallback response")
+            return None
+        
+        try:
+            if priority is None:
+                priority = self.query_priority(prompt)
+            with self.llm_scheduler.slot(priority, timeout=self.queue_timeout):
+                return self.request_completion(prompt, context, history, guidance)
+        except SchedulerFull as e:
+            logger.warning(f"{e}, using fallback response")
+            return None
+    
+    # Rate limiting and transient server errors are retried after a backoff
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    
+    def request_completion(self, prompt: str, context: str = "", history: List[Dict] = None, guidance: str = "") -> Optional[str]:
+        """Send one chat completion request to the backend and return its text, or None on failure"""
+        payload = self.build_llm_payload(prompt, context, history, guidance)
+        backend = "OpenAI API" if self.use_openai else "LLM API"
+        estimated_tokens = self.estimate_request_tokens(payload)
+        
+        for attempt in range(self.max_retries + 1):
+            if not self.reserve_quota(estimated_tokens):
+                return None
             try:
-                response = requests.post(
-                    self.llm_endpoint,
-                    json=payload,
-                    headers=headers,
-                    timeout=30
-                )
+                # Least busy endpoint; local payloads get the model discovered via /v1/models on that endpoint
+                response = self.llm_pool.post_chat(payload)
                 
                 if response.status_code == 200:
-                    result = response.json()
-                    if 'choices' in result and len(result['choices']) > 0:
-                        return result['choices'][0]['message']['content']
-                else:
-                    logger.error(f"OpenAI API error: {response.status_code} - {response.text}")
-                    return self.get_fallback_response(prompt, context)
-                    
-            except requests.exceptions.RequestException as e:
-                logger.error(f"OpenAI API connection error: {e}")
-                return self.get_fallback_response(prompt, context)
-        
-        else:
-            # Local LM Studio call for development
-            # Try different model names that LM Studio commonly uses
-            model_options = [
-                "",                 # Empty (uses currently loaded model) - BEST for LM Studio
-                "phi-2",            # Short name
-                "microsoft/Phi-2",  # Full model name
-                "Phi-2",            # Capitalized
-                "lmstudio-community/microsoft-Phi-2-GGUF",  # GGUF format name
-                "microsoft/Phi-3-mini-4k-instruct-GGUF"    # Alternative model
-            ]
-            
-            # More conservative payload to avoid prediction errors
-            payload = {
-                "model": model_options[0],  # Start with empty (uses loaded model)
-                "messages": [
-                    {"role": "system", "content": system_prompt[:200]},  # Even shorter system prompt
-                    {"role": "user", "content": prompt[:150]}  # Even shorter user input
-                ],
-                "temperature": 0.3,      # Even lower temperature for conciseness
-                "max_tokens": 150 if is_scenario else 120,  # Increased for detailed bullet points
-                "stream": False,
-                "top_p": 0.7,           # More focused sampling
-                "frequency_penalty": 0.0,
-                "presence_penalty": 0.0
-            }
-            
-            try:
-                # Try multiple model names if one fails
-                for i, model_name in enumerate(model_options):
-                    payload["model"] = model_name
-                    
-                    response = requests.post(
-                        self.llm_endpoint,
-                        json=payload,
-                        headers={"Content-Type": "application/json"},
-                        timeout=30
-                    )
-                    
-                    if response.status_code == 200:
-                        try:
-                            result = response.json()
-                            if 'choices' in result and len(result['choices']) > 0:
-                                return result['choices'][0]['message']['content']
-                        except (KeyError, IndexError, ValueError) as e:
-                            logger.error(f"JSON parsing error with model {model_name}: {e}")
-                            continue
-                    elif response.status_code == 422:
-                        # Model name issue, try next one
-                        logger.warning(f"Model {model_name} not found, trying next...")
-                        continue
-                    else:
-                        logger.error(f"LLM API error with model {model_name}: {response.status_code} - {response.text}")
-                        if i < len(model_options) - 1:  # Try next model
-                            continue
-                        else:
-                            break
+                    try:
+                        result = response.json()
+                        if 'choices' in result and len(result['choices']) > 0:
+                            content = result['choices'][0]['message']['content']
+                            self.record_usage(payload, estimated_tokens, content, result.get('usage'))
+                            return content
+                    except (KeyError, IndexError, ValueError) as e:
+                        logger.error(f"{backend} JSON parsing error: {e}")
+                    return None
                 
-                # If all models failed, return fallback
-                logger.error("All model names failed, using fallback response")
-                return self.get_fallback_response(prompt, context)
+                if response.status_code in self.RETRY_STATUSES and attempt < self.max_retries:
+                    delay = self.retry_delay(attempt, response)
+                    if delay <= self.rate_limit_max_wait:
+                        logger.warning(f"{backend} returned {response.status_code}, retrying in {delay:.1f}s")
+                        time.sleep(delay)
+                        continue
+                logger.error(f"{backend} error: {response.status_code} - {response.text}")
                     
             except requests.exceptions.ConnectionError as e:
-                logger.error(f"LLM connection error: {e}")
-                return self.get_fallback_response(prompt, context)
+                logger.error(f"{backend} connection error: {e}")
             except requests.exceptions.RequestException as e:
-                logger.error(f"LLM request error: {e}")
-                return self.get_fallback_response(prompt, context)
+                logger.error(f"{backend} request error: {e}")
+            return None
+        return None
+    
+    def estimate_request_tokens(self, payload: Dict[str, Any]) -> int:
+        """Upper estimate of the tokens a request will use: prompt plus the completion limit"""
+        count = self.prompt_builder.counter.count
+        prompt_tokens = sum(count(msg['content']) + TOKENS_PER_MESSAGE for msg in payload['messages'])
+        return prompt_tokens + payload.get('max_tokens', 0)
+    
+    def reserve_quota(self, estimated_tokens: int) -> bool:
+        """Wait briefly for OpenAI rate limit capacity; False means answer from the knowledge base"""
+        if self.rate_limiter is None:
+            return True
+        return self.rate_limiter.acquire(estimated_tokens, max_wait=self.rate_limit_max_wait)
+    
+    def retry_delay(self, attempt: int, response: requests.Response) -> float:
+        """Backoff before the next attempt, honouring Retry-After; a 429 also pauses other sessions"""
+        delay = backoff_delay(attempt, parse_retry_after(response.headers))
+        if response.status_code == 429:
+            self.usage.record(self.usage_session_id, rate_limited=True)
+            if self.rate_limiter is not None:
+                self.rate_limiter.penalize(delay)
+        return delay
+    
+    def record_usage(self, payload: Dict[str, Any], estimated_tokens: int, content: str, usage: Dict[str, int] = None):
+        """Account tokens for the admin panel, using the server's usage figures when it reports them"""
+        count = self.prompt_builder.counter.count
+        if usage:
+            prompt_tokens = usage.get('prompt_tokens', 0)
+            completion_tokens = usage.get('completion_tokens', 0)
+        else:
+            prompt_tokens = sum(count(msg['content']) + TOKENS_PER_MESSAGE for msg in payload['messages'])
+            completion_tokens = count(content)
+        self.usage.record(self.usage_session_id, prompt_tokens, completion_tokens)
+        if self.rate_limiter is not None:
+            self.rate_limiter.settle(estimated_tokens, prompt_tokens + completion_tokens)
+    
+    def query_llm_stream(self, prompt: str, context: str = "", history: List[Dict] = None, guidance: str = "") -> Iterator[str]:
+        """Stream the LLM answer as raw text deltas, falling back to the knowledge base on failure"""
+        received_tokens = False
+        for delta in self.stream_llm_tokens(prompt, context, history, guidance):
+            received_tokens = True
+            yield delta
+        
+        # Only fall back if nothing reached the user; a partial answer is kept as-is
+        if not received_tokens:
+            yield self.get_fallback_response(prompt, context)
+    
+    def stream_llm_tokens(self, prompt: str, context: str = "", history: List[Dict] = None, guidance: str = "",
+                          state: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """Stream raw text deltas from the LLM; yields nothing if the backend is unavailable
+        
+        If state is given, state["finished"] is True only when the answer arrived complete.
+        """
+        state = {} if state is None else state
+        state["finished"] = False
+        if not self.llm_pool.allow_request():
+            logger.info("All LLM circuits open, using fallback response")
+            return
+        
+        payload = self.build_llm_payload(prompt, context, history, guidance)
+        estimated_tokens = self.estimate_request_tokens(payload)
+        
+        try:
+            # The slot is held until the stream finishes or the consumer stops reading
+            with self.llm_scheduler.slot(self.query_priority(prompt), timeout=self.queue_timeout):
+                for attempt in range(self.max_retries + 1):
+                    if not self.reserve_quota(estimated_tokens):
+                        return
+                    deltas = []
+                    try:
+                        for delta in self.llm_pool.stream_chat(payload, state):
+                            deltas.append(delta)
+                            yield delta
+                        self.record_usage(payload, estimated_tokens, "".join(deltas))
+                        return
+                    except requests.exceptions.HTTPError as e:
+                        # Retry only before anything reached the user
+                        status = e.response.status_code if e.response is not None else None
+                        if status in self.RETRY_STATUSES and not deltas and attempt < self.max_retries:
+                            delay = self.retry_delay(attempt, e.response)
+                            if delay <= self.rate_limit_max_wait:
+                                logger.warning(f"LLM stream returned {status}, retrying in {delay:.1f}s")
+                                time.sleep(delay)
+                                continue
+                        logger.error(f"LLM streaming error: {e}")
+                        return
+                    except requests.exceptions.RequestException as e:
+                        logger.error(f"LLM streaming error: {e}")
+                        return
+        except SchedulerFull as e:
+            logger.warning(f"{e}, using fallback response")
     
     def get_fallback_response(self, prompt: str, context: str = "") -> str:
         """Provide ultra-direct response using knowledge base when AI is unavailable"""
@@ -806,19 +1113,271 @@ RULES:
         # No substantial context available
         return "• Not available"
     
-    def process_query(self, user_input: str, chat_history: List[Dict] = None) -> str:
+    def process_query(self, user_input: str, chat_history: List[Dict] = None,
+                      prepared: Optional[Dict[str, Any]] = None) -> str:
         """Process user query and return response with intelligent context selection"""
+        if prepared is None:
+            prepared = self.prepare_query(user_input, chat_history)
+        question = prepared.get('question', user_input)
+        if 'answer' in prepared:
+            answer = prepared['answer']
+        else:
+            # Query LLM with enhanced context, sharing the call with identical in-flight questions
+            key = self.llm_flight_key(question, prepared)
+            response = self.singleflight.do(key, self.try_query_llm, question, prepared['context'],
+                                            prepared['history'], prepared['guidance'])
+            if response is None:
+                answer = self.finalize_response(question, self.get_fallback_response(question, prepared['context']),
+                                                prepared['is_follow_up'])
+            else:
+                answer = self.finalize_response(question, response, prepared['is_follow_up'])
+                self.cache_response(question, prepared, answer)
+        self.remember_turn(user_input, chat_history, answer)
+        return answer
+    
+    def process_query_stream(self, user_input: str, chat_history: List[Dict] = None,
+                             prepared: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """Like process_query, but yields the progressively cleaned answer as LLM tokens arrive
+        
+        The last value yielded is the final answer, identical to what process_query would return.
+        """
+        answer = None
+        for answer in self._stream_answer(user_input, chat_history, prepared):
+            yield answer
+        if answer is not None:
+            self.remember_turn(user_input, chat_history, answer)
+    
+    def _stream_answer(self, user_input: str, chat_history: List[Dict] = None,
+                       prepared: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        if prepared is None:
+            prepared = self.prepare_query(user_input, chat_history)
+        question = prepared.get('question', user_input)
+        if 'answer' in prepared:
+            yield prepared['answer']
+            return
+        
+        # Another session is already generating this answer - wait for it instead of a second LLM call
+        key = self.llm_flight_key(question, prepared)
+        call, is_leader = self.singleflight.acquire(key)
+        if not is_leader:
+            response = self.singleflight.wait(call)
+            if response is None:
+                response = self.get_fallback_response(question, prepared['context'])
+            yield self.finalize_response(question, response, prepared['is_follow_up'])
+            return
+        
+        cleaner = StreamingResponseCleaner(self)
+        stream_state: Dict[str, Any] = {}
+        shown = ""
+        try:
+            for delta in self.stream_llm_tokens(question, prepared['context'], prepared['history'],
+                                                prepared['guidance'], state=stream_state):
+                cleaner.feed(delta)
+                preview = cleaner.preview()
+                if preview and preview != shown:
+                    shown = preview
+                    yield preview
+        finally:
+            # Release followers even if the reader stopped early; None tells them to fall back
+            self.singleflight.complete(key, call, result=cleaner.text or None)
+        
+        if not cleaner.text:
+            yield self.finalize_response(question, self.get_fallback_response(question, prepared['context']),
+                                         prepared['is_follow_up'])
+            return
+        
+        answer = self.finalize_response(question, cleaner.text, prepared['is_follow_up'])
+        # A stream cut off mid-answer is shown as it is, but never cached and replayed to others
+        if stream_state.get("finished"):
+            self.cache_response(question, prepared, answer)
+        else:
+            logger.warning("LLM stream ended early, answer not cached")
+        yield answer
+    
+    def remember_turn(self, user_input: str, chat_history: Optional[List[Dict]], answer: str):
+        """Fold this question and answer into the conversation summary in the background"""
+        # Split now: the UI appends the answer to chat_history while the update is queued
+        question, earlier = conversation_state.split_turn(user_input, chat_history)
+        if question is not None:
+            _conversation_updates.submit(conversation_state.remember_turn, earlier, question, answer)
+    
+    def prefetch_key(self, user_input: str, earlier: List[Dict]) -> tuple:
+        """Prefetched answers belong to one question at one point in one conversation
+        
+        The conversation summary is part of the key, as it is part of the prompt: a suggestion
+        prepared in one chat is never taken for the same question about another patient.
+        """
+        summary = conversation_state.summary_text(conversation_state.state_for(earlier)) if earlier else ""
+        return (query_key(user_input), len(earlier), summary)
+    
+    def prefetch_suggestions(self, prompts: List[str], messages: List[Dict]):
+        """Start preparing the suggested follow-ups in the background; reruns showing the same ones are no-ops"""
+        if self.prefetcher is None or not prompts:
+            return
+        jobs = [(self.prefetch_key(prompt, messages), functools.partial(self.prefetch_answer, prompt, list(messages)))
+                for prompt in prompts]
+        self.prefetcher.prefetch((len(messages), tuple(prompts)), jobs)
+    
+    def prefetch_answer(self, prompt: str, earlier: List[Dict]) -> Dict[str, Any]:
+        """prepare_query's result for a suggestion, with the LLM answer when the backend has nothing else to do"""
+        prepared = self.prepare_query(prompt, earlier + [{"role": "user", "content": prompt}], prefetch=True)
+        if 'answer' in prepared or not self.prefetch_llm:
+            return prepared
+        # A speculative answer never makes a nurse's question wait: only start one on an idle backend
+        scheduler = self.llm_scheduler.snapshot()
+        if scheduler['in_flight'] or scheduler['queued']:
+            return prepared
+        question = prepared['question']
+        response = self.singleflight.do(self.llm_flight_key(question, prepared), self.try_query_llm, question,
+                                        prepared['context'], prepared['history'], prepared['guidance'],
+                                        LLMScheduler.PREFETCH)
+        if response is None:
+            return prepared
+        answer = self.finalize_response(question, response, prepared['is_follow_up'])
+        self.cache_response(question, prepared, answer)
+        return dict(prepared, answer=answer)
+    
+    def cache_response(self, user_input: str, prepared: Dict[str, Any], answer: str):
+        """Store an LLM-generated answer in the semantic response cache"""
+        if self.response_cache is None or prepared.get('query_embedding') is None:
+            return
+        try:
+            self.response_cache.store(user_input, prepared['query_embedding'], answer,
+                                      context_key(prepared['history'], prepared['guidance']))
+        except Exception as e:
+            logger.error(f"Error caching response: {e}")
+    
+    def process_query_with_deadline(self, user_input: str, chat_history: List[Dict] = None,
+                                    deadline: Optional[float] = None) -> Tuple[str, Optional[concurrent.futures.Future]]:
+        """Answer within deadline seconds, or return a provisional answer plus a future for the final one
+        
+        Routing and retrieval run first on the calling thread, so fast-path, toxicology, resus
+        and calculator answers are always final; only the LLM call is bounded by the deadline.
+        It keeps running in the background after the deadline, and the future resolves to
+        exactly what process_query would have returned.
+        """
+        # The UI appends the provisional answer to the live list while the LLM call is still running
+        chat_history = list(chat_history or [])
+        prepared = self.prepare_query(user_input, chat_history)
+        if 'answer' in prepared:
+            return self.process_query(user_input, chat_history, prepared), None
+        future = self.background_answers.submit(self.process_query, user_input, chat_history, prepared)
+        try:
+            return future.result(timeout=deadline), None
+        except concurrent.futures.TimeoutError:
+            logger.info(f"No answer within {deadline}s, returning provisional answer")
+            return self.provisional_answer(user_input), future
+    
+    def stream_query_with_deadline(self, user_input: str, chat_history: List[Dict] = None,
+                                   deadline: Optional[float] = None) -> Tuple[Iterator[str], Optional[concurrent.futures.Future]]:
+        """Like process_query_stream, but falls back to a provisional answer if no text arrives by the deadline
+        
+        On timeout the returned iterator yields only the provisional answer and the stream is
+        drained in the background; the future resolves to its final value. As in
+        process_query_with_deadline, only the LLM stream is bounded by the deadline.
+        """
+        chat_history = list(chat_history or [])
+        prepared = self.prepare_query(user_input, chat_history)
+        stream = self.process_query_stream(user_input, chat_history, prepared)
+        if 'answer' in prepared:
+            return stream, None
+        first = self.background_answers.submit(next, stream, None)
+        try:
+            first_value = first.result(timeout=deadline)
+        except concurrent.futures.TimeoutError:
+            logger.info(f"No tokens within {deadline}s, returning provisional answer")
+            
+            def finish() -> Optional[str]:
+                final = first.result()
+                for final in stream:
+                    pass
+                return final
+            
+            return iter([self.provisional_answer(user_input)]), self.background_answers.submit(finish)
         
-        # Immediate handling for neonatal heart rate questions to ensure correct response
-        if any(term in user_input.lower() for term in ['heart rate range for neonate', 'normal heart rate range for neonate', 'neonatal heart rate', 'newborn heart rate']):
-            return """• Neonatal heart rate: 120-180 beats per minute (KKH Baby Bear Book)
-• Neonatal respiratory rate: 40-60 breaths per minute  
-• Neonatal blood pressure: 60-80 mmHg systolic
-• Temperature: 36.5-37.5°C (axillary measurement preferred)"""
-        
-        # Check if it's a calculation request
-        if any(word in user_input.lower() for word in ['calculate', 'fluid', 'weight', 'dosage']):
-            return self.handle_calculation_request(user_input)
+        return itertools.chain([first_value] if first_value is not None else [], stream), None
+    
+    def provisional_answer(self, user_input: str) -> str:
+        """Extractive answer from retrieval alone, marked as provisional"""
+        relevant_docs = self.search_knowledge_base(user_input, top_k=3)
+        context = "\n\n".join(self.clean_content(doc) for doc in relevant_docs[:2])
+        answer = self.clean_response(self.get_fallback_response(user_input, context))
+        return f"{PROVISIONAL_NOTICE}\n\n{answer}"
+    
+    def llm_flight_key(self, user_input: str, prepared: Dict[str, Any]) -> tuple:
+        """Coalescing key for an LLM call: normalised question plus a hash of everything else in the prompt"""
+        prompt_inputs = json.dumps([prepared['context'], prepared['guidance'], prepared['history']], default=str)
+        context_hash = hashlib.sha1(prompt_inputs.encode('utf-8')).hexdigest()
+        return ("llm", self.normalise_query_key(user_input), context_hash)
+    
+    def prepare_query(self, user_input: str, chat_history: List[Dict] = None, prefetch: bool = False) -> Dict[str, Any]:
+        """Route the query and build its LLM context
+        
+        Returns {'answer': ...} when the query is answered without the LLM, otherwise
+        {'context', 'history', 'guidance', 'is_follow_up', 'query_embedding', 'question'} for the LLM
+        call, where 'question' is the standalone (follow-up rewritten) question in the nurse's own words;
+        drug names read differently are explained in 'guidance'.
+        With prefetch=True the query is a suggestion being prepared ahead of time.
+        """
+        
+        current, earlier = conversation_state.split_turn(user_input, chat_history)
+        
+        # A suggested follow-up prepared in the background while the nurse read the last answer
+        if not prefetch and self.prefetcher is not None:
+            prefetched = self.prefetcher.take(self.prefetch_key(user_input, earlier))
+            if prefetched is not None:
+                logger.info(f"Prefetch hit: {user_input!r}")
+                query_rewriter.remember_embedding(current, prefetched.get('query_embedding'))
+                return prefetched
+        
+        # Follow-ups ("what about for a 5-year-old?") become standalone questions built from the
+        # earlier question that set the topic, so every route and the retrieval see the full question
+        topic = query_rewriter.topic_message(user_input, earlier)
+        if topic is not None:
+            standalone = query_rewriter.rewrite(user_input, topic['content'])
+            logger.info(f"Follow-up rewritten: {user_input!r} -> {standalone!r}")
+            user_input = standalone
+        
+        # Misspelt, brand and international drug names become the canonical name used by
+        # the lookups and the knowledge base (e.g. "acetaminophen" -> "paracetamol"); the LLM
+        # still gets the nurse's own wording, with a note on how each drug name was read
+        question = user_input
+        user_input, drug_matches = self.drug_index.canonicalize(user_input)
+        drug_note = correction_note(drug_matches)
+        # Suggestions are not counted towards the normaliser's repeat rates, only questions actually asked
+        normalised_input = normalize_query(user_input) if prefetch else self.query_normalizer.normalize(user_input)
+        
+        # Fast-path answers from fast_paths.yaml, checked before any embedding work
+        fast_answer = self.fast_paths.answer(user_input, stage="fast_path")
+        if fast_answer is not None:
+            return {'answer': fast_answer}
+        
+        # Paracetamol poisoning and NAC questions come from the Section 01 lookup tables
+        poisoning_answer = toxicology.answer_poisoning_query(user_input)
+        if poisoning_answer is not None:
+            return {'answer': poisoning_answer}
+        
+        # Resuscitation drug sheets are generated from the Section 01 CPR data, never the LLM
+        resus_answer = resus_sheet.answer_resus_query(user_input)
+        if resus_answer is not None:
+            return {'answer': resus_answer}
+        
+        # Calculations are answered deterministically, asking for any missing inputs
+        calculation_answer = calculators.answer_calculation(user_input)
+        if calculation_answer is not None:
+            return {'answer': calculation_answer}
+        
+        # The normalised question is embedded once per turn, for the topic guard, the response cache
+        # and retrieval, and kept on its message so later follow-ups can blend it in without re-encoding
+        query_embedding = self.embed_query(normalised_input)
+        query_rewriter.remember_embedding(current, query_embedding)
+        search_embedding = query_rewriter.blend(query_embedding, query_rewriter.message_embedding(topic))
+        
+        # Clearly off-topic questions get a templated refusal without retrieval or generation;
+        # a question naming a drug exactly is always clinical, and our own suggestions are never off-topic
+        names_drug = any(match['distance'] == 0 for match in drug_matches)
+        if not names_drug and not prefetch and self.is_off_topic(user_input, query_embedding, chat_history):
+            return {'answer': topic_guard.REFUSAL}
         
         # Check if this is a follow-up question from suggested prompts
         follow_up_indicators = [
@@ -830,10 +1389,6 @@ RULES:
         is_follow_up = any(indicator in user_input.lower() for indicator in follow_up_indicators)
         
         # Enhanced keyword detection for different types of queries
-        emergency_keywords = ['emergency', 'cardiac arrest', 'anaphylaxis', 'shock', 'seizure', 
-                             'respiratory failure', 'code blue', 'cpr', 'resuscitation', 'critical',
-                             'poisoning', 'overdose', 'paracetamol', 'abcde', 'unconscious']
-        
         pediatric_keywords = ['pediatric', 'paediatric', 'child', 'infant', 'neonate', 'toddler',
                              'baby', 'newborn', 'adolescent', 'vital signs', 'heart rate', 'blood pressure',
                              'respiratory rate', 'temperature', 'normal range', 'neonatal']
@@ -841,10 +1396,31 @@ RULES:
         general_nursing_keywords = ['hand hygiene', 'medication administration', 'five rights',
                                    'infection control', 'isolation', 'ppe', 'documentation']
         
-        is_emergency_query = any(keyword in user_input.lower() for keyword in emergency_keywords)
+        is_emergency_query = self.is_emergency_query(user_input)
         is_pediatric_query = any(keyword in user_input.lower() for keyword in pediatric_keywords)
         is_general_nursing = any(keyword in user_input.lower() for keyword in general_nursing_keywords)
         
+        # Earlier turns are passed as one rolling summary (patient facts, recent questions, last
+        # answer) rather than raw messages, so the history stays small however long the chat runs
+        history = conversation_state.history_messages(conversation_state.state_for(earlier)) if earlier else []
+        
+        # Query-type guidance appended to the system prompt
+        if is_pediatric_query or any(term in user_input.lower() for term in ['neonate', 'newborn', 'infant', 'child']):
+            guidance = "This query is about pediatric/neonatal care. Please prioritize information from the KKH Baby Bear Book and provide age-appropriate clinical values and protocols."
+        elif is_emergency_query:
+            guidance = "This query appears to be about pediatric emergencies or critical care. Please prioritize information from the KKH Baby Bear Book Section 01 while also providing practical nursing guidance."
+        else:
+            guidance = ""
+        if drug_note:
+            guidance = f"{guidance}\n\n{drug_note}".strip()
+        
+        # Reuse the answer to a semantically equivalent question asked before in the same context:
+        # the summary carries the patient's age and weight, which barely move the question embedding
+        if self.response_cache is not None:
+            cached = self.response_cache.lookup(query_embedding, context_key(history, guidance))
+            if cached is not None:
+                return {'answer': cached['response']}
+        
         # For pediatric/neonatal questions, force search to prioritize Baby Bear Book content
         if is_pediatric_query or any(term in user_input.lower() for term in ['neonate', 'newborn', 'infant', 'child']):
             # Enhanced search specifically for Baby Bear Book content
@@ -858,7 +1434,7 @@ RULES:
                 relevant_docs = alternative_docs + relevant_docs
         elif is_follow_up:
             # Enhanced search for follow-up questions
-            relevant_docs = self.search_knowledge_base(user_input, top_k=5)
+            relevant_docs = self.search_knowledge_base(user_input, top_k=5, embedding=search_embedding)
             
             # If no good results, try with additional nursing keywords
             if not relevant_docs or len(relevant_docs) < 2:
@@ -867,9 +1443,9 @@ RULES:
         else:
             # Regular search for non-follow-up questions
             if is_emergency_query:
-                relevant_docs = self.search_knowledge_base(user_input, top_k=4)
+                relevant_docs = self.search_knowledge_base(user_input, top_k=4, embedding=search_embedding)
             else:
-                relevant_docs = self.search_knowledge_base(user_input, top_k=3)
+                relevant_docs = self.search_knowledge_base(user_input, top_k=3, embedding=search_embedding)
         
         # Clean the content before building context
         cleaned_docs = [self.clean_content(doc) for doc in relevant_docs]
@@ -889,37 +1465,11 @@ RULES:
             # General nursing queries get balanced content - minimal
             context = cleaned_docs[0] if cleaned_docs else ""  # Only top result
         
-        # Limit context length to prevent token overflow
-        if len(context) > 800:  # Keep context under 800 characters
-            context = context[:800] + "..."
-        
-        # Add conversation history for context if available
-        if chat_history and len(chat_history) > 1:
-            recent_messages = chat_history[-3:]  # Last 3 messages for context
-            conversation_context = "\n\nRecent conversation:\n"
-            for msg in recent_messages:
-                role = "Nurse" if msg["role"] == "user" else "Sarah"
-                conversation_context += f"{role}: {msg['content'][:150]}...\n"
-            context = conversation_context + "\n\nKnowledge base context:\n" + context
-        
-        # Enhanced system message based on query type
-        if is_pediatric_query or any(term in user_input.lower() for term in ['neonate', 'newborn', 'infant', 'child']):
-            enhanced_context = f"""PRIORITY CONTEXT - KKH Baby Bear Book Pediatric Guidelines:
-            
-{context}
-
-This query is about pediatric/neonatal care. Please prioritize information from the KKH Baby Bear Book and provide age-appropriate clinical values and protocols."""
-        elif is_emergency_query:
-            enhanced_context = f"""PRIORITY CONTEXT - KKH Baby Bear Book Section 01 Medical Emergencies:
-            
-{context}
-
-This query appears to be about pediatric emergencies or critical care. Please prioritize information from the KKH Baby Bear Book Section 01 while also providing practical nursing guidance."""
-        else:
-            enhanced_context = context
-        
-        # Query LLM with enhanced context
-        response = self.query_llm(user_input, enhanced_context)
+        return {'context': context, 'history': history, 'guidance': guidance,
+                'is_follow_up': is_follow_up, 'query_embedding': query_embedding, 'question': question}
+    
+    def finalize_response(self, user_input: str, response: str, is_follow_up: bool) -> str:
+        """Clean the LLM output and replace unusable follow-up answers with nursing guidance"""
         
         # Clean response to ensure only bullet points
         response = self.clean_response(response)
@@ -941,87 +1491,101 @@ This query appears to be about pediatric emergencies or critical care. Please pr
             is_incomplete = any(indicator in response.lower() if isinstance(indicator, str) else indicator for indicator in incomplete_indicators)
             
             if not nursing_check or is_incomplete:
-                # Provide a nursing-specific fallback based on the question type
-                if any(term in user_input.lower() for term in ['abcde', 'assessment']):
-                    response = """• Airway - Check for obstruction or stridor
-• Breathing - Assess respiratory rate, effort, and oxygen saturation
-• Circulation - Monitor heart rate, blood pressure, and capillary refill
-• Disability - Assess consciousness level using AVPU or GCS
-• Exposure - Check for rashes, injuries, or temperature"""
-                elif any(term in user_input.lower() for term in ['vital signs', 'normal ranges', 'heart rate', 'neonatal', 'neonate', 'newborn heart rate', 'normal heart rate range for neonate']):
-                    if any(neonatal_term in user_input.lower() for neonatal_term in ['neonate', 'neonatal', 'newborn']):
-                        response = """• Neonatal heart rate: 120-180 beats per minute (KKH Baby Bear Book)
-• Neonatal respiratory rate: 40-60 breaths per minute  
-• Neonatal blood pressure: 60-80 mmHg systolic
-• Temperature: 36.5-37.5°C (axillary measurement preferred)"""
-                    else:
-                        response = """• Heart rate varies by age: newborn 120-180, infant 80-140, child 70-120 bpm
-• Respiratory rate: newborn 40-60, infant 24-38, child 18-30 breaths/min
-• Blood pressure increases with age and size
-• Temperature normal range: 36.5-37.5°C (97.7-99.5°F)"""
-                elif any(term in user_input.lower() for term in ['medication', 'drug', 'dose']):
-                    response = """• Always verify patient identity with two identifiers
-• Check medication name, dose, route, and timing
-• Calculate pediatric doses based on weight (mg/kg)
-• Verify allergies and contraindications before administration"""
-                elif any(term in user_input.lower() for term in ['call for help', 'immediate help', 'when should i call', 'when to call']):
-                    response = """• Any acute change in consciousness or responsiveness
-• Significant vital sign abnormalities for age
-• Difficulty breathing or signs of respiratory distress
-• Signs of shock: poor perfusion, altered mental state, cool extremities
-• Seizures or abnormal movements
-• Severe pain or distress that cannot be managed
-• Any situation where you feel uncertain about patient safety"""
-                elif any(term in user_input.lower() for term in ['when to escalate', 'escalate']):
-                    response = """• Deteriorating vital signs despite interventions
-• New or worsening symptoms
-• Patient or family expressing serious concerns
-• Any change that makes you worried about patient safety
-• When clinical indicators suggest need for higher level of care"""
-                else:
-                    response = """• Monitor patient closely for any changes
-• Document all observations and interventions
-• Communicate concerns to medical team
-• Follow hospital protocols and guidelines"""
+                # Provide a nursing-specific fallback based on the question type (fallback rules in fast_paths.yaml)
+                fallback = self.fast_paths.answer(user_input, stage="fallback")
+                if fallback is not None:
+                    response = fallback
         
         return response
     
     def handle_calculation_request(self, user_input: str) -> str:
         """Handle calculation requests in a conversational way"""
-        if 'fluid' in user_input.lower():
-            # Try to extract weight from input
-            weight_match = re.search(r'(\d+(?:\.\d+)?)\s*kg', user_input.lower())
-            if weight_match:
-                weight = float(weight_match.group(1))
-                calc_result = self.calculate_fluid_requirements(weight)
-                return f"""Great question! Let me calculate those fluid requirements for your {weight} kg patient. 💧
-
-**Here's what I found:**
-• **Daily requirement:** {calc_result['daily_ml']:.0f} mL ({calc_result['daily_liters']:.1f} L)
-• **Hourly rate:** {calc_result['hourly_ml']:.1f} mL/hr
+        answer = calculators.answer_calculation(user_input)
+        if answer is not None:
+            return answer
+        
+        return """I can calculate these for you straight away: 🧮
+• **Fluid requirements** - *"maintenance fluids for 12 kg"*
+• **Medication dose** - *"dose of 15 mg/kg for 14 kg"*
+• **IV flow rate** - *"rate for 500 mL over 4 hours"*
+• **BMI** - *"BMI for 30 kg, 130 cm"*
+• **Paracetamol dose** - *"paracetamol dose for 12 kg"*
+• **Vital signs check** - *"is HR 170 normal for a toddler?"*"""
 
-*I used the Holliday-Segar method for this calculation*
-
-**Clinical reminders:** 🏥
-- Please adjust these numbers based on the patient's clinical condition, fever, or ongoing losses
-- Don't forget to monitor electrolytes and renal function regularly
-- Consider whether you need maintenance fluids vs. replacement therapy
-- Always double-check with the physician's orders
-
-Is there anything specific about this patient's fluid management you'd like me to help explain? I'm happy to dive deeper into the clinical considerations! 😊"""
-            else:
-                return """I'd love to help you calculate fluid requirements! 💧 I just need to know the patient's weight in kg first.
-
-For example, you could ask: *"Calculate fluid requirements for 25 kg patient"*
-
-**Here's a quick reminder of the Holliday-Segar Method:**
-• First 10 kg: 100 mL/kg/day (4 mL/kg/hr)
-• Next 10 kg: 50 mL/kg/day (2 mL/kg/hr)  
-• Each kg >20 kg: 20 mL/kg/day (1 mL/kg/hr)
-
-What's the weight of your patient? I'll calculate it right away! 🤗"""
+class StreamingResponseCleaner:
+    """Applies NursingChatbot.clean_response line rules incrementally to streamed LLM output
+    
+    Complete lines are cleaned as soon as their newline arrives; the unfinished
+    tail is kept in a rolling buffer and previewed with the same rules.
+    """
+    
+    def __init__(self, chatbot: NursingChatbot, max_bullets: int = 4):
+        self.chatbot = chatbot
+        self.max_bullets = max_bullets
+        self.bullets = []
+        self.buffer = ""
+        self.raw_parts = []
+        self.in_code_block = False
+        self.seen_first_line = False
+    
+    @property
+    def text(self) -> str:
+        """Full raw response received so far"""
+        return "".join(self.raw_parts)
+    
+    def feed(self, delta: str):
+        self.raw_parts.append(delta)
+        self.buffer += delta
+        while '\n' in self.buffer:
+            line, self.buffer = self.buffer.split('\n', 1)
+            bullet = self._clean_line(line)
+            if bullet and len(self.bullets) < self.max_bullets:
+                self.bullets.append(bullet)
+    
+    def _clean_line(self, line: str, partial: bool = False) -> str:
+        # A partial line is cleaned by the same rules but may still change, so it updates no state
+        # Code fences can span many lines, so track them instead of regex-matching the block
+        if line.strip().startswith('```'):
+            if not partial:
+                self.in_code_block = not self.in_code_block
+            return ""
+        if self.in_code_block:
+            return ""
         
-        return self.query_llm(user_input, "")
+        line = self.chatbot.scrub_response(line)
+        if not self.seen_first_line and line.strip():
+            if not partial:
+                self.seen_first_line = True
+            line = self.chatbot.strip_response_prefix(line.strip())
+        return self.chatbot.format_bullet_line(line)
+    
+    def preview(self) -> str:
+        """Bullets cleaned so far plus the partially received line"""
+        lines = list(self.bullets)
+        if len(lines) < self.max_bullets and self.buffer.strip():
+            partial = self._clean_line(self.buffer, partial=True)
+            if partial:
+                lines.append(partial)
+        return '\n'.join(lines)
+
+def attach_background_answer(message: Dict[str, Any], future: concurrent.futures.Future):
+    """Replace a provisional chat message with the final answer once the background LLM call finishes"""
+    message["provisional"] = True
+    
+    def replace(done: concurrent.futures.Future):
+        try:
+            final = done.result()
+        except Exception as e:
+            logger.error(f"Background answer failed: {e}")
+            final = None
+        if final:
+            message["content"] = final
+        else:
+            # Keep the knowledge base answer, minus the notice promising a replacement
+            message["content"] = message["content"].replace(PROVISIONAL_NOTICE, "").strip()
+        message["provisional"] = False
+    
+    future.add_done_callback(replace)
 
 def create_new_chat_session() -> str:
     """Create a new chat session and return its ID"""
@@ -1633,6 +2197,7 @@ def main():
             follow_up_prompts = generate_contextual_prompts(st.session_state.messages)
             
             if follow_up_prompts:
+                st.session_state.chatbot.prefetch_suggestions(follow_up_prompts, st.session_state.messages)
                 st.markdown("### 💡 Suggested Follow-up Questions")
                 
                 # Create columns for prompt buttons
@@ -1673,14 +2238,29 @@ def main():
             # Ensure current session is synchronized
             st.session_state.chat_sessions[st.session_state.current_session_id]['messages'] = st.session_state.messages
             
-            # Generate response with conversation history
+            # Generate response with conversation history; past the deadline a provisional answer is shown
+            chatbot = st.session_state.chatbot
+            deadline = chatbot.answer_deadline or None
             with st.chat_message("assistant"):
-                with st.spinner("Sarah is thinking... 🤔"):
-                    response = st.session_state.chatbot.process_query(last_user_message, st.session_state.messages)
-                st.markdown(response)
+                if chatbot.stream_responses:
+                    # Show tokens as they arrive; the spinner only covers time to first token
+                    placeholder = st.empty()
+                    with st.spinner("Sarah is thinking... 🤔"):
+                        stream, pending = chatbot.stream_query_with_deadline(last_user_message, st.session_state.messages, deadline)
+                        response = next(stream, "• Not available")
+                    placeholder.markdown(response)
+                    for response in stream:
+                        placeholder.markdown(response)
+                else:
+                    with st.spinner("Sarah is thinking... 🤔"):
+                        response, pending = chatbot.process_query_with_deadline(last_user_message, st.session_state.messages, deadline)
+                    st.markdown(response)
             
             # Add assistant response
-            st.session_state.messages.append({"role": "assistant", "content": response})
+            message = {"role": "assistant", "content": response}
+            if pending is not None:
+                attach_background_answer(message, pending)
+            st.session_state.messages.append(message)
             
             # Sync the updated messages back to the session
             st.session_state.chat_sessions[st.session_state.current_session_id]['messages'] = st.session_state.messages
@@ -1702,6 +2282,11 @@ def main():
                     rename_chat_session(st.session_state.current_session_id, smart_name)
             
             st.rerun()
+        
+        # Poll until background answers have replaced any provisional messages
+        if any(message.get("provisional") for message in st.session_state.messages):
+            time.sleep(1)
+            st.rerun()
     
     elif st.session_state.current_page == "🧮 Calculators":
         # Calculator Section
@@ -1709,7 +2294,7 @@ def main():
         st.write("Professional clinical calculation tools for nursing practice")
         
         # Create tabs for different calculators
-        calc_tabs = st.tabs(["💧 Fluid Requirements", "💊 Medication Dosage", "🩸 IV Flow Rate", "📏 BMI Calculator", "🌡️ Paracetamol Dose", "❤️ Vital Signs Check"])
+        calc_tabs = st.tabs(["💧 Fluid Requirements", "💊 Medication Dosage", "🩸 IV Flow Rate", "📏 BMI Calculator", "🌡️ Paracetamol Dose", "❤️ Vital Signs Check", "📋 Ward List", "📈 Early Warning (PEWS)", "☠️ Paracetamol Overdose", "🚑 Resus Sheet"])
         
         with calc_tabs[0]:
             st.subheader("💧 Fluid Requirements Calculator")
@@ -1740,7 +2325,7 @@ def main():
                 med_weight = st.number_input("Patient weight (kg)", min_value=0.1, max_value=200.0, value=10.0, step=0.1, key="med_weight_main")
                 dose_per_kg = st.number_input("Dose per kg (mg/kg)", min_value=0.1, max_value=100.0, value=10.0, step=0.1, key="dose_per_kg_main")
                 if st.button("Calculate Dose", key="calc_dose_main"):
-                    total_dose = med_weight * dose_per_kg
+                    total_dose = calculators.medication_dose(med_weight, dose_per_kg)['total_mg']
                     with col2:
                         st.success(f"""
                         **Total Dose:** {total_dose:.1f} mg
@@ -1758,7 +2343,7 @@ def main():
                 volume = st.number_input("Volume (mL)", min_value=1, max_value=2000, value=100, step=1, key="volume_main")
                 time_hours = st.number_input("Time (hours)", min_value=0.5, max_value=24.0, value=1.0, step=0.5, key="time_main")
                 if st.button("Calculate Flow Rate", key="calc_flow_main"):
-                    flow_rate = volume / time_hours
+                    flow_rate = calculators.iv_flow_rate(volume, time_hours)['ml_per_hour']
                     with col2:
                         st.success(f"""
                         **Flow Rate:** {flow_rate:.1f} mL/hr
@@ -1776,21 +2361,9 @@ def main():
                 height_cm = st.number_input("Height (cm)", min_value=30, max_value=250, value=150, step=1, key="height_main")
                 bmi_weight = st.number_input("Weight (kg)", min_value=1.0, max_value=300.0, value=50.0, step=0.1, key="bmi_weight_main")
                 if st.button("Calculate BMI", key="calc_bmi_main"):
-                    height_m = height_cm / 100
-                    bmi = bmi_weight / (height_m ** 2)
-                    
-                    if bmi < 18.5:
-                        category = "Underweight"
-                        color = "blue"
-                    elif bmi < 25:
-                        category = "Normal weight"
-                        color = "green"
-                    elif bmi < 30:
-                        category = "Overweight"
-                        color = "orange"
-                    else:
-                        category = "Obese"
-                        color = "red"
+                    bmi_result = calculators.bmi(bmi_weight, height_cm)
+                    bmi = bmi_result['bmi']
+                    category = bmi_result['category']
                     
                     with col2:
                         st.success(f"""
@@ -1811,9 +2384,10 @@ def main():
                 para_weight = st.number_input("Patient weight (kg)", min_value=1.0, max_value=100.0, value=10.0, step=0.1, key="para_weight_main")
                 age_months = st.number_input("Age (months)", min_value=1, max_value=216, value=12, step=1, key="age_main")
                 if st.button("Calculate Paracetamol Dose", key="calc_para_main"):
-                    min_dose = para_weight * 10
-                    max_dose = para_weight * 15
-                    daily_max = para_weight * 60
+                    para_result = calculators.paracetamol_dose(para_weight, age_months)
+                    min_dose = para_result['min_dose_mg']
+                    max_dose = para_result['max_dose_mg']
+                    daily_max = para_result['daily_max_mg']
                     
                     with col2:
                         st.success(f"""
@@ -1836,29 +2410,18 @@ def main():
             
             col1, col2 = st.columns([1, 1])
             with col1:
-                vs_age = st.selectbox("Age Group", [
-                    "Neonate", "Infant (1m-1yr)", "Toddler (1-2yr)", 
-                    "Young child (2-7yr)", "Older child (7-12yr)", "Adult"
-                ], key="vs_age_main")
+                vs_age = st.selectbox("Age Group", list(vital_signs.VITAL_SIGN_RANGES), key="vs_age_main")
                 
                 hr_input = st.number_input("Heart Rate (bpm)", min_value=20, max_value=220, value=80, step=1, key="hr_main")
                 rr_input = st.number_input("Respiratory Rate (/min)", min_value=5, max_value=80, value=20, step=1, key="rr_main")
                 sbp_input = st.number_input("Systolic BP (mmHg)", min_value=30, max_value=200, value=100, step=1, key="sbp_main")
                 
                 if st.button("Check Vital Signs", key="calc_vitals_main"):
-                    ranges = {
-                        "Neonate": {"HR": (120, 180), "RR": (40, 60), "SBP": (60, 80)},
-                        "Infant (1m-1yr)": {"HR": (110, 160), "RR": (30, 40), "SBP": (70, 90)},
-                        "Toddler (1-2yr)": {"HR": (100, 150), "RR": (25, 35), "SBP": (80, 95)},
-                        "Young child (2-7yr)": {"HR": (95, 140), "RR": (25, 30), "SBP": (90, 110)},
-                        "Older child (7-12yr)": {"HR": (80, 120), "RR": (20, 25), "SBP": (100, 120)},
-                        "Adult": {"HR": (60, 100), "RR": (12, 20), "SBP": (90, 140)}
-                    }
-                    
-                    normal_range = ranges[vs_age]
-                    hr_status = "✅ Normal" if normal_range["HR"][0] <= hr_input <= normal_range["HR"][1] else "⚠️ Abnormal"
-                    rr_status = "✅ Normal" if normal_range["RR"][0] <= rr_input <= normal_range["RR"][1] else "⚠️ Abnormal"
-                    sbp_status = "✅ Normal" if normal_range["SBP"][0] <= sbp_input <= normal_range["SBP"][1] else "⚠️ Abnormal"
+                    vs_result = vital_signs.check_vitals(vs_age, hr_input, rr_input, sbp_input)
+                    normal_range = vs_result['ranges']
+                    hr_status = vs_result['checks']['HR']['status']
+                    rr_status = vs_result['checks']['RR']['status']
+                    sbp_status = vs_result['checks']['SBP']['status']
                     
                     with col2:
                         st.info(f"""
@@ -1873,6 +2436,124 @@ def main():
                         **SBP:** {sbp_input} mmHg {sbp_status}
                         Normal: {normal_range["SBP"][0]}-{normal_range["SBP"][1]} mmHg
                         """)
+            
+            with st.expander("📋 Screen a ward's observations (CSV)"):
+                st.caption("Columns: `age_months` plus any of `hr`, `rr` and `sbp`; every row is checked against its age band.")
+                obs_file = st.file_uploader("Upload observations (CSV)", type="csv", key="vs_screen_upload")
+                if obs_file is not None:
+                    try:
+                        screened = vital_signs.screen_observations(pd.read_csv(obs_file))
+                    except (ValueError, pd.errors.ParserError) as e:
+                        st.error(f"Could not read observations: {e}")
+                    else:
+                        flagged = int((screened["abnormal_count"] > 0).sum())
+                        st.info(f"{flagged} of {len(screened)} patients have at least one out-of-range vital sign")
+                        st.dataframe(screened.sort_values("abnormal_count", ascending=False), use_container_width=True)
+                        st.download_button("📤 Download screening results (CSV)", screened.to_csv(index=False),
+                                           file_name="vital_signs_screening.csv", mime="text/csv", key="vs_screen_results")
+        
+        with calc_tabs[6]:
+            st.subheader("📋 Ward List Calculator")
+            st.write("Upload a ward list to calculate maintenance fluids, paracetamol and weight-based doses for every patient at once")
+            
+            template = pd.DataFrame([["Bed 1", 12.5, 18, 15]], columns=calculators.WARD_LIST_COLUMNS)
+            st.download_button("📥 Download CSV template", template.to_csv(index=False),
+                               file_name="ward_list_template.csv", mime="text/csv", key="ward_template")
+            st.caption("Only `weight_kg` is required; `age_months` and `dose_per_kg` are optional.")
+            
+            ward_file = st.file_uploader("Upload ward list (CSV)", type="csv", key="ward_list_upload")
+            if ward_file is not None:
+                try:
+                    ward_results = calculators.calculate_ward_list(pd.read_csv(ward_file))
+                except (ValueError, pd.errors.ParserError) as e:
+                    st.error(f"Could not read ward list: {e}")
+                else:
+                    flagged = int((ward_results["check"] != "").sum())
+                    st.success(f"Calculated {len(ward_results)} patients")
+                    if flagged:
+                        st.warning(f"⚠️ {flagged} row(s) have a missing or invalid weight and were not calculated")
+                    st.dataframe(ward_results, use_container_width=True)
+                    st.download_button("📤 Download results (CSV)", ward_results.to_csv(index=False),
+                                       file_name="ward_list_results.csv", mime="text/csv", key="ward_results")
+            
+            st.warning("⚠️ Always verify dosing with current prescribing guidelines and consider patient-specific factors.")
+        
+        with calc_tabs[7]:
+            st.subheader("📈 Early Warning Score (PEWS)")
+            st.write("Record each new set of observations; the score and its trend update per patient")
+            pews_engine = get_shared_pews()
+            
+            col1, col2 = st.columns([1, 1])
+            with col1:
+                pews_patient = st.text_input("Patient / bed", value="Bed 1", key="pews_patient")
+                pews_age = st.number_input("Age (months)", min_value=0.0, max_value=216.0, value=12.0, step=1.0, key="pews_age")
+                pews_hr = st.number_input("Heart Rate (bpm)", min_value=20, max_value=250, value=120, step=1, key="pews_hr")
+                pews_rr = st.number_input("Respiratory Rate (/min)", min_value=5, max_value=100, value=30, step=1, key="pews_rr")
+                pews_sbp = st.number_input("Systolic BP (mmHg)", min_value=30, max_value=200, value=90, step=1, key="pews_sbp")
+                pews_spo2 = st.number_input("SpO2 (%)", min_value=50, max_value=100, value=98, step=1, key="pews_spo2")
+                pews_avpu = st.selectbox("AVPU", ["Alert", "Voice", "Pain", "Unresponsive"], key="pews_avpu")
+                if st.button("Record Observations", key="pews_record") and pews_patient.strip():
+                    pews_result = pews_engine.update(pews_patient.strip(), pews_age, hr=pews_hr, rr=pews_rr,
+                                                     sbp=pews_sbp, spo2=pews_spo2, avpu=pews_avpu)
+                    with col2:
+                        summary = f"""
+                        **Score:** {pews_result['score']} ({pews_result['band']})
+                        
+                        **Trend:** {' → '.join(str(score) for score in pews_result['trend'])}
+                        
+                        **Subscores:** {', '.join(f'{k} {v}' for k, v in pews_result['subscores'].items())}
+                        """
+                        if pews_result['flags']:
+                            st.error(summary + "\n**⚠️ " + "; ".join(pews_result['flags']) + "**")
+                        else:
+                            st.success(summary)
+            
+            ward_scores = pews_engine.ward()
+            if ward_scores:
+                st.markdown("**Ward overview** (flagged patients first)")
+                st.table([{"Patient": patient['patient_id'], "Band": patient['band'], "Score": patient['score'],
+                           "Previous": patient['previous_score'], "Peak": patient['peak_score'],
+                           "Flags": "; ".join(patient['flags']), "Sets": patient['observations']}
+                          for patient in ward_scores])
+            st.warning("⚠️ The score supports, not replaces, clinical judgement - escalate any concern per ward protocol.")
+        
+        with calc_tabs[8]:
+            st.subheader("☠️ Paracetamol Overdose & NAC")
+            st.write("Toxic thresholds, treatment line and the 2-bag IV NAC regimen from Section 01")
+            
+            col1, col2 = st.columns([1, 1])
+            with col1:
+                tox_weight = st.number_input("Patient weight (kg)", min_value=0.5, max_value=150.0, value=15.0, step=0.5, key="tox_weight")
+                tox_ingested = st.number_input("Amount ingested (g, 0 if unknown)", min_value=0.0, max_value=100.0, value=0.0, step=0.5, key="tox_ingested")
+                tox_hours = st.number_input("Hours since ingestion (0 if unknown)", min_value=0.0, max_value=48.0, value=0.0, step=0.5, key="tox_hours")
+                tox_level = st.number_input("Serum paracetamol level (mg/L, 0 if not available)", min_value=0.0, max_value=1000.0, value=0.0, step=1.0, key="tox_level")
+                if st.button("Assess", key="calc_tox_main"):
+                    assessment = toxicology.assess_ingestion(
+                        tox_weight,
+                        tox_ingested * 1000 if tox_ingested else None,
+                        tox_hours if tox_hours else None,
+                        tox_level if tox_level else None)
+                    with col2:
+                        st.info(toxicology.format_assessment(assessment))
+            
+            with st.expander("🖨️ Standard NAC chart (1-100 kg)"):
+                st.table(toxicology.nac_chart())
+            st.warning("⚠️ Check against your institution's NAC dilution chart and consult toxicology for massive ingestions.")
+        
+        with calc_tabs[9]:
+            st.subheader("🚑 Resuscitation Drug Sheet")
+            st.write("Weight-based emergency drug doses and CPR settings from Section 01, ready to print")
+            
+            resus_weight = st.select_slider("Patient weight (kg)", options=list(resus_sheet.STANDARD_WEIGHTS_KG), value=12, key="resus_band")
+            custom_weight = st.number_input("...or exact weight (kg, 0 to use the band above)", min_value=0.0, max_value=150.0, value=0.0, step=0.5, key="resus_weight")
+            sheet_text = resus_sheet.format_sheet(resus_sheet.resus_sheet(custom_weight or resus_weight))
+            st.markdown(sheet_text)
+            st.download_button("🖨️ Download sheet for printing", sheet_text, file_name=f"resus_sheet_{custom_weight or resus_weight:g}kg.md",
+                               mime="text/markdown", key="resus_download")
+            
+            with st.expander("🖨️ Wall chart for standard weights"):
+                st.table(resus_sheet.standard_chart())
+            st.warning("⚠️ Doses must be confirmed by the resuscitation team leader before administration.")
     
     elif st.session_state.current_page == "🎯 Quiz":
         # Combined Quiz Section
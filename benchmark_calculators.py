@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vectorised ward-list calculators against the scalar ones
+Checks that both give identical results for a synthetic ward of patients
+
+Usage: python benchmark_calculators.py --patients 10000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import calculators
+
+
+def scalar_pass(weights, ages, doses):
+    for weight, age, dose in zip(weights, ages, doses):
+        calculators.fluid_requirements(weight)
+        calculators.paracetamol_dose(weight, age)
+        calculators.medication_dose(weight, dose)
+
+
+def batch_pass(weights, ages, doses):
+    calculators.fluid_requirements_batch(weights)
+    calculators.paracetamol_dose_batch(weights, ages)
+    calculators.medication_dose_batch(weights, doses)
+
+
+def best_of(repeats, func, *args):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scalar vs vectorised calculator benchmark")
+    parser.add_argument("--patients", type=int, default=10000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    weights = np.round(rng.uniform(0.5, 80.0, args.patients), 1)
+    ages = rng.integers(0, 216, args.patients).astype(float)
+    doses = rng.choice([10.0, 15.0, 20.0, 25.0], args.patients)
+
+    # Results must match the scalar calculators exactly, not just approximately
+    fluids = calculators.fluid_requirements_batch(weights)
+    paracetamol = calculators.paracetamol_dose_batch(weights, ages)
+    dose_mg = calculators.medication_dose_batch(weights, doses)["total_mg"]
+    for i, (weight, age, dose) in enumerate(zip(weights.tolist(), ages.tolist(), doses.tolist())):
+        fluid = calculators.fluid_requirements(weight)
+        para = calculators.paracetamol_dose(weight, age)
+        assert fluids["daily_ml"][i] == fluid["daily_ml"] and fluids["hourly_ml"][i] == fluid["hourly_ml"], weight
+        assert paracetamol["max_dose_mg"][i] == para["max_dose_mg"], weight
+        assert dose_mg[i] == calculators.medication_dose(weight, dose)["total_mg"], weight
+    print(f"✅ Batch results identical to scalar results for {args.patients} patients")
+
+    scalar_s = best_of(args.repeats, scalar_pass, weights.tolist(), ages.tolist(), doses.tolist())
+    batch_s = best_of(args.repeats, batch_pass, weights, ages, doses)
+    print(f"Scalar:     {scalar_s * 1000:8.2f} ms")
+    print(f"Vectorised: {batch_s * 1000:8.2f} ms  ({scalar_s / batch_s:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
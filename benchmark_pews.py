@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Stream benchmark for the incremental PEWS engine
+Feeds a simulated ward's observation events through PEWSEngine.update and reports throughput
+
+Usage: python benchmark_pews.py --patients 500 --events 200000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from pews import PEWSEngine
+
+
+def simulated_events(patients: int, events: int, seed: int):
+    """Random-walk vitals per patient, generated up front so only scoring is timed"""
+    rng = np.random.default_rng(seed)
+    ages = rng.integers(0, 216, patients).astype(float)
+    ids = rng.integers(0, patients, events)
+    hr = np.clip(rng.normal(120, 25, events), 40, 230).round()
+    rr = np.clip(rng.normal(30, 8, events), 8, 80).round()
+    sbp = np.clip(rng.normal(95, 15, events), 40, 160).round()
+    spo2 = np.clip(rng.normal(97, 2.5, events), 70, 100).round()
+    return [(f"bed-{i}", float(ages[i]), float(h), float(r), float(s), float(o))
+            for i, h, r, s, o in zip(ids.tolist(), hr, rr, sbp, spo2)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental PEWS stream benchmark")
+    parser.add_argument("--patients", type=int, default=500)
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    events = simulated_events(args.patients, args.events, args.seed)
+    engine = PEWSEngine()
+    start = time.perf_counter()
+    for patient_id, age, hr, rr, sbp, spo2 in events:
+        engine.update(patient_id, age, hr=hr, rr=rr, sbp=sbp, spo2=spo2, timestamp=0.0)
+    elapsed = time.perf_counter() - start
+
+    stats = engine.stats()
+    print(f"{stats['observations']} observation sets for {stats['patients']} patients in {elapsed:.2f}s")
+    print(f"Throughput: {stats['observations'] / elapsed:,.0f} sets/s "
+          f"({elapsed / stats['observations'] * 1e6:.1f} µs per set), {stats['alerts']} flagged sets")
+
+
+if __name__ == "__main__":
+    main()
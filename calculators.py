@@ -0,0 +1,379 @@
+"""
+Deterministic clinical calculators
+Shared by chat, the Calculators tab and tests, so no calculation needs an LLM round-trip
+"""
+
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from vital_signs import VITAL_UNITS, band_for_age, band_for_text, check_vitals
+
+def fluid_requirements(weight_kg: float) -> Dict[str, float]:
+    """Maintenance fluids by the Holliday-Segar method (100/50/20 mL/kg/day, 4/2/1 mL/kg/hr)"""
+    if weight_kg <= 10:
+        daily_ml = weight_kg * 100
+        hourly_ml = weight_kg * 4
+    elif weight_kg <= 20:
+        daily_ml = 1000 + (weight_kg - 10) * 50
+        hourly_ml = 40 + (weight_kg - 10) * 2
+    else:
+        daily_ml = 1500 + (weight_kg - 20) * 20
+        hourly_ml = 60 + (weight_kg - 20) * 1
+
+    return {
+        "weight_kg": weight_kg,
+        "daily_ml": daily_ml,
+        "hourly_ml": hourly_ml,
+        "daily_liters": daily_ml / 1000
+    }
+
+
+def medication_dose(weight_kg: float, dose_per_kg: float) -> Dict[str, float]:
+    """Weight-based dose in mg"""
+    return {"weight_kg": weight_kg, "dose_per_kg": dose_per_kg, "total_mg": weight_kg * dose_per_kg}
+
+
+def iv_flow_rate(volume_ml: float, time_hours: float) -> Dict[str, float]:
+    """Infusion rate in mL/hr"""
+    return {"volume_ml": volume_ml, "time_hours": time_hours, "ml_per_hour": volume_ml / time_hours}
+
+
+def bmi(weight_kg: float, height_cm: float) -> Dict[str, Any]:
+    """Body Mass Index and adult category"""
+    height_m = height_cm / 100
+    value = weight_kg / (height_m ** 2)
+    if value < 18.5:
+        category, color = "Underweight", "blue"
+    elif value < 25:
+        category, color = "Normal weight", "green"
+    elif value < 30:
+        category, color = "Overweight", "orange"
+    else:
+        category, color = "Obese", "red"
+    return {"weight_kg": weight_kg, "height_cm": height_cm, "bmi": value, "category": category, "color": color}
+
+
+def paracetamol_dose(weight_kg: float, age_months: Optional[float] = None) -> Dict[str, Any]:
+    """Paracetamol 10-15 mg/kg every 4-6 hours, maximum 60 mg/kg/day"""
+    return {
+        "weight_kg": weight_kg,
+        "age_months": age_months,
+        "min_dose_mg": weight_kg * 10,
+        "max_dose_mg": weight_kg * 15,
+        "daily_max_mg": weight_kg * 60,
+        "frequency": "Every 4-6 hours"
+    }
+
+
+# --- Batch calculations for ward lists ------------------------------------------------------
+# Same arithmetic as the scalar functions, evaluated over whole arrays so a ward list of
+# thousands of patients is one pass; results match the scalar versions exactly
+
+def fluid_requirements_batch(weights_kg) -> Dict[str, np.ndarray]:
+    """Holliday-Segar maintenance fluids for an array of weights"""
+    weights = np.asarray(weights_kg, dtype=float)
+    bands = [weights <= 10, weights <= 20]
+    daily_ml = np.select(bands, [weights * 100, 1000 + (weights - 10) * 50], 1500 + (weights - 20) * 20)
+    hourly_ml = np.select(bands, [weights * 4, 40 + (weights - 10) * 2], 60 + (weights - 20) * 1)
+    return {"weight_kg": weights, "daily_ml": daily_ml, "hourly_ml": hourly_ml, "daily_liters": daily_ml / 1000}
+
+
+def medication_dose_batch(weights_kg, dose_per_kg) -> Dict[str, np.ndarray]:
+    """Weight-based doses in mg; dose_per_kg may be one value or one per patient"""
+    weights = np.asarray(weights_kg, dtype=float)
+    doses = np.broadcast_to(np.asarray(dose_per_kg, dtype=float), weights.shape)
+    return {"weight_kg": weights, "dose_per_kg": doses, "total_mg": weights * doses}
+
+
+def paracetamol_dose_batch(weights_kg, ages_months=None) -> Dict[str, np.ndarray]:
+    """Paracetamol single-dose range and daily maximum for an array of weights"""
+    weights = np.asarray(weights_kg, dtype=float)
+    ages = np.full(weights.shape, np.nan) if ages_months is None else np.asarray(ages_months, dtype=float)
+    return {
+        "weight_kg": weights,
+        "age_months": ages,
+        "min_dose_mg": weights * 10,
+        "max_dose_mg": weights * 15,
+        "daily_max_mg": weights * 60
+    }
+
+
+WARD_LIST_COLUMNS = ["patient", "weight_kg", "age_months", "dose_per_kg"]
+
+
+def calculate_ward_list(ward: pd.DataFrame) -> pd.DataFrame:
+    """Fluids, paracetamol and (where dose_per_kg is given) weight-based doses for every row
+
+    Only weight_kg is required. Rows with a missing or non-positive weight are kept and
+    flagged rather than dropped, so the downloaded sheet lines up with the uploaded one.
+    """
+    columns = {str(c).strip().lower(): c for c in ward.columns}
+    if "weight_kg" not in columns:
+        raise ValueError("Ward list needs a 'weight_kg' column")
+
+    result = ward.copy()
+    weights = pd.to_numeric(ward[columns["weight_kg"]], errors="coerce").to_numpy(dtype=float)
+    valid = weights > 0
+    weights = np.where(valid, weights, np.nan)
+    ages = pd.to_numeric(ward[columns["age_months"]], errors="coerce").to_numpy(dtype=float) \
+        if "age_months" in columns else None
+
+    fluids = fluid_requirements_batch(weights)
+    paracetamol = paracetamol_dose_batch(weights, ages)
+    result["maintenance_ml_per_day"] = fluids["daily_ml"]
+    result["maintenance_ml_per_hr"] = fluids["hourly_ml"]
+    result["paracetamol_min_mg"] = paracetamol["min_dose_mg"]
+    result["paracetamol_max_mg"] = paracetamol["max_dose_mg"]
+    result["paracetamol_daily_max_mg"] = paracetamol["daily_max_mg"]
+    if "dose_per_kg" in columns:
+        doses = pd.to_numeric(ward[columns["dose_per_kg"]], errors="coerce").to_numpy(dtype=float)
+        result["dose_mg"] = medication_dose_batch(weights, doses)["total_mg"]
+    result["check"] = np.where(valid, "", "⚠️ missing or invalid weight")
+    return result
+
+
+# --- Entity extraction ---------------------------------------------------------------------
+
+_NUMBER = r"(\d+(?:\.\d+)?)"
+
+# One compiled pattern; alternatives are ordered so "10 mg/kg" is read as a dose, not a weight
+_ENTITY_PATTERN = re.compile(
+    r"(?P<dose>" + _NUMBER + r"\s*(?P<dose_unit>mg|mcg|micrograms?|g)\s*(?:/|per)\s*kg\b)"
+    r"|(?P<weight>" + _NUMBER + r"\s*(?P<weight_unit>kg|kgs|kilos?|kilograms?|lbs?|pounds?|grams?|g)\b)"
+    r"|(?P<age>" + _NUMBER + r"[\s-]*(?P<age_unit>months?|mths?|mos?|years?|yrs?|y/o|weeks?|wks?|days?)\b)"
+    r"|(?P<volume>" + _NUMBER + r"\s*(?P<volume_unit>ml|millilit(?:re|er)s?|l|lit(?:re|er)s?)\b(?!\s*/))"
+    r"|(?P<time>" + _NUMBER + r"\s*(?P<time_unit>hours?|hrs?|h|minutes?|mins?)\b)"
+    r"|(?P<height>" + _NUMBER + r"\s*(?P<height_unit>cm|centimet(?:re|er)s?|m|met(?:re|er)s?)\b)"
+    r"|(?:\b(?:hr|heart rate|pulse)\s*(?:of|is|=|:)?\s*(?P<hr>\d+))"
+    r"|(?:\b(?:rr|resp(?:iratory)? rate)\s*(?:of|is|=|:)?\s*(?P<rr>\d+))"
+    r"|(?:\b(?:sbp|systolic(?: bp)?|bp|blood pressure)\s*(?:of|is|=|:)?\s*(?P<sbp>\d+)(?:\s*/\s*\d+)?)",
+    re.IGNORECASE
+)
+_NUMBER_RE = re.compile(_NUMBER)
+
+_WEIGHT_TO_KG = {"kg": 1.0, "kgs": 1.0, "kilo": 1.0, "kilos": 1.0, "kilogram": 1.0, "kilograms": 1.0,
+                 "lb": 0.45359237, "lbs": 0.45359237, "pound": 0.45359237, "pounds": 0.45359237,
+                 "g": 0.001, "gram": 0.001, "grams": 0.001}
+_DOSE_TO_MG = {"mg": 1.0, "mcg": 0.001, "microgram": 0.001, "micrograms": 0.001, "g": 1000.0}
+_QUANTITIES = ("dose", "weight", "age", "volume", "time", "height")
+_VITALS = ("hr", "rr", "sbp")
+
+
+def _age_to_months(value: float, unit: str) -> float:
+    if unit.startswith("y"):
+        return value * 12
+    if unit.startswith("w"):
+        return value * 12 / 52.18
+    if unit.startswith("d"):
+        return value / 30.44
+    return value
+
+
+def extract_entities(text: str) -> Dict[str, float]:
+    """Numeric clinical quantities in text, normalised to kg, months, mL, hours, cm and mg/kg
+
+    The first mention of each quantity wins.
+    """
+    entities: Dict[str, float] = {}
+    for match in _ENTITY_PATTERN.finditer(text):
+        vital = next((name for name in _VITALS if match.group(name)), None)
+        if vital:
+            entities.setdefault(vital, float(match.group(vital)))
+            continue
+
+        kind = next(name for name in _QUANTITIES if match.group(name))
+        value = float(_NUMBER_RE.match(match.group(kind)).group(1))
+        unit = match.group(f"{kind}_unit").lower()
+        if kind == "dose":
+            entities.setdefault("dose_per_kg", value * _DOSE_TO_MG[unit])
+        elif kind == "weight":
+            # Grams only describe body weight for babies ("3200 g"); "1 g" is a drug amount
+            if _WEIGHT_TO_KG[unit] == 0.001 and value < 200:
+                continue
+            entities.setdefault("weight_kg", round(value * _WEIGHT_TO_KG[unit], 2))
+        elif kind == "age":
+            entities.setdefault("age_months", _age_to_months(value, unit))
+        elif kind == "volume":
+            entities.setdefault("volume_ml", value * (1.0 if unit.startswith(("ml", "milli")) else 1000.0))
+        elif kind == "time":
+            entities.setdefault("time_hours", value / 60 if unit.startswith("m") else value)
+        elif kind == "height":
+            entities.setdefault("height_cm", value * (1.0 if unit.startswith("c") else 100.0))
+    return entities
+
+
+def extract_age_group(text: str, entities: Dict[str, float]) -> Optional[str]:
+    """Vital-sign age band from an explicit age, or from words such as 'toddler'"""
+    if "age_months" in entities:
+        return band_for_age(entities["age_months"])
+    return band_for_text(text)
+
+
+# --- Chat routing --------------------------------------------------------------------------
+
+# (calculator, trigger phrases, phrases that mean the question is not this calculation)
+_CALCULATOR_TRIGGERS = [
+    ("bmi", ("bmi", "body mass index"), ()),
+    ("paracetamol", ("paracetamol", "acetaminophen", "panadol"),
+     ("overdose", "toxic", "poison", "ingest", "nac", "acetylcysteine", "level")),
+    ("iv_rate", ("flow rate", "infusion rate", "drip rate", "iv rate", "ml/hr", "ml per hour", "run over"), ()),
+    ("fluid", ("fluid", "maintenance", "holliday"), ("bolus", "resuscitation")),
+    ("vital_signs", ("vital", "heart rate", "hr ", "pulse", "respiratory rate", "rr ", "blood pressure", "sbp"), ()),
+    ("dose", ("dose", "dosage", "mg/kg", "mg per kg", "mcg/kg", "mcg per kg"), ("overdose", "toxic", "poison")),
+]
+
+_CALCULATION_WORDS = ("calculate", "calculation", "how much", "how many", "work out", "what rate")
+# "<drug> dose for 12 kg" asks what the guideline dose is, so the dose calculator needs the
+# dose per kg given or an explicit request to calculate it
+_DOSE_CALCULATION_WORDS = ("calculate", "calculation", "work out")
+
+_REQUIRED_INPUTS = {
+    "fluid": ["weight_kg"],
+    "dose": ["weight_kg", "dose_per_kg"],
+    "iv_rate": ["volume_ml", "time_hours"],
+    "bmi": ["weight_kg", "height_cm"],
+    "paracetamol": ["weight_kg"],
+    "vital_signs": ["age_group"],
+}
+
+_INPUT_LABELS = {
+    "weight_kg": "the patient's weight (e.g. *12 kg*)",
+    "dose_per_kg": "the dose per kg (e.g. *15 mg/kg*)",
+    "volume_ml": "the volume to infuse (e.g. *500 mL*)",
+    "time_hours": "the infusion time (e.g. *4 hours*)",
+    "height_cm": "the patient's height (e.g. *120 cm*)",
+    "age_group": "the patient's age (e.g. *18 months* or *toddler*)",
+}
+
+
+def detect_calculator(text: str, entities: Optional[Dict[str, float]] = None) -> Optional[str]:
+    """Which calculator a chat question is asking for, or None if it is not a calculation"""
+    lowered = f"{text.lower()} "
+    entities = extract_entities(text) if entities is None else entities
+    for name, triggers, excludes in _CALCULATOR_TRIGGERS:
+        if name == "iv_rate" and ("rate" in lowered or " over " in lowered) \
+                and "volume_ml" in entities and "time_hours" in entities:
+            return name  # "what rate for 500 mL over 4 hours?"
+        if not any(t in lowered for t in triggers) or any(e in lowered for e in excludes):
+            continue
+        if name == "vital_signs":
+            # Only a check when actual readings were given; otherwise it's a knowledge question
+            if any(k in entities for k in ("hr", "rr", "sbp")):
+                return name
+            continue
+        if name == "dose":
+            if "dose_per_kg" in entities or any(w in lowered for w in _DOSE_CALCULATION_WORDS):
+                return name
+            continue
+        # Explicit request wording or the numbers needed for it
+        if any(w in lowered for w in _CALCULATION_WORDS) or any(k in entities for k in _REQUIRED_INPUTS[name]):
+            return name
+    return None
+
+
+_CALCULATORS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "fluid": lambda e: fluid_requirements(e["weight_kg"]),
+    "dose": lambda e: medication_dose(e["weight_kg"], e["dose_per_kg"]),
+    "iv_rate": lambda e: iv_flow_rate(e["volume_ml"], e["time_hours"]),
+    "bmi": lambda e: bmi(e["weight_kg"], e["height_cm"]),
+    "paracetamol": lambda e: paracetamol_dose(e["weight_kg"], e.get("age_months")),
+    "vital_signs": lambda e: check_vitals(e["age_group"], e.get("hr"), e.get("rr"), e.get("sbp")),
+}
+
+
+def run_calculation(text: str, calculator: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Detect, extract and calculate; returns None if the text is not a calculation request
+
+    The result dict has 'calculator', 'inputs', 'missing' (input names still needed) and
+    'result' (None while inputs are missing).
+    """
+    entities = extract_entities(text)
+    calculator = calculator or detect_calculator(text, entities)
+    if calculator is None:
+        return None
+
+    inputs = dict(entities)
+    if calculator == "vital_signs":
+        age_group = extract_age_group(text, entities)
+        if age_group:
+            inputs["age_group"] = age_group
+
+    # A zero or negative amount ("over 0 hours", "0 cm") is asked for again rather than divided by
+    missing = [name for name in _REQUIRED_INPUTS[calculator]
+               if name not in inputs or (isinstance(inputs[name], (int, float)) and inputs[name] <= 0)]
+    result = None if missing else _CALCULATORS[calculator](inputs)
+    return {"calculator": calculator, "inputs": inputs, "missing": missing, "result": result}
+
+
+def format_missing_inputs(calculation: Dict[str, Any]) -> str:
+    """Ask the nurse for the inputs a calculation still needs"""
+    titles = {"fluid": "fluid requirements", "dose": "that dose", "iv_rate": "the IV flow rate",
+              "bmi": "the BMI", "paracetamol": "the paracetamol dose", "vital_signs": "those vital signs"}
+    needed = " and ".join(_INPUT_LABELS[name] for name in calculation["missing"])
+    answer = f"I can work out {titles[calculation['calculator']]} straight away - I just need {needed}."
+    if calculation["calculator"] == "fluid":
+        answer += """
+
+**Here's a quick reminder of the Holliday-Segar Method:**
+• First 10 kg: 100 mL/kg/day (4 mL/kg/hr)
+• Next 10 kg: 50 mL/kg/day (2 mL/kg/hr)
+• Each kg >20 kg: 20 mL/kg/day (1 mL/kg/hr)"""
+    return answer
+
+
+def format_result(calculation: Dict[str, Any]) -> str:
+    """Chat answer for a completed calculation"""
+    name, r = calculation["calculator"], calculation["result"]
+    if name == "fluid":
+        return f"""Great question! Let me calculate those fluid requirements for your {r['weight_kg']:g} kg patient. 💧
+
+**Here's what I found:**
+• **Daily requirement:** {r['daily_ml']:.0f} mL ({r['daily_liters']:.1f} L)
+• **Hourly rate:** {r['hourly_ml']:.1f} mL/hr
+
+*I used the Holliday-Segar method for this calculation*
+
+**Clinical reminders:** 🏥
+- Please adjust these numbers based on the patient's clinical condition, fever, or ongoing losses
+- Don't forget to monitor electrolytes and renal function regularly
+- Consider whether you need maintenance fluids vs. replacement therapy
+- Always double-check with the physician's orders"""
+    if name == "dose":
+        return f"""• **Total dose:** {r['total_mg']:.1f} mg
+• **Calculation:** {r['weight_kg']:g} kg × {r['dose_per_kg']:g} mg/kg = {r['total_mg']:.1f} mg
+• Check the maximum dose for this drug and double-check with a second nurse"""
+    if name == "iv_rate":
+        return f"""• **Flow rate:** {r['ml_per_hour']:.1f} mL/hr
+• **Calculation:** {r['volume_ml']:g} mL ÷ {r['time_hours']:g} hours = {r['ml_per_hour']:.1f} mL/hr"""
+    if name == "bmi":
+        return f"""• **BMI:** {r['bmi']:.1f} ({r['category']})
+• Height {r['height_cm']:g} cm, weight {r['weight_kg']:g} kg
+• For children, interpret BMI on age- and sex-specific centile charts"""
+    if name == "paracetamol":
+        return f"""• **Single dose:** {r['min_dose_mg']:.0f} - {r['max_dose_mg']:.0f} mg (10-15 mg/kg)
+• **Frequency:** {r['frequency']}
+• **Daily maximum:** {r['daily_max_mg']:.0f} mg (60 mg/kg/day)
+• Always verify dosing with current prescribing guidelines"""
+    if name == "vital_signs":
+        lines = [f"• **{vital}:** {check['value']:g} {VITAL_UNITS[vital]} {check['status']} "
+                 f"(normal {check['range'][0]}-{check['range'][1]} {VITAL_UNITS[vital]})"
+                 for vital, check in r["checks"].items()]
+        return f"**Assessment for {r['age_group']}:**\n" + "\n".join(lines)
+    raise ValueError(f"Unknown calculator {name}")
+
+
+def answer_calculation(text: str) -> Optional[str]:
+    """Deterministic chat answer for a calculation question, or None if it isn't one"""
+    calculation = run_calculation(text)
+    if calculation is None:
+        return None
+    if calculation["missing"]:
+        return format_missing_inputs(calculation)
+    return format_result(calculation)
+
+
+def available_calculators() -> List[str]:
+    return list(_CALCULATORS)
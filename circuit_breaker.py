@@ -0,0 +1,103 @@
+"""
+Circuit breaker for the LLM backend
+Stops sending questions to a host that keeps failing and probes it in the background
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open background probe -> closed
+
+    While open (and while the half-open probe runs) allow_request() returns False so
+    callers can answer from the knowledge base immediately instead of waiting on timeouts.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0,
+                 probe: Optional[Callable[[], bool]] = None, name: str = "llm"):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe = probe
+        self.name = name
+
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.short_circuited = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """True if a real request may be sent to the backend"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                if self.probe is None:
+                    # No background probe available - let this one request through as the trial
+                    self.state = self.HALF_OPEN
+                    return True
+                self.state = self.HALF_OPEN
+                threading.Thread(target=self._run_probe, name=f"{self.name}-breaker-probe", daemon=True).start()
+
+            self.short_circuited += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit '{self.name}' closed - backend healthy again")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or (
+                    self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold):
+                self._trip()
+
+    def _trip(self):
+        # Caller holds the lock
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        logger.warning(f"Circuit '{self.name}' opened after {self.consecutive_failures} consecutive failures; "
+                       f"using knowledge base fallback for {self.reset_timeout:.0f}s")
+
+    def _run_probe(self):
+        try:
+            healthy = self.probe()
+        except Exception as e:
+            logger.warning(f"Circuit '{self.name}' probe error: {e}")
+            healthy = False
+
+        if healthy:
+            self.record_success()
+        else:
+            with self._lock:
+                self._trip()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current state for the admin panel"""
+        with self._lock:
+            retry_in = 0.0
+            if self.state == self.OPEN:
+                retry_in = max(self.reset_timeout - (time.monotonic() - self.opened_at), 0.0)
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "trips": self.trips,
+                "short_circuited": self.short_circuited,
+                "retry_in_s": retry_in
+            }
@@ -0,0 +1,132 @@
+"""
+Rolling conversation state
+Each chat keeps a small summary - patient facts (age, weight, presenting problem), the
+last few questions and the gist of the last answer - stored on its messages and extended
+one turn at a time, so the history sent to the LLM stays the same small size however
+long the conversation runs
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import calculators
+
+# Messages carry the state folded up to and including them under this key
+STATE_KEY = "conversation_state"
+
+MAX_TOPICS = 3
+MAX_PROBLEMS = 3
+TOPIC_CHARS = 60
+ANSWER_CHARS = 160
+
+_PROBLEM_RE = re.compile(
+    r"\b(?:presenting with|presents with|presented with|admitted (?:with|for)|came in with|"
+    r"complaining of|c/o|history of|diagnosed with|known)\s+([^.?!;\n]{3,60})", re.IGNORECASE)
+PROBLEM_WORDS = (
+    "fever", "seizure", "fitting", "bronchiolitis", "asthma", "croup", "pneumonia", "sepsis", "shock",
+    "dehydration", "vomiting", "diarrhoea", "gastroenteritis", "anaphylaxis", "overdose", "poisoning",
+    "head injury", "burns", "dka", "diabetic ketoacidosis", "hypoglycaemia", "cardiac arrest",
+    "respiratory distress", "apnoea", "jaundice", "meningitis", "rash", "abdominal pain",
+)
+_PROBLEM_WORDS_RE = re.compile(r"\b(" + "|".join(re.escape(w) for w in PROBLEM_WORDS) + r")\b", re.IGNORECASE)
+
+
+def new_state() -> Dict[str, Any]:
+    return {"messages": 0, "age_months": None, "weight_kg": None, "problems": [], "topics": [], "last_answer": ""}
+
+
+def _gist(text: str, limit: int, question: bool = False) -> str:
+    # One sentence without markdown - the first, or for a user message the question asked - cut at a word boundary
+    text = re.sub(r"[*_#>`•]+", " ", text)
+    sentences = re.split(r"(?<=[.!?])\s", " ".join(text.split()))
+    asked = [s for s in sentences if s.endswith("?")] if question else []
+    sentence = (asked or sentences)[-1 if asked else 0].rstrip(" .")
+    if len(sentence) <= limit:
+        return sentence
+    return sentence[:limit].rsplit(" ", 1)[0] + "..."
+
+
+def fold_message(state: Dict[str, Any], message: Dict[str, Any]) -> Dict[str, Any]:
+    """State after one more message; facts come from the user's words, the gist from answers"""
+    state = dict(state, messages=state["messages"] + 1)
+    content = str(message.get("content", ""))
+    if message.get("role") != "user":
+        state["last_answer"] = _gist(content, ANSWER_CHARS)
+        return state
+
+    entities = calculators.extract_entities(content)
+    # The newest value wins, so a correction ("sorry, 14 kg") replaces the earlier one
+    for fact in ("age_months", "weight_kg"):
+        if entities.get(fact):
+            state[fact] = entities[fact]
+    # Known problems by name; a free-text "presenting with ..." only when it names none of them
+    problems = [m.group(1).lower() for m in _PROBLEM_WORDS_RE.finditer(content)]
+    problems += [p for p in (m.group(1).strip().lower() for m in _PROBLEM_RE.finditer(content))
+                 if not any(known in p for known in problems)]
+    merged = [p for p in state["problems"] if not any(p in q or q in p for q in problems)] + problems
+    state["problems"] = list(dict.fromkeys(merged))[-MAX_PROBLEMS:]
+    state["topics"] = (state["topics"] + [_gist(content, TOPIC_CHARS, question=True)])[-MAX_TOPICS:]
+    return state
+
+
+def state_for(messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """State covering every message, resuming from the newest stored state rather than the start"""
+    state = new_state()
+    for message in reversed(messages):
+        stored = message.get(STATE_KEY)
+        if stored and stored.get("messages", 0) <= len(messages):
+            state = stored
+            break
+    for message in messages[state["messages"]:]:
+        state = fold_message(state, message)
+    return state
+
+
+def split_turn(user_input: str, messages: Optional[List[Dict[str, Any]]]) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """The nurse's message asking user_input and the messages before it
+
+    The question is the newest user message, wherever it is in the list (a provisional
+    answer may already follow it); None when that message is not this question.
+    """
+    messages = list(messages or [])
+    for i in range(len(messages) - 1, -1, -1):
+        if messages[i].get("role") == "user":
+            if messages[i].get("content") == user_input:
+                return messages[i], messages[:i]
+            break
+    return None, messages
+
+
+def remember_turn(earlier: List[Dict[str, Any]], question: Dict[str, Any], answer: str):
+    """Fold a question and its answer onto earlier, storing the result on the question's message"""
+    question[STATE_KEY] = state_for(list(earlier) + [question, {"role": "assistant", "content": answer}])
+
+
+def _age(months: float) -> str:
+    if months < 1:
+        return f"{months * 30.4:.0f} days"
+    if months < 24:
+        return f"{months:g} months"
+    return f"{months / 12:g} years"
+
+
+def summary_text(state: Dict[str, Any]) -> str:
+    """The summary as one short paragraph, or "" before anything has been said"""
+    parts = []
+    patient = [text for text in (
+        _age(state["age_months"]) + " old" if state["age_months"] else "",
+        f"{state['weight_kg']:g} kg" if state["weight_kg"] else "",
+        "presenting with " + ", ".join(state["problems"]) if state["problems"] else "") if text]
+    if patient:
+        parts.append("Patient: " + ", ".join(patient) + ".")
+    if state["topics"]:
+        parts.append("Earlier questions: " + "; ".join(state["topics"]) + ".")
+    if state["last_answer"]:
+        parts.append("Last answer: " + state["last_answer"].rstrip(".") + ".")
+    return " ".join(parts)
+
+
+def history_messages(state: Optional[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """The conversation so far as a single short system message for the prompt"""
+    text = summary_text(state) if state else ""
+    return [{"role": "system", "content": "Conversation so far - " + text}] if text else []
@@ -0,0 +1,231 @@
+"""
+Fuzzy drug-name index
+A SymSpell-style deletion index over canonical drug names and their synonyms resolves
+misspelt or brand/international names ("paracetemol", "acetaminophen", "adrenalin") to the
+canonical name with a few dictionary lookups, so queries can be rewritten before routing.
+A correction is only made when one drug is clearly meant; other real drugs are never rewritten
+"""
+
+import logging
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z][a-z-]*[a-z]")
+
+# Words written next to a dose or route in the knowledge base, e.g. "IV Atropine" or "Fomepizole 15 mg/kg"
+_KB_DRUG_RE = re.compile(
+    r"\b(?:IV|IM|PO|SC|IO|ET|oral|nebulised|intranasal)\s+([A-Za-z][a-z]{4,})\b"
+    r"|\b([A-Za-z][a-z]{4,})\s+\d+(?:\.\d+)?(?:\s*[–-]\s*\d+(?:\.\d+)?)?\s*(?:mg|mcg|g|ml|mmol|units?)\s*/\s*kg\b")
+_DRUG_SUFFIXES = ("ine", "ol", "am", "ide", "one", "ate", "cillin", "mycin", "azole", "oxime", "amine", "gon",
+                  "lin", "pine", "fen")
+_NOT_DRUGS = {"dose", "doses", "bolus", "infusion", "fluids", "medication", "saline", "solution", "oxygen",
+              "therapy", "followed", "orally", "hydrochloride", "chloride", "disodium", "titrate", "volume"}
+
+
+def max_edit_distance(word: str) -> int:
+    """Short words are only matched exactly; longer words tolerate one or two typos"""
+    if len(word) <= 4:
+        return 0
+    return 1 if len(word) <= 7 else 2
+
+
+def correction_note(matches: List[Dict[str, Any]]) -> str:
+    """"Did you mean" note for the LLM about every drug name that was read as a different one"""
+    notes = []
+    for match in matches:
+        if match["text"].lower() == match["canonical"]:
+            continue
+        if match["distance"]:
+            notes.append(f'"{match["text"]}" was read as {match["canonical"]} (did you mean {match["canonical"]}?)')
+        else:
+            notes.append(f'"{match["text"]}" is {match["canonical"]}')
+    if not notes:
+        return ""
+    return ("Drug names in the question: " + "; ".join(notes) + ". If the nurse may have meant a different "
+            "drug, say which drug the answer is about and ask them to confirm.")
+
+
+def _deletes(word: str, distance: int) -> Set[str]:
+    results = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        results |= frontier
+    return results
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (Damerau-Levenshtein with adjacent swaps), capped at limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class DrugIndex:
+    """Canonical drug names, synonyms and a deletion index for typo-tolerant lookup
+
+    known_words are ordinary words from the knowledge base; they are never "corrected"
+    into a drug name, which keeps e.g. "doses" or "infusion" from being rewritten.
+    other_drugs are real drugs outside the index: never rewritten themselves, and a word
+    as close to one of them as to an indexed name is left alone as ambiguous. Typos of
+    more than one edit are only corrected when no other drug is within three edits.
+    """
+
+    def __init__(self, drugs: Dict[str, List[str]], known_words: Iterable[str] = (),
+                 frequencies: Optional[Dict[str, int]] = None, other_drugs: Iterable[str] = ()):
+        self.canonical: Dict[str, str] = {}
+        for name, synonyms in drugs.items():
+            for surface in [name] + list(synonyms or []):
+                self.canonical[str(surface).lower()] = str(name).lower()
+        self.frequencies = frequencies or {}
+        self.other_drugs = {str(w).lower() for w in other_drugs} - set(self.canonical)
+        self.known_words = {w for w in known_words if w not in self.canonical} | self.other_drugs
+
+        # Multi-word names ("magnesium sulfate") are matched as exact phrases, longest first
+        phrases = sorted((s for s in self.canonical if " " in s), key=len, reverse=True)
+        self._phrase_re = re.compile(r"\b(?:" + "|".join(re.escape(p) for p in phrases) + r")\b") if phrases else None
+
+        self._single_words = {s for s in set(self.canonical) | self.other_drugs if " " not in s}
+        self._deletes: Dict[str, Set[str]] = {}
+        for surface in self._single_words:
+            for deleted in _deletes(surface, max_edit_distance(surface)):
+                self._deletes.setdefault(deleted, set()).add(surface)
+
+        self.lookups = 0
+        self.corrections = 0
+        self.ambiguous = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_knowledge_base(cls, texts: Iterable[str], path: str = "drug_names.yaml") -> "DrugIndex":
+        """Index the curated names plus drug names found next to doses and routes in the KB"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = yaml.safe_load(f) or {}
+            drugs = dict(data.get("drugs", {}))
+            other_drugs = list(data.get("other_drugs", []))
+        except (OSError, yaml.YAMLError) as e:
+            logger.error(f"Could not load drug names from {path}: {e}")
+            drugs, other_drugs = {}, []
+
+        surfaces = {s.lower() for name, synonyms in drugs.items() for s in [name] + list(synonyms or [])}
+        words: Counter = Counter()
+        found = 0
+        for text in texts:
+            words.update(_TOKEN_RE.findall(text.lower()))
+            for match in _KB_DRUG_RE.finditer(text):
+                name = (match.group(1) or match.group(2)).lower()
+                if name not in surfaces and name not in _NOT_DRUGS and name.endswith(_DRUG_SUFFIXES):
+                    drugs[name] = []
+                    surfaces.add(name)
+                    found += 1
+        index = cls(drugs, known_words=words, frequencies=dict(words), other_drugs=other_drugs)
+        logger.info(f"Drug index built with {len(index.canonical)} names ({found} found in the knowledge base)")
+        return index
+
+    def lookup(self, word: str) -> Optional[Dict[str, Any]]:
+        """Canonical drug for one word, allowing typos; None if it is not a drug name"""
+        word = word.lower()
+        with self._lock:
+            self.lookups += 1
+        if word in self.canonical:
+            return {"term": word, "canonical": self.canonical[word], "distance": 0}
+        limit = max_edit_distance(word)
+        if limit == 0 or word in self.known_words:
+            return None
+
+        candidates: Set[str] = set()
+        for deleted in _deletes(word, limit):
+            candidates |= self._deletes.get(deleted, set())
+        by_distance: Dict[int, Set[str]] = {}
+        for term in candidates:
+            term_limit = min(limit, max_edit_distance(term))
+            distance = edit_distance(word, term, term_limit)
+            if distance <= term_limit:
+                by_distance.setdefault(distance, set()).add(term)
+        if not by_distance:
+            return None
+        distance = min(by_distance)
+        nearest = set(by_distance[distance])
+        if distance == 2:
+            # Two edits is only a clear typo with no other drug within three
+            nearest |= {term for term in self._single_words if edit_distance(word, term, 3) <= 3}
+        drugs = {self.canonical.get(term, term) for term in nearest}
+        if len(drugs) > 1 or nearest & self.other_drugs:
+            # "ampicilin" could be ampicillin as easily as amoxicillin - better uncorrected than wrong
+            with self._lock:
+                self.ambiguous += 1
+            logger.info(f"Drug name {word!r} left uncorrected, could be any of: {', '.join(sorted(drugs))}")
+            return None
+        term = min(by_distance[distance], key=lambda t: (-self.frequencies.get(t, 0), t))
+        return {"term": term, "canonical": self.canonical[term], "distance": distance}
+
+    def find(self, text: str) -> List[Dict[str, Any]]:
+        """Every drug mentioned in text with its span, canonical name and edit distance"""
+        lowered = text.lower()
+        matches = []
+        taken = []
+        if self._phrase_re is not None:
+            for m in self._phrase_re.finditer(lowered):
+                matches.append({"start": m.start(), "end": m.end(), "text": text[m.start():m.end()],
+                                "term": m.group(0), "canonical": self.canonical[m.group(0)], "distance": 0})
+                taken.append((m.start(), m.end()))
+        for m in _TOKEN_RE.finditer(lowered):
+            if any(start <= m.start() < end for start, end in taken):
+                continue
+            found = self.lookup(m.group(0))
+            if found:
+                matches.append(dict(found, start=m.start(), end=m.end(), text=text[m.start():m.end()]))
+        return sorted(matches, key=lambda match: match["start"])
+
+    def canonicalize(self, text: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """Text with every drug name replaced by its canonical name, and the matches found"""
+        matches = self.find(text)
+        rewritten = text
+        for match in reversed(matches):
+            if match["text"].lower() != match["canonical"]:
+                rewritten = rewritten[:match["start"]] + match["canonical"] + rewritten[match["end"]:]
+        changed = [m for m in matches if m["text"].lower() != m["canonical"]]
+        if changed:
+            with self._lock:
+                self.corrections += 1
+            logger.info(f"Drug names resolved: {', '.join(m['text'] + ' -> ' + m['canonical'] for m in changed)}")
+        return rewritten, matches
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"names": len(self.canonical), "lookups": self.lookups, "corrections": self.corrections,
+                    "ambiguous": self.ambiguous}
+
+
+_shared_indexes: Dict[Tuple[str, str], DrugIndex] = {}
+_shared_indexes_lock = threading.Lock()
+
+
+def get_shared_drug_index(texts: Iterable[str], kb_version: str, path: str = "drug_names.yaml") -> DrugIndex:
+    """Process-wide index per knowledge base version, so it is built once rather than per session"""
+    key = (path, kb_version)
+    with _shared_indexes_lock:
+        index = _shared_indexes.get(key)
+        if index is None:
+            index = DrugIndex.from_knowledge_base(texts, path)
+            _shared_indexes[key] = index
+        return index
@@ -0,0 +1,163 @@
+"""
+Table-driven fast-path answers
+Rules from a versioned YAML file are compiled into one regex; a single scan of the
+question finds every trigger phrase, then the first matching rule in the stage wins.
+A rule may name a generator instead of a fixed answer, so reference data such as
+vital sign ranges comes from one table rather than being copied into answer text
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+import vital_signs
+from query_normalizer import normalize_query
+
+logger = logging.getLogger(__name__)
+
+
+# Rules with `generate: <name>` build their answer from the question with these
+GENERATORS = {
+    "vital_signs": vital_signs.reference_answer,
+}
+
+
+class FastPathEngine:
+    """Compiled matcher over the rules in a fast-path data file, with per-rule hit counters"""
+
+    STAGES = ("fast_path", "fallback")
+
+    def __init__(self, path: str = "fast_paths.yaml", reload_interval: float = 5.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.version = None
+        self.rules: List[Dict[str, Any]] = []
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {stage: 0 for stage in self.STAGES}
+        self._matcher: Optional[re.Pattern] = None
+        self._implied: Dict[str, frozenset] = {}
+        self._mtime = 0.0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def _phrases(values) -> List[str]:
+        # Phrases are normalised like questions, so "newborn" in the file also matches "neonatal"
+        return [normalize_query(str(v)) for v in (values or []) if str(v).strip()]
+
+    def load(self):
+        """(Re)load and compile the rules file; keeps the previous rules if the file is invalid"""
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = yaml.safe_load(f) or {}
+            rules = []
+            for index, rule in enumerate(data.get("rules", [])):
+                stage = rule.get("stage", "fast_path")
+                if stage not in self.STAGES:
+                    raise ValueError(f"rule {rule.get('id', index)} has unknown stage '{stage}'")
+                generate = rule.get("generate")
+                if generate is not None and generate not in GENERATORS:
+                    raise ValueError(f"rule {rule.get('id', index)} has unknown generator '{generate}'")
+                rules.append({
+                    "id": str(rule.get("id", f"rule_{index}")),
+                    "stage": stage,
+                    "any": self._phrases(rule.get("any")),
+                    "requires": self._phrases(rule.get("requires")),
+                    "default": bool(rule.get("default", False)),
+                    "generate": generate,
+                    "answer": str(rule.get("answer", "")).strip("\n")
+                })
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            logger.error(f"Could not load fast paths from {self.path}: {e}")
+            return
+
+        # Longest phrases first so a lookahead reports the longest phrase starting at each position;
+        # shorter phrases contained in it are implied rather than scanned for separately
+        phrases = sorted({p for rule in rules for p in rule["any"] + rule["requires"]}, key=len, reverse=True)
+        matcher = re.compile("(?=(" + "|".join(re.escape(p) for p in phrases) + "))") if phrases else None
+        implied = {p: frozenset(q for q in phrases if q in p) for p in phrases}
+
+        with self._lock:
+            self.rules = rules
+            self.version = data.get("version")
+            self._matcher = matcher
+            self._implied = implied
+            self._mtime = mtime
+            self.hits = {rule["id"]: self.hits.get(rule["id"], 0) for rule in rules}
+        logger.info(f"Loaded fast paths v{self.version} ({len(rules)} rules, {len(phrases)} phrases) from {self.path}")
+
+    def _reload_if_changed(self):
+        # Clinical leads edit the data file in place; pick up changes without a restart
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        try:
+            if os.path.getmtime(self.path) != self._mtime:
+                self.load()
+        except OSError:
+            pass
+
+    def phrases_in(self, text: str) -> frozenset:
+        """Every trigger phrase that occurs in text, found in one regex scan"""
+        matcher = self._matcher
+        if matcher is None:
+            return frozenset()
+        found = set()
+        for match in matcher.finditer(normalize_query(text)):
+            found |= self._implied[match.group(1)]
+        return frozenset(found)
+
+    def match(self, text: str, stage: str = "fast_path") -> Optional[Dict[str, Any]]:
+        """First rule in stage matching text, or None; counts the hit"""
+        self._reload_if_changed()
+        found = self.phrases_in(text)
+        with self._lock:
+            for rule in self.rules:
+                if rule["stage"] != stage:
+                    continue
+                if rule["default"] or (found.intersection(rule["any"]) and
+                                       (not rule["requires"] or found.intersection(rule["requires"]))):
+                    self.hits[rule["id"]] += 1
+                    return rule
+            self.misses[stage] += 1
+        return None
+
+    def answer(self, text: str, stage: str = "fast_path") -> Optional[str]:
+        rule = self.match(text, stage)
+        if rule is None:
+            return None
+        if rule["generate"]:
+            return GENERATORS[rule["generate"]](text)
+        return rule["answer"]
+
+    def stats(self) -> Dict[str, Any]:
+        """Version, per-rule hits and per-stage misses for the admin panel"""
+        with self._lock:
+            return {
+                "version": self.version,
+                "rules": [{"id": rule["id"], "stage": rule["stage"], "hits": self.hits.get(rule["id"], 0)}
+                          for rule in self.rules],
+                "misses": dict(self.misses)
+            }
+
+
+_shared_engines: Dict[str, FastPathEngine] = {}
+_shared_engines_lock = threading.Lock()
+
+
+def get_shared_engine(path: str = "fast_paths.yaml") -> FastPathEngine:
+    """Process-wide engine per data file, so hit counters cover every session"""
+    with _shared_engines_lock:
+        engine = _shared_engines.get(path)
+        if engine is None:
+            engine = FastPathEngine(path)
+            _shared_engines[path] = engine
+        return engine
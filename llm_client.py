@@ -0,0 +1,298 @@
+"""
+Pooled HTTP client for OpenAI-compatible chat completion endpoints
+Keeps keep-alive connections open across questions and Streamlit sessions
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+# Time spent in connect() (TCP + TLS handshake) by the current thread's request
+_connect_timing = threading.local()
+
+
+def _add_connect_time(seconds: float):
+    _connect_timing.seconds = getattr(_connect_timing, 'seconds', 0.0) + seconds
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _add_connect_time(time.perf_counter() - start)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _add_connect_time(time.perf_counter() - start)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled connections record how long connection setup takes"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool
+        }
+
+
+class LatencyStats:
+    """Rolling window of LLM request timings, split into connection setup and generation"""
+
+    def __init__(self, window: int = 200):
+        self._records = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.total_requests = 0
+
+    def record(self, connect_s: float, total_s: float, status: Optional[int], first_token_s: Optional[float] = None):
+        with self._lock:
+            self.total_requests += 1
+            self._records.append({
+                "connect_ms": connect_s * 1000,
+                "generation_ms": max(total_s - connect_s, 0.0) * 1000,
+                "total_ms": total_s * 1000,
+                "first_token_ms": first_token_s * 1000 if first_token_s is not None else None,
+                "reused": connect_s == 0.0,
+                "status": status
+            })
+
+    def summary(self) -> Dict[str, float]:
+        """Averages over the window; generation time excludes connection setup"""
+        with self._lock:
+            records = list(self._records)
+        if not records:
+            return {"requests": self.total_requests, "avg_connect_ms": 0.0, "avg_generation_ms": 0.0,
+                    "avg_first_token_ms": 0.0, "p95_total_ms": 0.0, "connection_reuse_pct": 0.0}
+
+        totals = sorted(r["total_ms"] for r in records)
+        first_tokens = [r["first_token_ms"] for r in records if r["first_token_ms"] is not None]
+        return {
+            "requests": self.total_requests,
+            "avg_connect_ms": sum(r["connect_ms"] for r in records) / len(records),
+            "avg_generation_ms": sum(r["generation_ms"] for r in records) / len(records),
+            "avg_first_token_ms": sum(first_tokens) / len(first_tokens) if first_tokens else 0.0,
+            "p95_total_ms": totals[min(int(len(totals) * 0.95), len(totals) - 1)],
+            "connection_reuse_pct": 100.0 * sum(1 for r in records if r["reused"]) / len(records)
+        }
+
+
+class LLMClient:
+    """Keep-alive session for one chat completions endpoint"""
+
+    def __init__(self, endpoint: str, api_key: Optional[str] = None, connect_timeout: float = 3.05,
+                 read_timeout: float = 30.0, pool_maxsize: int = 10, model_ttl: float = 600.0,
+                 model_retry_ttl: float = 10.0, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.endpoint = endpoint
+        self.models_endpoint = endpoint.rsplit("/chat/completions", 1)[0] + "/models"
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.stats = LatencyStats()
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout, probe=self.ping, name=endpoint)
+
+        # Discovered model id, shared by every session using this endpoint
+        self.model_ttl = model_ttl
+        # A failed discovery is only remembered briefly, so a restarted server is picked up quickly
+        self.model_retry_ttl = model_retry_ttl
+        self._model: Optional[str] = None
+        self._model_expires_at = 0.0
+        self._model_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = TimedHTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Content-Type": "application/json", "Connection": "keep-alive"})
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+    @property
+    def timeout(self):
+        """(connect, read) tuple so a dead host fails fast while generation may take longer"""
+        return (self.connect_timeout, self.read_timeout)
+
+    def resolve_model(self, preferred: str = "") -> str:
+        """Return the loaded model id from /v1/models, probing only when the cached value has expired
+
+        Falls back to "" (LM Studio's currently loaded model) if the server cannot be probed;
+        that fallback is cached for model_retry_ttl rather than model_ttl.
+        """
+        with self._model_lock:
+            if self._model is not None and time.monotonic() < self._model_expires_at:
+                return self._model
+
+            model = ""
+            discovered = False
+            try:
+                response = self.session.get(self.models_endpoint, timeout=self.timeout)
+                if response.status_code == 200:
+                    model_ids = [m.get("id", "") for m in response.json().get("data", [])]
+                    if preferred and preferred in model_ids:
+                        model = preferred
+                    elif model_ids:
+                        model = model_ids[0]
+                    discovered = bool(model)
+                    logger.info(f"Discovered LLM models at {self.models_endpoint}: {model_ids}")
+                else:
+                    logger.warning(f"Model discovery failed: {response.status_code}")
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Model discovery error: {e}")
+                self.breaker.record_failure()
+            except ValueError as e:
+                logger.warning(f"Model discovery returned invalid JSON: {e}")
+
+            self._model = model
+            self._model_expires_at = time.monotonic() + (self.model_ttl if discovered else self.model_retry_ttl)
+            return model
+
+    def invalidate_model(self):
+        """Forget the discovered model so the next request re-probes /v1/models"""
+        with self._model_lock:
+            self._model = None
+
+    @staticmethod
+    def is_model_error(status_code: Optional[int], body: str = "") -> bool:
+        """True if a failed request looks like the server rejected the model name"""
+        if status_code in (404, 422):
+            return True
+        return status_code == 400 and "model" in body.lower()
+
+    def ping(self) -> bool:
+        """Cheap health check used by the circuit breaker's half-open probe"""
+        try:
+            return self.session.get(self.models_endpoint, timeout=self.timeout).status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+
+    def _record_health(self, status: Optional[int]):
+        # Connection failures and 5xx mark the backend unhealthy; 4xx are request problems
+        if status is None or status >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def post_chat(self, payload: Dict[str, Any]) -> requests.Response:
+        """POST a chat completion request over a pooled connection and record its latency"""
+        _connect_timing.seconds = 0.0
+        start = time.perf_counter()
+        status = None
+        try:
+            response = self.session.post(self.endpoint, json=payload, timeout=self.timeout)
+            status = response.status_code
+            return response
+        finally:
+            self.stats.record(_connect_timing.seconds, time.perf_counter() - start, status)
+            self._record_health(status)
+
+    def stream_chat(self, payload: Dict[str, Any], state: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """POST a streaming chat completion request and yield content deltas as they arrive
+
+        Raises requests.exceptions.HTTPError for non-200 responses, like any other RequestException.
+        state["finished"] is set once the server ends the stream normally (see iter_sse_content).
+        """
+        _connect_timing.seconds = 0.0
+        start = time.perf_counter()
+        connect_s = 0.0
+        status = None
+        first_token_s = None
+        try:
+            with self.session.post(self.endpoint, json=dict(payload, stream=True),
+                                   timeout=self.timeout, stream=True) as response:
+                connect_s = _connect_timing.seconds
+                status = response.status_code
+                if status != 200:
+                    logger.error(f"LLM streaming error: {status} - {response.text[:200]}")
+                    response.raise_for_status()
+                for delta in iter_sse_content(response.iter_lines(), state):
+                    if first_token_s is None:
+                        first_token_s = time.perf_counter() - start
+                    yield delta
+        finally:
+            self.stats.record(connect_s, time.perf_counter() - start, status, first_token_s)
+            self._record_health(status)
+
+    def close(self):
+        self.session.close()
+
+
+def iter_sse_content(lines: Iterable[Union[str, bytes]], state: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """Extract content deltas from OpenAI-compatible server-sent event lines
+
+    Handles both OpenAI ("delta.content") and older LM Studio ("text") chunk shapes. If state
+    is given, state["finished"] tells whether the stream ended normally ([DONE] or a
+    finish_reason) rather than being cut off or ending in an error event.
+    """
+    if state is not None:
+        state["finished"] = False
+    for raw_line in lines:
+        line = raw_line.decode("utf-8", errors="replace") if isinstance(raw_line, bytes) else raw_line
+        line = line.strip()
+        if not line.startswith("data:"):
+            continue  # blank keep-alives, ":" comments and event/id fields
+
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            if state is not None:
+                state["finished"] = True
+            return
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            logger.warning(f"Skipping malformed stream chunk: {data[:100]}")
+            continue
+
+        if "error" in chunk:
+            logger.error(f"LLM stream error event: {chunk['error']}")
+            return
+
+        choices = chunk.get("choices") or []
+        if not choices:
+            continue
+        content = (choices[0].get("delta") or {}).get("content") or choices[0].get("text")
+        if content:
+            yield content
+        if choices[0].get("finish_reason") and state is not None:
+            state["finished"] = True
+
+
+_shared_clients: Dict[tuple, LLMClient] = {}
+_shared_clients_lock = threading.Lock()
+
+
+def get_shared_client(endpoint: str, api_key: Optional[str] = None, **kwargs) -> LLMClient:
+    """Return the process-wide client for an endpoint, creating it on first use"""
+    key = (endpoint, api_key)
+    with _shared_clients_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            client = LLMClient(endpoint, api_key=api_key, **kwargs)
+            _shared_clients[key] = client
+            logger.info(f"Created pooled LLM client for {endpoint}")
+        return client
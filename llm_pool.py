@@ -0,0 +1,202 @@
+"""
+Pool of OpenAI-compatible chat completion endpoints
+Routes each request to the least busy healthy backend, optionally hedging slow requests
+"""
+
+import concurrent.futures
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+
+from circuit_breaker import CircuitBreaker
+from llm_client import LLMClient, get_shared_client
+
+logger = logging.getLogger(__name__)
+
+
+class NoHealthyEndpoint(requests.exceptions.ConnectionError):
+    """Raised when every endpoint in the pool has an open circuit breaker"""
+
+
+class LLMPool:
+    """Least-outstanding-requests balancing over several LLMClients
+
+    When discover_models is set (LM Studio boxes), a payload with an empty model is
+    filled with the model loaded on the chosen endpoint, re-probing once if rejected.
+    With hedging enabled, a non-streaming request still running after the chosen
+    endpoint's p95 latency is also sent to the next best endpoint; the first
+    successful answer wins.
+    """
+
+    def __init__(self, clients: List[LLMClient], preferred_model: str = "", discover_models: bool = True,
+                 hedge: bool = False, hedge_min_samples: int = 20):
+        if not clients:
+            raise ValueError("LLM pool needs at least one endpoint")
+        self.clients = clients
+        self.preferred_model = preferred_model
+        self.discover_models = discover_models
+        self.hedge = hedge and len(clients) > 1
+        self.hedge_min_samples = hedge_min_samples
+
+        self.outstanding: Dict[str, int] = {client.endpoint: 0 for client in clients}
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=4 * len(clients), thread_name_prefix="llm-pool") if self.hedge else None
+
+    def allow_request(self) -> bool:
+        """True if at least one endpoint may take a request; starts probes on endpoints due one"""
+        healthy = False
+        for client in self.clients:
+            if client.breaker.state == CircuitBreaker.CLOSED or client.breaker.allow_request():
+                healthy = True
+        return healthy
+
+    def _ranked(self, exclude: Optional[LLMClient] = None) -> List[LLMClient]:
+        # Fewest requests in flight first; ties go to the endpoint with the lower recent latency
+        candidates = [c for c in self.clients if c is not exclude and c.breaker.state == CircuitBreaker.CLOSED]
+        with self._lock:
+            return sorted(candidates, key=lambda c: (self.outstanding[c.endpoint],
+                                                     c.stats.summary()['p95_total_ms']))
+
+    def select(self, exclude: Optional[LLMClient] = None) -> LLMClient:
+        ranked = self._ranked(exclude)
+        if not ranked:
+            raise NoHealthyEndpoint("No healthy LLM endpoint available")
+        return ranked[0]
+
+    @contextmanager
+    def _track(self, client: LLMClient) -> Iterator[None]:
+        with self._lock:
+            self.outstanding[client.endpoint] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.outstanding[client.endpoint] -= 1
+
+    def _prepare(self, client: LLMClient, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if self.discover_models and not payload.get("model"):
+            return dict(payload, model=client.resolve_model(self.preferred_model))
+        return payload
+
+    def _post(self, client: LLMClient, payload: Dict[str, Any]) -> requests.Response:
+        """POST to one endpoint, re-discovering the model once if the server rejects it"""
+        with self._track(client):
+            prepared = self._prepare(client, payload)
+            response = client.post_chat(prepared)
+            if self.discover_models and not payload.get("model") and \
+                    client.is_model_error(response.status_code, response.text):
+                # Loaded model changed since discovery - re-probe once and retry
+                logger.warning(f"Model '{prepared['model']}' rejected by {client.endpoint} "
+                               f"({response.status_code}), re-discovering...")
+                client.invalidate_model()
+                response = client.post_chat(self._prepare(client, payload))
+            return response
+
+    def _hedge_delay(self, client: LLMClient) -> Optional[float]:
+        # Only hedge once the endpoint has enough history for a meaningful p95
+        summary = client.stats.summary()
+        if summary['requests'] < self.hedge_min_samples or not summary['p95_total_ms']:
+            return None
+        return summary['p95_total_ms'] / 1000
+
+    def post_chat(self, payload: Dict[str, Any]) -> requests.Response:
+        """Send a chat completion to the least busy endpoint, hedging if it runs past its p95"""
+        primary = self.select()
+        delay = self._hedge_delay(primary) if self.hedge else None
+        if delay is None:
+            return self._post(primary, payload)
+
+        first = self._executor.submit(self._post, primary, payload)
+        try:
+            return first.result(timeout=delay)
+        except concurrent.futures.TimeoutError:
+            pass
+
+        try:
+            backup = self.select(exclude=primary)
+        except NoHealthyEndpoint:
+            return first.result()
+
+        with self._lock:
+            self.hedges_sent += 1
+        logger.info(f"{primary.endpoint} exceeded its p95 ({delay * 1000:.0f} ms), hedging to {backup.endpoint}")
+        second = self._executor.submit(self._post, backup, payload)
+
+        # Use the first successful answer; if the first to finish failed, wait for the other
+        pending = {first, second}
+        fallback_result = None
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except requests.exceptions.RequestException as e:
+                    if fallback_result is None:
+                        fallback_result = e
+                    continue
+                if response.status_code == 200:
+                    if future is second:
+                        with self._lock:
+                            self.hedges_won += 1
+                    return response
+                # Responses with error statuses are falsy, so compare against None explicitly
+                if fallback_result is None:
+                    fallback_result = response
+
+        if isinstance(fallback_result, Exception):
+            raise fallback_result
+        return fallback_result
+
+    def stream_chat(self, payload: Dict[str, Any], state: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """Stream a chat completion from the least busy endpoint (streams are not hedged)"""
+        client = self.select()
+        with self._track(client):
+            for attempt in range(2):
+                try:
+                    yield from client.stream_chat(self._prepare(client, payload), state)
+                    return
+                except requests.exceptions.HTTPError as e:
+                    status = e.response.status_code if e.response is not None else None
+                    if attempt == 0 and self.discover_models and not payload.get("model") \
+                            and client.is_model_error(status):
+                        # Loaded model changed since discovery - re-probe once and retry
+                        client.invalidate_model()
+                        continue
+                    raise
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Per-endpoint health, load and latency for the admin panel"""
+        with self._lock:
+            outstanding = dict(self.outstanding)
+        return [dict(endpoint=client.endpoint, outstanding=outstanding[client.endpoint],
+                     breaker=client.breaker.snapshot(), **client.stats.summary())
+                for client in self.clients]
+
+    def hedge_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"enabled": self.hedge, "sent": self.hedges_sent, "won": self.hedges_won}
+
+
+_shared_pools: Dict[tuple, LLMPool] = {}
+_shared_pools_lock = threading.Lock()
+
+
+def get_shared_pool(endpoints: List[str], api_key: Optional[str] = None, preferred_model: str = "",
+                    discover_models: bool = True, hedge: bool = False, hedge_min_samples: int = 20,
+                    **client_kwargs) -> LLMPool:
+    """Return the process-wide pool for a set of endpoints, built from the shared per-endpoint clients"""
+    key = (tuple(endpoints), api_key)
+    with _shared_pools_lock:
+        pool = _shared_pools.get(key)
+        if pool is None:
+            clients = [get_shared_client(endpoint, api_key=api_key, **client_kwargs) for endpoint in endpoints]
+            pool = LLMPool(clients, preferred_model, discover_models, hedge, hedge_min_samples)
+            _shared_pools[key] = pool
+            logger.info(f"LLM pool created with {len(clients)} endpoint(s), hedging {'on' if pool.hedge else 'off'}")
+        return pool
@@ -0,0 +1,151 @@
+"""
+Asyncio request scheduler in front of the LLM backend
+Bounds how many requests are in flight and serves emergency questions first
+"""
+
+import asyncio
+import concurrent.futures
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerFull(Exception):
+    """Raised when the scheduler queue is full or the wait for a slot timed out"""
+
+
+class LLMScheduler:
+    """Priority queue plus concurrency limit, run on a dedicated asyncio event loop thread
+
+    Callers on any thread block in slot() until the dispatcher grants them one of
+    max_concurrency slots. Lower priority values are granted first; equal priorities
+    are served in arrival order.
+    """
+
+    EMERGENCY = 0
+    ROUTINE = 1
+    PREFETCH = 2  # speculative answers, only granted when nobody is waiting
+
+    def __init__(self, max_concurrency: int = 2, max_queue: int = 32, name: str = "llm"):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._sequence = itertools.count()
+
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.granted_by_priority: Dict[int, int] = {}
+        self._wait_times = deque(maxlen=500)
+        self._stats_lock = threading.Lock()
+
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name=f"{name}-scheduler", daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.PriorityQueue(maxsize=self.max_queue)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._loop.create_task(self._dispatch())
+        self._started.set()
+        self._loop.run_forever()
+
+    async def _dispatch(self):
+        while True:
+            # Take a free slot first so waiting requests stay in the priority queue
+            await self._semaphore.acquire()
+            priority, _, grant, enqueued_at = await self._queue.get()
+            if grant.set_running_or_notify_cancel():
+                with self._stats_lock:
+                    self.in_flight += 1
+                    self.granted_by_priority[priority] = self.granted_by_priority.get(priority, 0) + 1
+                    self._wait_times.append(time.monotonic() - enqueued_at)
+                grant.set_result(None)
+            else:
+                # Caller gave up waiting before its turn came
+                self._semaphore.release()
+
+    def _enqueue(self, priority: int) -> concurrent.futures.Future:
+        grant = concurrent.futures.Future()
+
+        def put():
+            try:
+                self._queue.put_nowait((priority, next(self._sequence), grant, time.monotonic()))
+            except asyncio.QueueFull:
+                grant.set_exception(SchedulerFull(f"LLM queue full ({self.max_queue} waiting)"))
+
+        self._loop.call_soon_threadsafe(put)
+        return grant
+
+    def _release(self):
+        with self._stats_lock:
+            self.in_flight -= 1
+            self.completed += 1
+        self._loop.call_soon_threadsafe(self._semaphore.release)
+
+    @contextmanager
+    def slot(self, priority: int = ROUTINE, timeout: Optional[float] = None) -> Iterator[None]:
+        """Block until a concurrency slot is granted, hold it for the duration of the with-block"""
+        grant = self._enqueue(priority)
+        try:
+            grant.result(timeout)
+        except concurrent.futures.TimeoutError:
+            if grant.cancel():
+                with self._stats_lock:
+                    self.rejected += 1
+                raise SchedulerFull(f"No LLM slot within {timeout}s")
+            # Granted just as the wait timed out - use the slot
+        except SchedulerFull:
+            with self._stats_lock:
+                self.rejected += 1
+            raise
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    def submit(self, fn: Callable[..., Any], *args, priority: int = ROUTINE,
+               timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run fn in the caller's thread once a slot is granted"""
+        with self.slot(priority, timeout):
+            return fn(*args, **kwargs)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Queue and concurrency metrics for the admin panel"""
+        with self._stats_lock:
+            waits = sorted(self._wait_times)
+            return {
+                "queued": self._queue.qsize(),
+                "in_flight": self.in_flight,
+                "max_concurrency": self.max_concurrency,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "emergency_granted": self.granted_by_priority.get(self.EMERGENCY, 0),
+                "routine_granted": self.granted_by_priority.get(self.ROUTINE, 0),
+                "prefetch_granted": self.granted_by_priority.get(self.PREFETCH, 0),
+                "avg_queue_wait_ms": 1000 * sum(waits) / len(waits) if waits else 0.0,
+                "p95_queue_wait_ms": 1000 * waits[min(int(len(waits) * 0.95), len(waits) - 1)] if waits else 0.0
+            }
+
+
+_shared_scheduler: Optional[LLMScheduler] = None
+_shared_scheduler_lock = threading.Lock()
+
+
+def get_shared_scheduler(max_concurrency: int = 2, max_queue: int = 32) -> LLMScheduler:
+    """Return the process-wide scheduler shared by every Streamlit session"""
+    global _shared_scheduler
+    with _shared_scheduler_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = LLMScheduler(max_concurrency, max_queue)
+            logger.info(f"LLM scheduler started (concurrency={max_concurrency}, queue={max_queue})")
+        return _shared_scheduler
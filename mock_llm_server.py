@@ -0,0 +1,257 @@
+"""
+Local OpenAI-compatible stand-in for LM Studio / OpenAI
+Serves /v1/models and /v1/chat/completions (streaming and non-streaming) with configurable
+latency, token rate, error injection and canned answers, for benchmarks and offline tests
+
+Usage: python mock_llm_server.py --port 1234 --latency 0.5 --tokens-per-second 30
+Then point the app at it: LLM_ENDPOINT=http://127.0.0.1:1234/v1/chat/completions streamlit run app.py
+"""
+
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ANSWER = """• Assess airway, breathing and circulation first using the ABCDE approach
+• Monitor heart rate, respiratory rate and oxygen saturation against age-appropriate ranges
+• Escalate to the medical team early if the child deteriorates
+• Document observations and interventions clearly"""
+
+# Keyword -> answer; the first keyword found in the last user message wins
+DEFAULT_CANNED_ANSWERS = {
+    "cpr": """• Compression rate 100-120 per minute
+• Depth 4 cm in infants and 5 cm in children (one third of chest depth)
+• Ratio 15:2 with two rescuers for children
+• Minimise interruptions and allow full chest recoil""",
+    "paracetamol": """• Toxic dose is 200 mg/kg or 10 g, whichever is less
+• Take a paracetamol level at least 4 hours after ingestion
+• Start NAC if the level is above the treatment line
+• Activated charcoal 1 g/kg if within 1 hour of ingestion""",
+    "dosage": """• Always calculate paediatric doses by weight in mg/kg
+• Never exceed the maximum adult dose
+• Double-check calculations with a second nurse
+• Verify allergies before administration""",
+}
+
+
+class MockLLMConfig:
+    """Behaviour knobs; may be changed while the server is running"""
+
+    def __init__(self, model: str = "mock-nursing-model", latency: float = 0.0, tokens_per_second: float = 0.0,
+                 error_rate: float = 0.0, model_error_rate: float = 0.0, drop_stream_after: int = 0,
+                 answers: Optional[Dict[str, str]] = None, default_answer: str = DEFAULT_ANSWER):
+        self.model = model
+        self.latency = latency                      # seconds before the first byte
+        self.tokens_per_second = tokens_per_second  # 0 = send all tokens at once
+        self.error_rate = error_rate                # fraction of requests answered with HTTP 500
+        self.model_error_rate = model_error_rate    # fraction answered with HTTP 422 (model rejected)
+        self.drop_stream_after = drop_stream_after  # tokens streamed before the connection is cut (0 = never)
+        self.answers = dict(DEFAULT_CANNED_ANSWERS if answers is None else answers)
+        self.default_answer = default_answer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like LM Studio and OpenAI
+    server: "_MockHTTPServer"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/v1/models"):
+            self._send_json(200, {"object": "list",
+                                  "data": [{"id": self.server.config.model, "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "Invalid JSON body"}})
+            return
+        if not self.path.rstrip("/").endswith("/v1/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        config = self.server.config
+        self.server.count_request()
+        time.sleep(config.latency)
+
+        if random.random() < config.error_rate:
+            self._send_json(500, {"error": {"message": "Injected server error", "type": "server_error"}})
+            return
+        if random.random() < config.model_error_rate:
+            self._send_json(422, {"error": {"message": f"Model '{payload.get('model', '')}' is not loaded",
+                                            "type": "invalid_request_error"}})
+            return
+
+        answer = self.server.answer_for(payload)
+        if payload.get("stream"):
+            self._stream(answer)
+        else:
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": config.model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer},
+                             "finish_reason": "stop"}],
+                "usage": self.server.usage(payload, answer)
+            })
+
+    def _stream(self, answer: str):
+        config = self.server.config
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        for index, token in enumerate(iter_tokens(answer)):
+            if config.drop_stream_after and index == config.drop_stream_after:
+                # Connection lost mid-answer: no [DONE] and no terminating chunk
+                self.close_connection = True
+                return
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "model": config.model,
+                     "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+            if config.tokens_per_second:
+                time.sleep(1.0 / config.tokens_per_second)
+        self._write_chunk("data: [DONE]\n\n")
+        self._write_chunk("")
+
+    def _write_chunk(self, text: str):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+def iter_tokens(text: str) -> Iterator[str]:
+    """Split text into word-sized chunks, keeping whitespace attached like real tokenizers"""
+    start = 0
+    for index in range(1, len(text)):
+        if text[index] in " \n" and text[index - 1] not in " \n":
+            yield text[start:index]
+            start = index
+    if start < len(text):
+        yield text[start:]
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: MockLLMConfig):
+        super().__init__(address, _Handler)
+        self.config = config
+        self.requests_served = 0
+        self._lock = threading.Lock()
+
+    def count_request(self):
+        with self._lock:
+            self.requests_served += 1
+
+    def answer_for(self, payload: Dict[str, Any]) -> str:
+        user_messages = [m.get("content", "") for m in payload.get("messages", []) if m.get("role") == "user"]
+        question = user_messages[-1].lower() if user_messages else ""
+        for keyword, answer in self.config.answers.items():
+            if keyword.lower() in question:
+                return answer
+        return self.config.default_answer
+
+    @staticmethod
+    def usage(payload: Dict[str, Any], answer: str) -> Dict[str, int]:
+        # Rough four-characters-per-token counts, enough for usage accounting tests
+        prompt_tokens = sum(len(m.get("content", "")) // 4 + 4 for m in payload.get("messages", []))
+        completion_tokens = len(answer) // 4
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+
+class MockLLMServer:
+    """Runs the stand-in server on a background thread; port 0 picks a free port"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: Optional[MockLLMConfig] = None):
+        self.config = config or MockLLMConfig()
+        self._server = _MockHTTPServer((host, port), self.config)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def endpoint(self) -> str:
+        return f"{self.base_url}/chat/completions"
+
+    @property
+    def requests_served(self) -> int:
+        return self._server.requests_served
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-llm-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stand-in LLM server for offline testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1234)
+    parser.add_argument("--model", default="mock-nursing-model", help="model id reported by /v1/models")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before the first byte")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="streaming rate (0 = unthrottled)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--model-error-rate", type=float, default=0.0, help="fraction answered with 422")
+    parser.add_argument("--drop-stream-after", type=int, default=0, help="cut streams off after this many tokens")
+    parser.add_argument("--answers", help="JSON file mapping keywords to canned answers")
+    args = parser.parse_args()
+
+    answers = None
+    if args.answers:
+        with open(args.answers, "r", encoding="utf-8") as f:
+            answers = json.load(f)
+
+    config = MockLLMConfig(model=args.model, latency=args.latency, tokens_per_second=args.tokens_per_second,
+                           error_rate=args.error_rate, model_error_rate=args.model_error_rate,
+                           drop_stream_after=args.drop_stream_after, answers=answers)
+    server = MockLLMServer(args.host, args.port, config)
+    print(f"Mock LLM server listening on {server.endpoint} (model '{config.model}')")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
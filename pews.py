@@ -0,0 +1,181 @@
+"""
+Incremental paediatric early-warning scores over streaming observations
+Each patient keeps a small fixed-size state, so a new observation set is scored and
+its trend assessed in O(1) without rescanning the patient's history
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import vital_signs
+
+AVPU_SCORES = {"A": 0, "V": 1, "P": 2, "U": 3}
+SCORED_VITALS = ("HR", "RR", "SBP", "SpO2", "AVPU")
+
+
+def vital_subscore(value: float, low: float, high: float) -> int:
+    """0 inside the age-band range, then 1/2/3 for up to 10%, up to 20% and over 20% outside it"""
+    if low <= value <= high:
+        return 0
+    deviation = (low - value) / low if value < low else (value - high) / high
+    if deviation <= 0.10:
+        return 1
+    if deviation <= 0.20:
+        return 2
+    return 3
+
+
+def spo2_subscore(spo2: float) -> int:
+    if spo2 >= 95:
+        return 0
+    if spo2 >= 92:
+        return 1
+    if spo2 >= 88:
+        return 2
+    return 3
+
+
+class PEWSEngine:
+    """Per-patient PEWS-style scoring with trend flags
+
+    A vital missing from an observation set keeps its last subscore, so partial sets
+    (e.g. a heart rate recheck) still give a complete score. A set is flagged when the
+    total reaches watch_score or urgent_score, jumps by rise_alert or more since the
+    previous set, or has risen over rising_sets consecutive sets.
+    """
+
+    def __init__(self, watch_score: int = 3, urgent_score: int = 5, rise_alert: int = 2,
+                 rising_sets: int = 3, trend_length: int = 12):
+        self.watch_score = watch_score
+        self.urgent_score = urgent_score
+        self.rise_alert = rise_alert
+        self.rising_sets = rising_sets
+        self.trend_length = trend_length
+        self.patients: Dict[str, Dict[str, Any]] = {}
+        self.observations = 0
+        self.alerts = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _age_band(age_months: float) -> Dict[str, Any]:
+        band = vital_signs.VITAL_SIGN_BANDS[vital_signs.band_index(age_months)]
+        return {"age_months": age_months, "band": band["band"],
+                "limits": {vital: band[vital] for vital in vital_signs.VITALS}}
+
+    def _new_patient(self, age_months: float) -> Dict[str, Any]:
+        return {
+            **self._age_band(age_months),
+            "subscores": dict.fromkeys(SCORED_VITALS, 0),
+            "score": 0,
+            "previous_score": None,
+            "peak_score": 0,
+            "rising_streak": 0,
+            "observations": 0,
+            "updated_at": None,
+            "trend": deque(maxlen=self.trend_length),
+            "flags": []
+        }
+
+    def update(self, patient_id: str, age_months: Optional[float] = None, hr: Optional[float] = None,
+               rr: Optional[float] = None, sbp: Optional[float] = None, spo2: Optional[float] = None,
+               avpu: Optional[str] = None, timestamp: Optional[float] = None) -> Dict[str, Any]:
+        """Score one observation set; age_months is needed the first time a patient is seen"""
+        if avpu is not None:
+            avpu = avpu.strip().upper()[:1]
+            if avpu not in AVPU_SCORES:
+                raise ValueError(f"AVPU for patient {patient_id} must be one of A, V, P or U")
+        with self._lock:
+            state = self.patients.get(patient_id)
+            if state is None:
+                if age_months is None:
+                    raise ValueError(f"First observation for patient {patient_id} needs age_months")
+                state = self._new_patient(age_months)
+                self.patients[patient_id] = state
+            elif age_months is not None and age_months != state["age_months"]:
+                # Birthday into a new band: keep the trend, score new values against the new limits
+                state.update(self._age_band(age_months))
+
+            limits = state["limits"]
+            subscores = state["subscores"]
+            for vital, value in (("HR", hr), ("RR", rr), ("SBP", sbp)):
+                if value is not None:
+                    subscores[vital] = vital_subscore(value, *limits[vital])
+            if spo2 is not None:
+                subscores["SpO2"] = spo2_subscore(spo2)
+            if avpu is not None:
+                subscores["AVPU"] = AVPU_SCORES[avpu]
+
+            score = sum(subscores.values())
+            previous = state["score"] if state["observations"] else None
+            if previous is not None:
+                state["previous_score"] = previous
+                state["rising_streak"] = state["rising_streak"] + 1 if score > previous else 0
+            state["score"] = score
+            state["peak_score"] = max(state["peak_score"], score)
+            state["observations"] += 1
+            state["updated_at"] = time.time() if timestamp is None else timestamp
+            state["trend"].append(score)
+
+            flags = []
+            if score >= self.urgent_score or max(subscores.values()) == 3:
+                flags.append("urgent review")
+            elif score >= self.watch_score:
+                flags.append("increase monitoring")
+            if previous is not None and score - previous >= self.rise_alert:
+                flags.append(f"score up {score - previous} since last set")
+            if state["rising_streak"] >= self.rising_sets:
+                flags.append(f"rising for {state['rising_streak']} sets")
+            state["flags"] = flags
+
+            self.observations += 1
+            if flags:
+                self.alerts += 1
+            return self._summary(patient_id, state)
+
+    def _summary(self, patient_id: str, state: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "patient_id": patient_id,
+            "band": state["band"],
+            "score": state["score"],
+            "previous_score": state["previous_score"],
+            "peak_score": state["peak_score"],
+            "subscores": dict(state["subscores"]),
+            "flags": list(state["flags"]),
+            "trend": list(state["trend"]),
+            "observations": state["observations"],
+            "updated_at": state["updated_at"]
+        }
+
+    def patient(self, patient_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            state = self.patients.get(patient_id)
+            return self._summary(patient_id, state) if state else None
+
+    def ward(self) -> List[Dict[str, Any]]:
+        """Every patient, flagged and highest-scoring first"""
+        with self._lock:
+            summaries = [self._summary(pid, state) for pid, state in self.patients.items()]
+        return sorted(summaries, key=lambda s: (not s["flags"], -s["score"]))
+
+    def discharge(self, patient_id: str):
+        with self._lock:
+            self.patients.pop(patient_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"patients": len(self.patients), "observations": self.observations, "alerts": self.alerts}
+
+
+_shared_engine: Optional[PEWSEngine] = None
+_shared_engine_lock = threading.Lock()
+
+
+def get_shared_pews() -> PEWSEngine:
+    """Process-wide engine, so every nurse's session sees the same ward"""
+    global _shared_engine
+    with _shared_engine_lock:
+        if _shared_engine is None:
+            _shared_engine = PEWSEngine()
+        return _shared_engine
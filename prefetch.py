@@ -0,0 +1,118 @@
+"""
+Predictive prefetch for suggested follow-up questions
+When suggestions are shown, their answers are prepared on a single low-priority worker
+within a per-batch budget; clicking a suggestion takes the prepared result instead of
+starting cold. Hits, and work thrown away unused, are counted for the admin panel
+"""
+
+import concurrent.futures
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# One worker for every session, so prefetching never competes with itself for the CPU
+_prefetch_worker = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+
+
+class Prefetcher:
+    """Prefetched results for one conversation, replaced wholesale by each new batch of suggestions
+
+    max_questions caps how many suggestions of a batch are prepared; jobs not started within
+    time_budget seconds of the batch are dropped, since the user has likely moved on.
+    """
+
+    def __init__(self, max_questions: int = 3, time_budget: float = 30.0,
+                 executor: Optional[concurrent.futures.Executor] = None):
+        self.max_questions = max_questions
+        self.time_budget = time_budget
+        self._executor = executor or _prefetch_worker
+        self._batch: Optional[Hashable] = None
+        self._deadline = 0.0
+        self._entries: Dict[Hashable, Dict[str, Any]] = {}
+        # Re-entrant: a finished job's done-callback runs at once, inside _discard, under the lock
+        self._lock = threading.RLock()
+
+        self.scheduled = 0
+        self.completed = 0
+        self.skipped = 0
+        self.hits = 0
+        self.wasted = 0
+        self.saved_seconds = 0.0
+        self.wasted_seconds = 0.0
+
+    def prefetch(self, batch: Hashable, jobs: List[Tuple[Hashable, Callable[[], Any]]]):
+        """Start preparing a batch of (key, job); repeating the current batch is a no-op"""
+        with self._lock:
+            if batch == self._batch:
+                return
+            self._discard()
+            self._batch = batch
+            self._deadline = time.monotonic() + self.time_budget
+            self.skipped += max(0, len(jobs) - self.max_questions)
+            for key, job in jobs[:self.max_questions]:
+                entry = {"seconds": 0.0}
+                entry["future"] = self._executor.submit(self._run, entry, job, self._deadline)
+                self._entries[key] = entry
+                self.scheduled += 1
+
+    def _run(self, entry: Dict[str, Any], job: Callable[[], Any], deadline: float) -> Any:
+        if time.monotonic() > deadline:
+            with self._lock:
+                self.skipped += 1
+            return None
+        start = time.perf_counter()
+        try:
+            result = job()
+        except Exception as e:
+            logger.warning(f"Prefetch failed: {e}")
+            return None
+        entry["seconds"] = time.perf_counter() - start
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def _discard(self):
+        # Called with the lock held: whatever the previous batch prepared and nobody used is wasted
+        for entry in self._entries.values():
+            if entry["future"].cancel():
+                continue
+            entry["future"].add_done_callback(lambda future, entry=entry: self._wasted(entry, future))
+        self._entries = {}
+
+    def _wasted(self, entry: Dict[str, Any], future: concurrent.futures.Future):
+        if future.result() is None:
+            return
+        with self._lock:
+            self.wasted += 1
+            self.wasted_seconds += entry["seconds"]
+
+    def take(self, key: Hashable) -> Optional[Any]:
+        """The prefetched result for key, waiting if it is being prepared right now; None if there is none"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        # Still queued behind other suggestions: cheaper to answer now than to wait for the worker
+        if entry is None or entry["future"].cancel():
+            return None
+        result = entry["future"].result()
+        if result is None:
+            return None
+        with self._lock:
+            self.hits += 1
+            self.saved_seconds += entry["seconds"]
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "scheduled": self.scheduled,
+                "completed": self.completed,
+                "skipped": self.skipped,
+                "hits": self.hits,
+                "wasted": self.wasted,
+                "hit_rate_pct": 100.0 * self.hits / self.completed if self.completed else 0.0,
+                "saved_seconds": self.saved_seconds,
+                "wasted_seconds": self.wasted_seconds,
+            }
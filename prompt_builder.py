@@ -0,0 +1,208 @@
+"""
+Token-budgeted prompt assembly
+Counts tokens with the target model's tokenizer and fits the system prompt, conversation
+history, knowledge base evidence and question into a fixed budget, trimming at sentence boundaries
+"""
+
+import logging
+import re
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Chat formats add a few tokens of framing per message (role markers, separators)
+TOKENS_PER_MESSAGE = 4
+
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n+')
+_WORD_PIECE = re.compile(r'\w+|[^\w\s]')
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokenizer-free estimate: one token per punctuation mark, about four characters per word piece"""
+    return sum(max(1, (len(piece) + 3) // 4) for piece in _WORD_PIECE.findall(text))
+
+
+def _load_encoder(model_name: str) -> Optional[Callable[[str], List[int]]]:
+    # tiktoken for OpenAI models, otherwise the Hugging Face tokenizer if it is available locally
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model_name).encode
+        except KeyError:
+            pass
+    except ImportError:
+        pass
+
+    hf_names = {"phi-2": "microsoft/phi-2"}
+    try:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(hf_names.get(model_name, model_name), local_files_only=True)
+        return lambda text: tokenizer.encode(text, add_special_tokens=False)
+    except Exception:
+        return None
+
+
+class TokenCounter:
+    """Counts tokens for one model, caching counts so static text is only tokenised once"""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        encode = _load_encoder(model_name)
+        self.exact = encode is not None
+        if not self.exact:
+            logger.info(f"No tokenizer available for '{model_name}', estimating token counts")
+
+        @lru_cache(maxsize=4096)
+        def count(text: str) -> int:
+            return len(encode(text)) if encode is not None else estimate_tokens(text)
+
+        self.count = count
+
+    def cache_info(self):
+        return self.count.cache_info()
+
+
+_counters: Dict[str, TokenCounter] = {}
+_counters_lock = threading.Lock()
+
+
+def get_token_counter(model_name: str) -> TokenCounter:
+    """Process-wide token counter per model, so the tokenisation cache is shared by all sessions"""
+    with _counters_lock:
+        counter = _counters.get(model_name)
+        if counter is None:
+            counter = TokenCounter(model_name)
+            _counters[model_name] = counter
+        return counter
+
+
+class PromptBuilder:
+    """Allocates a prompt token budget across system prompt, question, history and evidence
+
+    The system prompt is always sent whole. The question gets up to question_tokens,
+    history up to history_tokens, and KB evidence whatever remains (including any
+    history budget left unused).
+    """
+
+    def __init__(self, counter: TokenCounter, max_prompt_tokens: int = 1024,
+                 question_tokens: int = 128, history_tokens: int = 192):
+        self.counter = counter
+        self.max_prompt_tokens = max_prompt_tokens
+        self.question_tokens = question_tokens
+        self.history_tokens = history_tokens
+        self._usage = deque(maxlen=500)
+        self._lock = threading.Lock()
+
+    def trim(self, text: str, budget: int) -> str:
+        """Longest prefix of whole sentences that fits in budget tokens"""
+        text = text.strip()
+        if budget <= 0 or not text:
+            return ""
+        if self.counter.count(text) <= budget:
+            return text
+
+        kept = ""
+        for sentence in _SENTENCE_BOUNDARY.split(text):
+            if not sentence.strip():
+                continue
+            candidate = f"{kept} {sentence}".strip() if kept else sentence.strip()
+            if self.counter.count(candidate) > budget:
+                break
+            kept = candidate
+        if kept:
+            return kept
+
+        # A single sentence longer than the budget - fall back to whole words
+        words = text.split()
+        low, high = 0, len(words)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self.counter.count(" ".join(words[:mid]) + " ...") <= budget:
+                low = mid
+            else:
+                high = mid - 1
+        return " ".join(words[:low]) + " ..." if low else ""
+
+    def _fit_history(self, history: List[Dict[str, str]], budget: int) -> List[Dict[str, str]]:
+        # Newest messages are most relevant, so fill from the end
+        fitted = []
+        for msg in reversed(history):
+            remaining = budget - TOKENS_PER_MESSAGE
+            if remaining <= 0:
+                break
+            content = self.trim(msg.get('content', ''), remaining)
+            if not content:
+                break
+            fitted.append({"role": msg['role'], "content": content})
+            budget -= TOKENS_PER_MESSAGE + self.counter.count(content)
+        fitted.reverse()
+        return fitted
+
+    def _fit_evidence(self, evidence: List[str], budget: int) -> List[str]:
+        # Evidence arrives ranked; keep whole passages while they fit, then trim the next one
+        fitted = []
+        for passage in evidence:
+            if budget <= 0:
+                break
+            passage = self.trim(passage, budget)
+            if not passage:
+                break
+            fitted.append(passage)
+            budget -= self.counter.count(passage) + 2
+        return fitted
+
+    def build(self, system_prompt: str, question: str, evidence: Optional[List[str]] = None,
+              history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """Assemble chat messages within budget; returns messages plus a per-part token breakdown"""
+        count = self.counter.count
+        system_tokens = count(system_prompt) + TOKENS_PER_MESSAGE
+        question = self.trim(question, self.question_tokens) or question
+        question_tokens = count(question) + TOKENS_PER_MESSAGE
+
+        available = max(0, self.max_prompt_tokens - system_tokens - question_tokens)
+        history_messages = self._fit_history(history or [], min(self.history_tokens, available))
+        history_tokens = sum(count(m['content']) + TOKENS_PER_MESSAGE for m in history_messages)
+
+        # Header tokens are reserved up front so the assembled user message stays within budget
+        header = "Knowledge base context:\n"
+        footer = "\n\nQuestion: "
+        evidence_budget = available - history_tokens - count(header) - count(footer)
+        passages = self._fit_evidence([e for e in (evidence or []) if e and e.strip()], evidence_budget)
+
+        if passages:
+            user_content = header + "\n\n".join(passages) + footer + question
+        else:
+            user_content = question
+        evidence_tokens = count(user_content) + TOKENS_PER_MESSAGE - question_tokens
+
+        messages = [{"role": "system", "content": system_prompt}] + history_messages
+        messages.append({"role": "user", "content": user_content})
+
+        breakdown = {
+            "system": system_tokens,
+            "history": history_tokens,
+            "evidence": evidence_tokens,
+            "question": question_tokens
+        }
+        prompt_tokens = sum(breakdown.values())
+        with self._lock:
+            self._usage.append(prompt_tokens)
+        return {"messages": messages, "prompt_tokens": prompt_tokens, "breakdown": breakdown}
+
+    def summary(self) -> Dict[str, Any]:
+        """Prompt size metrics for the admin panel"""
+        with self._lock:
+            usage = list(self._usage)
+        info = self.counter.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            "requests": len(usage),
+            "avg_prompt_tokens": sum(usage) / len(usage) if usage else 0.0,
+            "max_prompt_tokens": max(usage) if usage else 0,
+            "budget": self.max_prompt_tokens,
+            "exact_tokenizer": self.counter.exact,
+            "tokenization_cache_hit_pct": 100.0 * info.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,172 @@
+"""
+Canonical query normalisation
+One deterministic rewrite of a question - case, British spelling, units, numbers,
+politeness phrases and clinical abbreviations - applied before the fast paths and
+every cache key, so "Paediatric HR for a newborn pls" and "pediatric heart rate for
+a neonate" are the same question
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+# American spellings -> the British spellings used in the KKH Baby Bear Book
+SPELLINGS = {
+    "pediatric": "paediatric", "pediatrics": "paediatrics", "pediatrician": "paediatrician",
+    "orthopedic": "orthopaedic", "hemorrhage": "haemorrhage", "hemoglobin": "haemoglobin",
+    "hematoma": "haematoma", "hemodynamic": "haemodynamic", "edema": "oedema", "diarrhea": "diarrhoea",
+    "anesthesia": "anaesthesia", "anesthetic": "anaesthetic", "esophagus": "oesophagus",
+    "estrogen": "oestrogen", "color": "colour", "behavior": "behaviour", "center": "centre",
+    "liter": "litre", "liters": "litres", "milliliter": "millilitre", "milliliters": "millilitres",
+    "sulfate": "sulphate", "tumor": "tumour", "gray": "grey", "labor": "labour", "program": "programme",
+}
+_SPELLING_RULES: List[Tuple[re.Pattern, str]] = [
+    # hypoglycemia, hyperkalemic, septicemia, ischemia -> -aemia / -aemic
+    (re.compile(r"\b(\w*(?:glyc|kal|natr|calc|ox|capn|lact|sept|an|isch|leuk|bacter|vir|ur|lip|phosphat))emi(a|c)\b"),
+     r"\1aemi\2"),
+    # recognize, stabilized, immobilizing, organization -> -ise
+    (re.compile(r"\b(\w{4,})iz(e|ed|es|ing|ation|ations)\b"), r"\1is\2"),
+    (re.compile(r"\b(\w{3,})yz(e|ed|es|ing)\b"), r"\1ys\2"),
+]
+
+_NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9,
+    "ten": 10, "eleven": 11, "twelve": 12, "fifteen": 15, "eighteen": 18, "twenty": 20, "thirty": 30,
+    "forty": 40, "fifty": 50, "sixty": 60,
+}
+_UNIT_WORDS = (r"kg|kgs|kilos?|kilograms?|ml|mls|mg|mcg|g|grams?|l|litres?|hours?|hrs?|h|minutes?|mins?|"
+               r"days?|weeks?|wks?|months?|mths?|years?|yrs?|cm|mmol|units?|doses?|times|tablets?")
+
+# Ordered: numbers first, then units (which need the number in front), then abbreviations
+_UNIT_RULES: List[Tuple[re.Pattern, str]] = [
+    (re.compile(r"\b(" + "|".join(_NUMBER_WORDS) + r")(?=[\s-]+(?:" + _UNIT_WORDS + r")\b)"),
+     lambda m: str(_NUMBER_WORDS[m.group(1)])),
+    (re.compile(r"(?<![\d.])\.(\d)"), r"0.\1"),
+    (re.compile(r"\b(\d+)\.0+\b"), r"\1"),
+    (re.compile(r"\b(\d+\.\d*?[1-9])0+\b"), r"\1"),
+    (re.compile(r"(\d)(?=(?:" + _UNIT_WORDS + r"|µg|cc)\b)"), r"\1 "),
+    (re.compile(r"\b(?:ml|mls|cc)\s*(?:/|per)\s*kg\s*(?:/|per)\s*(?:h|hr|hrs|hour)\b"), "ml/kg/hr"),
+    (re.compile(r"\b(?:ml|mls|cc)\s*(?:/|per)\s*(?:h|hr|hrs|hour)\b"), "ml/hr"),
+    (re.compile(r"\b(mg|mcg|ml|g|mmol|units?)\s*(?:/|per)\s*(?:kg|kilo|kilogram)\b"), r"\1/kg"),
+    (re.compile(r"(\d) (?:kilograms?|kilos?|kgs)\b"), r"\1 kg"),
+    (re.compile(r"(\d) (?:millilitres?|mls|cc)\b"), r"\1 ml"),
+    (re.compile(r"(\d) (?:micrograms?|µg)\b"), r"\1 mcg"),
+    (re.compile(r"(\d) (?:hours?|hrs?|h)\b"), r"\1 hours"),
+    (re.compile(r"(\d) (?:minutes?|mins?)\b"), r"\1 minutes"),
+    (re.compile(r"(\d)[\s-](?:years?|yrs?|yo|y/o)(?:[\s-]old)?\b"), r"\1 years"),
+    (re.compile(r"(\d)[\s-](?:months?|mths?|mos?)(?:[\s-]old)?\b"), r"\1 months"),
+]
+
+# Abbreviations and everyday words -> the wording used in the knowledge base
+SYNONYMS = {
+    "newborn": "neonate", "newborns": "neonates", "neonatal": "neonate", "kid": "child", "kids": "children",
+    "hr": "heart rate", "pulse rate": "heart rate", "rr": "respiratory rate", "resp rate": "respiratory rate",
+    "bp": "blood pressure", "sbp": "systolic blood pressure", "spo2": "oxygen saturation",
+    "sats": "oxygen saturation", "o2 sats": "oxygen saturation", "oxygen sats": "oxygen saturation",
+    "temp": "temperature", "obs": "observations", "vitals": "vital signs", "meds": "medications",
+    "med": "medication", "pt": "patient", "pts": "patients", "abx": "antibiotics", "resus": "resuscitation",
+}
+_SYNONYM_RE = re.compile(r"(?<!/)\b(" + "|".join(re.escape(s) for s in sorted(SYNONYMS, key=len, reverse=True)) + r")\b")
+
+# Politeness and filler that never changes the answer
+_STOP_PHRASES = re.compile(
+    r"^(?:hi|hello|hey|dear)\b[\s,!.]*"
+    r"|^(?:please\s+)?(?:can|could|would)\s+you\s+(?:please\s+)?(?:tell|show|give|explain to)\s+me\s+(?:about\s+)?"
+    r"|^(?:please\s+)?(?:tell|show)\s+me\s+(?:about\s+)?"
+    r"|^i\s+(?:want|would like|need)\s+to\s+know\s+(?:about\s+)?"
+    r"|\b(?:please|pls|kindly)\b"
+    r"|[\s,.!]*\b(?:thanks|thank you|thx)\b[\s.!]*$")
+
+# Words ignored in cache keys; every other word is kept, in order
+_KEY_FILLER = {"a", "an", "the", "of", "for", "in", "on", "to", "is", "are", "what", "whats", "what's",
+               "normal", "range", "ranges", "values", "my", "me", "i", "do", "does"}
+_WORD_RE = re.compile(r"[\w/.'+-]+")
+
+
+def normalize_query(text: str) -> str:
+    """Canonical form of a question; idempotent, so normalising twice changes nothing"""
+    original = re.sub(r"\s+", " ", text.lower()).strip(" ?!.")
+    text = re.sub(r"(\d),(\d{3})\b", r"\1\2", original)
+    text = re.sub(r"[?!,;]", " ", text)
+    stripped = None
+    while stripped != text:
+        # A greeting can hide a leading phrase ("hi, can you tell me..."), so strip until nothing changes
+        stripped, text = text, _STOP_PHRASES.sub(" ", text).strip()
+    text = re.sub(r"\b[a-z]+\b", lambda m: SPELLINGS.get(m.group(0), m.group(0)), text)
+    for pattern, replacement in _SPELLING_RULES + _UNIT_RULES:
+        text = pattern.sub(replacement, text)
+    text = _SYNONYM_RE.sub(lambda m: SYNONYMS[m.group(1)], text)
+    # A question that was nothing but courtesy ("thank you") keeps its own words
+    return re.sub(r"\s+", " ", text).strip(" .") or original
+
+
+def query_key(text: str) -> str:
+    """Exact-match key for caches and coalescing: the normalised words in order, without filler
+
+    Order is kept because it carries meaning ("ibuprofen before paracetamol" is not
+    "paracetamol before ibuprofen").
+    """
+    words = [w.strip(".") for w in _WORD_RE.findall(normalize_query(text))]
+    return " ".join(w for w in words if w and w not in _KEY_FILLER)
+
+
+class QueryNormalizer:
+    """Normalises questions and measures what it buys
+
+    Keeps the recent raw keys and normalised keys side by side, so the admin panel can
+    show how often a question repeated an earlier one verbatim versus after normalisation.
+    """
+
+    def __init__(self, window: int = 2000):
+        self.window = window
+        self.queries = 0
+        self.rewritten = 0
+        self.raw_repeats = 0
+        self.key_repeats = 0
+        self._raw_seen: "OrderedDict[str, None]" = OrderedDict()
+        self._key_seen: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _seen(self, seen: "OrderedDict[str, None]", key: str) -> bool:
+        hit = key in seen
+        seen[key] = None
+        seen.move_to_end(key)
+        if len(seen) > self.window:
+            seen.popitem(last=False)
+        return hit
+
+    def normalize(self, text: str) -> str:
+        """Normalised question, counted towards the before/after repeat rates"""
+        normalised = normalize_query(text)
+        # Before normalisation questions were keyed on case and whitespace only
+        raw, key = re.sub(r"\s+", " ", text.lower()).strip(" ?!."), query_key(normalised)
+        with self._lock:
+            self.queries += 1
+            self.rewritten += normalised != raw
+            self.raw_repeats += self._seen(self._raw_seen, raw)
+            self.key_repeats += self._seen(self._key_seen, key)
+        return normalised
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            queries = max(self.queries, 1)
+            return {
+                "queries": self.queries,
+                "rewritten": self.rewritten,
+                "raw_repeat_pct": 100.0 * self.raw_repeats / queries,
+                "normalised_repeat_pct": 100.0 * self.key_repeats / queries,
+            }
+
+
+_shared_normalizer = None
+_shared_normalizer_lock = threading.Lock()
+
+
+def get_shared_normalizer() -> QueryNormalizer:
+    """Process-wide normaliser, so the repeat rates cover every session"""
+    global _shared_normalizer
+    with _shared_normalizer_lock:
+        if _shared_normalizer is None:
+            _shared_normalizer = QueryNormalizer()
+        return _shared_normalizer
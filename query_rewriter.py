@@ -0,0 +1,89 @@
+"""
+Conversation-aware query rewriting
+Follow-ups such as "what about for a 5-year-old?" or "and the dose?" are rewritten into
+standalone questions from the topic the nurse set up earlier in the chat. Each user
+message caches its embedding, so blending the topic into retrieval needs no re-encoding
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Embedding of a message's (standalone, normalised) question, cached on the message dict;
+# keys starting with "_" are runtime-only and left out of chat exports
+EMBEDDING_KEY = "_embedding"
+MAX_FOLLOW_UP_WORDS = 8
+TOPIC_WEIGHT = 0.35
+
+_LEAD_IN_RE = re.compile(
+    r"^\s*(?:(?:and|also|then|but|ok(?:ay)?|so)\b[\s,]*)?"
+    r"(?:what about|how about|what if|same (?:for|with)|is it the same for|and for|and in|and the|and)?\b[\s,]*",
+    re.IGNORECASE)
+_FOLLOW_UP_RE = re.compile(
+    r"^\s*(?:and|also|what about|how about|what if|same for|is it the same|then|but what|for an?|in an?)\b"
+    r"|\b(?:it|that|this|they|them|those|these|he|she)\b", re.IGNORECASE)
+
+# Who the question is about; a follow-up naming a new patient replaces the earlier one
+_PATIENT_RE = re.compile(
+    r"\b(?P<prep>(?:for|in|of|with)\s+)?(?:an?\s+|the\s+|my\s+)?"
+    r"(?:\d+(?:\.\d+)?[\s-]*(?:kg|kilos?|years?|yrs?|months?|weeks?|days?)(?:[\s-]*olds?)?(?:\s+(?:child|baby|infant|boy|girl))?"
+    r"|neonates?|newborns?|infants?|babies|baby|toddlers?|preschoolers?|children|child|adolescents?|teenagers?|adults?)\b",
+    re.IGNORECASE)
+
+
+def is_follow_up(text: str) -> bool:
+    """Short questions that lean on earlier turns ("and the dose?", "what about infants?")"""
+    words = text.split()
+    return 0 < len(words) <= MAX_FOLLOW_UP_WORDS and bool(_FOLLOW_UP_RE.search(text))
+
+
+def topic_message(text: str, earlier: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The earlier user message a follow-up refers to: the newest one that was not itself a follow-up"""
+    if not is_follow_up(text):
+        return None
+    for message in reversed(earlier):
+        if message.get("role") == "user" and message.get("content") and not is_follow_up(message["content"]):
+            return message
+    return None
+
+
+def rewrite(text: str, topic: str) -> str:
+    """Standalone question from a follow-up and the question that set the topic"""
+    remainder = _LEAD_IN_RE.sub("", text, count=1).strip().rstrip("?. ")
+    topic = topic.strip().rstrip("?. ")
+    if not remainder:
+        return topic + "?"
+    # "What is the heart rate for a neonate?" + "what about for a 5-year-old?" -> same question, new patient
+    new_patient = _PATIENT_RE.search(remainder)
+    if new_patient and _PATIENT_RE.search(topic) and new_patient.end() - new_patient.start() >= len(remainder) - 4:
+        # Keep the topic's "for"/"in" unless the follow-up brings its own
+        keep_prep = not new_patient.group("prep")
+        return _PATIENT_RE.sub(lambda m: ((m.group("prep") or "") if keep_prep else "") + remainder, topic, count=1) + "?"
+    return f"{topic} - {remainder}?"
+
+
+def message_embedding(message: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+    return None if message is None else message.get(EMBEDDING_KEY)
+
+
+def remember_embedding(message: Optional[Dict[str, Any]], embedding: np.ndarray):
+    if message is not None and embedding is not None:
+        message[EMBEDDING_KEY] = np.asarray(embedding, dtype=np.float32)
+
+
+def blend(embedding: np.ndarray, topic_embedding: Optional[np.ndarray], topic_weight: float = TOPIC_WEIGHT) -> np.ndarray:
+    """Question embedding pulled towards the topic it follows up on, L2-normalised"""
+    vector = np.asarray(embedding, dtype=np.float32)
+    vector = vector / (np.linalg.norm(vector) or 1.0)
+    if topic_embedding is None:
+        return vector
+    topic_vector = np.asarray(topic_embedding, dtype=np.float32)
+    topic_vector = topic_vector / (np.linalg.norm(topic_vector) or 1.0)
+    blended = (1 - topic_weight) * vector + topic_weight * topic_vector
+    return blended / (np.linalg.norm(blended) or 1.0)
+
+
+def strip_runtime_keys(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Messages without runtime caches such as embeddings, for saving or exporting"""
+    return [{key: value for key, value in message.items() if not key.startswith("_")} for message in messages]
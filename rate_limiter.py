@@ -0,0 +1,182 @@
+"""
+Client-side rate limiting and usage accounting for the OpenAI API
+Token buckets sized in requests and tokens per minute, Retry-After aware backoff,
+and per-session / per-day usage totals for the admin panel
+"""
+
+import logging
+import random
+import threading
+import time
+from datetime import date, datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Classic token bucket: capacity per minute, refilled continuously"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.available = float(per_minute)
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.available = min(self.capacity, self.available + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken (0 if available now); caller holds the limiter lock"""
+        self._refill(now)
+        # A single request larger than the bucket only waits for a full bucket
+        amount = min(amount, self.capacity)
+        return 0.0 if self.available >= amount else (amount - self.available) / self.rate
+
+    def take(self, amount: float):
+        self.available -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Process-wide requests-per-minute and tokens-per-minute limits
+
+    acquire() blocks (up to max_wait) until both buckets can cover the request, so short
+    bursts queue briefly instead of failing. penalize() pauses every caller after a 429.
+    """
+
+    def __init__(self, requests_per_minute: int = 60, tokens_per_minute: int = 40000):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.blocked_until = 0.0
+        self.throttled = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int, max_wait: float = 10.0) -> bool:
+        """Reserve one request and an estimated number of tokens; False if that takes longer than max_wait"""
+        deadline = time.monotonic() + max_wait
+        waited = False
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = max(self.blocked_until - now, self.requests.wait_time(1, now),
+                           self.tokens.wait_time(tokens, now))
+                if wait <= 0:
+                    self.requests.take(1)
+                    self.tokens.take(tokens)
+                    if waited:
+                        self.throttled += 1
+                    return True
+            if now + wait > deadline:
+                logger.warning(f"Rate limit would delay the request by {wait:.1f}s, giving up")
+                return False
+            waited = True
+            time.sleep(min(wait, 1.0))
+
+    def settle(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the token bucket once the real usage is known"""
+        with self._lock:
+            self.tokens.available = min(self.tokens.capacity, self.tokens.available + estimated_tokens - actual_tokens)
+
+    def penalize(self, delay: float):
+        """Hold back every caller for delay seconds after the server rate-limited us"""
+        with self._lock:
+            self.rate_limited += 1
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            return {
+                "requests_available": int(self.requests.available),
+                "requests_per_minute": int(self.requests.capacity),
+                "tokens_available": int(self.tokens.available),
+                "tokens_per_minute": int(self.tokens.capacity),
+                "throttled": self.throttled,
+                "rate_limited": self.rate_limited,
+                "paused_for_s": max(0.0, self.blocked_until - now)
+            }
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), if present"""
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None, base: float = 1.0, cap: float = 20.0) -> float:
+    """Delay before retry number attempt (0-based)
+
+    Honours Retry-After with a little jitter so queued callers don't retry in lockstep;
+    otherwise uses full-jitter exponential backoff.
+    """
+    if retry_after is not None:
+        return retry_after + random.uniform(0, 0.1 * retry_after + 0.25)
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class UsageTracker:
+    """Request and token totals per chatbot session and per calendar day"""
+
+    def __init__(self):
+        self.sessions: Dict[str, Dict[str, int]] = {}
+        self.days: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _empty() -> Dict[str, int]:
+        return {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "rate_limited": 0}
+
+    def record(self, session_id: str, prompt_tokens: int = 0, completion_tokens: int = 0, rate_limited: bool = False):
+        day = date.today().isoformat()
+        with self._lock:
+            for totals in (self.sessions.setdefault(session_id, self._empty()), self.days.setdefault(day, self._empty())):
+                if rate_limited:
+                    totals["rate_limited"] += 1
+                else:
+                    totals["requests"] += 1
+                    totals["prompt_tokens"] += prompt_tokens
+                    totals["completion_tokens"] += completion_tokens
+
+    def session_usage(self, session_id: str) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.sessions.get(session_id, self._empty()))
+
+    def daily_usage(self, days: int = 7) -> List[Dict[str, Any]]:
+        """Most recent days first"""
+        with self._lock:
+            return [dict(day=day, **totals) for day, totals in sorted(self.days.items(), reverse=True)[:days]]
+
+
+_shared_limiters: Dict[tuple, RateLimiter] = {}
+_shared_usage = UsageTracker()
+_shared_lock = threading.Lock()
+
+
+def get_shared_limiter(requests_per_minute: int = 60, tokens_per_minute: int = 40000) -> RateLimiter:
+    """Process-wide limiter, since the quota belongs to the API key rather than the session"""
+    key = (requests_per_minute, tokens_per_minute)
+    with _shared_lock:
+        limiter = _shared_limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+            _shared_limiters[key] = limiter
+        return limiter
+
+
+def get_shared_usage() -> UsageTracker:
+    return _shared_usage
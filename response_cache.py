@@ -0,0 +1,190 @@
+"""
+Semantic response cache
+Reuses LLM answers for questions whose embeddings are close to one already answered in
+the same prompt context (conversation summary and guidance), persisted in SQLite and
+invalidated whenever the knowledge base content changes
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def context_key(history: List[Dict[str, Any]], guidance: str) -> str:
+    """Key for the prompt around a question: the conversation summary and query guidance"""
+    return hashlib.sha1(json.dumps([history, guidance], default=str).encode("utf-8")).hexdigest()
+
+
+class SemanticResponseCache:
+    """Cosine-similarity lookup over cached answers, backed by a SQLite table
+
+    Embeddings are stored L2-normalised as float32 blobs; an in-memory matrix mirrors
+    the table so a lookup is a single matrix-vector product. Each entry carries a context
+    key and is only reused for a lookup with the same key, so an answer written for one
+    patient's conversation is never replayed into another.
+    """
+
+    def __init__(self, db_path: str = "response_cache.sqlite3", threshold: float = 0.92,
+                 max_entries: int = 2000):
+        self.db_path = db_path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.kb_hash = ""
+        self.lookups = 0
+        self.hits = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                query TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                response TEXT NOT NULL,
+                context_key TEXT NOT NULL DEFAULT '',
+                kb_hash TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 0,
+                last_hit_at REAL
+            )
+        """)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(responses)")]
+        if "context_key" not in columns:
+            # Entries cached before context keys existed may belong to any conversation
+            self._conn.execute("DELETE FROM responses")
+            self._conn.execute("ALTER TABLE responses ADD COLUMN context_key TEXT NOT NULL DEFAULT ''")
+            logger.info("Response cache upgraded to context keys, old entries dropped")
+        self._conn.commit()
+
+        self._ids: List[int] = []
+        self._context_keys = np.array([], dtype=object)
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._load_index()
+
+    def _load_index(self):
+        rows = self._conn.execute("SELECT id, embedding, context_key FROM responses ORDER BY id").fetchall()
+        self._ids = [row[0] for row in rows]
+        self._context_keys = np.array([row[2] for row in rows], dtype=object)
+        if rows:
+            self._matrix = np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+        else:
+            self._matrix = np.zeros((0, 0), dtype=np.float32)
+
+    @staticmethod
+    def _normalise(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def set_kb_version(self, kb_hash: str):
+        """Drop entries answered against a different knowledge base"""
+        with self._lock:
+            self.kb_hash = kb_hash
+            deleted = self._conn.execute("DELETE FROM responses WHERE kb_hash != ?", (kb_hash,)).rowcount
+            self._conn.commit()
+            if deleted:
+                logger.info(f"Knowledge base changed, invalidated {deleted} cached response(s)")
+                self._load_index()
+
+    def lookup(self, embedding, context_key: str = "") -> Optional[Dict[str, Any]]:
+        """Return the closest cached entry with this context key if its similarity clears the threshold"""
+        vector = self._normalise(embedding)
+        with self._lock:
+            self.lookups += 1
+            if not self._ids or self._matrix.shape[1] != vector.shape[0]:
+                return None
+
+            scores = np.where(self._context_keys == context_key, self._matrix @ vector, -np.inf)
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+            if similarity < self.threshold:
+                return None
+
+            entry_id = self._ids[best]
+            self._conn.execute("UPDATE responses SET hit_count = hit_count + 1, last_hit_at = ? WHERE id = ?",
+                               (time.time(), entry_id))
+            self._conn.commit()
+            row = self._conn.execute("SELECT query, response, hit_count FROM responses WHERE id = ?",
+                                     (entry_id,)).fetchone()
+            self.hits += 1
+
+        logger.info(f"Response cache hit (similarity {similarity:.3f}) for cached query '{row[0]}'")
+        return {"id": entry_id, "query": row[0], "response": row[1], "hit_count": row[2],
+                "similarity": similarity}
+
+    def store(self, query: str, embedding, response: str, context_key: str = ""):
+        """Cache an answer for the current knowledge base version and this context key"""
+        vector = self._normalise(embedding)
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO responses (query, embedding, response, context_key, kb_hash, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (query, vector.tobytes(), response, context_key, self.kb_hash, time.time()))
+
+            # Evict the least used, oldest entries once over capacity
+            overflow = len(self._ids) + 1 - self.max_entries
+            if overflow > 0:
+                self._conn.execute("""
+                    DELETE FROM responses WHERE id IN (
+                        SELECT id FROM responses ORDER BY hit_count ASC, COALESCE(last_hit_at, created_at) ASC
+                        LIMIT ?)
+                """, (overflow,))
+                self._conn.commit()
+                self._load_index()
+                return
+
+            self._conn.commit()
+            self._ids.append(cursor.lastrowid)
+            self._context_keys = np.append(self._context_keys, np.array([context_key], dtype=object))
+            if self._matrix.size:
+                self._matrix = np.vstack([self._matrix, vector])
+            else:
+                self._matrix = vector.reshape(1, -1)
+
+    def top_entries(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Most reused cached answers, for the admin panel"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT query, hit_count, created_at, last_hit_at FROM responses "
+                "ORDER BY hit_count DESC, created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [{"query": r[0], "hit_count": r[1], "created_at": r[2], "last_hit_at": r[3]} for r in rows]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._load_index()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._ids),
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate_pct": 100.0 * self.hits / self.lookups if self.lookups else 0.0,
+                "threshold": self.threshold
+            }
+
+
+_shared_caches: Dict[str, SemanticResponseCache] = {}
+_shared_caches_lock = threading.Lock()
+
+
+def get_shared_cache(db_path: str = "response_cache.sqlite3", threshold: float = 0.92,
+                     max_entries: int = 2000) -> SemanticResponseCache:
+    """Return the process-wide cache for db_path so every Streamlit session shares hits"""
+    with _shared_caches_lock:
+        cache = _shared_caches.get(db_path)
+        if cache is None:
+            cache = SemanticResponseCache(db_path, threshold, max_entries)
+            _shared_caches[db_path] = cache
+            logger.info(f"Response cache opened at {db_path} ({len(cache._ids)} entries)")
+        return cache
@@ -0,0 +1,168 @@
+"""
+Weight-based resuscitation drug and equipment sheets (Section 01 - Cardiopulmonary Resuscitation)
+Every dose for any number of weights is computed in one vectorised pass; sheets for the
+standard weight bands are built once at import and other weights are cached on first use
+"""
+
+import functools
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+import calculators
+
+SOURCE = "Section 01 - Medical Emergencies, Cardiopulmonary Resuscitation (KKH Baby Bear Book)"
+
+STANDARD_WEIGHTS_KG = (3, 4, 5, 6, 8, 10, 12, 14, 16, 18, 20, 25, 30, 35, 40, 50)
+
+# Drug rows: per-kg dose, cap, how to express the dose as a volume, and where it comes from.
+# "PALS" rows are standard paediatric life support values not printed in Section 01; a
+# "max_source" of "PALS" marks a Section 01 dose whose cap is the PALS single-dose maximum.
+RESUS_DRUGS: List[Dict[str, Any]] = [
+    {"item": "Adrenaline IV/IO (1:10 000)", "per_kg": 0.01, "max": 1.0, "unit": "mg", "ml_per_unit": 10.0,
+     "notes": "0.1 ml/kg of 1:10 000, every 3-5 min", "source": "Section 01", "max_source": "PALS"},
+    {"item": "Adrenaline ET (1:1000)", "per_kg": 0.1, "max": 2.5, "unit": "mg", "ml_per_unit": 1.0,
+     "notes": "0.1 ml/kg of 1:1000, then 5 ml saline flush and 5 ventilations", "source": "Section 01",
+     "max_source": "PALS"},
+    {"item": "Fluid bolus 0.9% NaCl", "per_kg": 20.0, "max": None, "unit": "ml", "ml_per_unit": 1.0,
+     "notes": "10-20 ml/kg aliquots, reassess after each", "source": "Section 01"},
+    {"item": "Defibrillation (1st shock)", "per_kg": 2.0, "max": 200.0, "unit": "J", "ml_per_unit": None,
+     "notes": "Shockable rhythm (VF/pulseless VT)", "source": "PALS"},
+    {"item": "Defibrillation (subsequent)", "per_kg": 4.0, "max": 200.0, "unit": "J", "ml_per_unit": None,
+     "notes": "Escalate to 4 J/kg", "source": "PALS"},
+    {"item": "Naloxone IV", "per_kg": 0.1, "max": 2.0, "unit": "mg", "ml_per_unit": None,
+     "notes": "Opioid toxicity; max 2 mg/dose", "source": "Section 01"},
+    {"item": "Calcium gluconate 10% IV", "per_kg": 0.5, "max": 20.0, "unit": "ml", "ml_per_unit": 1.0,
+     "notes": "Only for hypocalcaemia, hyperkalaemia or calcium channel blocker overdose", "source": "Section 01"},
+    {"item": "Sodium bicarbonate IV", "per_kg": 1.0, "max": None, "unit": "mmol", "ml_per_unit": 1.0,
+     "notes": "1-2 mmol/kg (8.4% = 1 mmol/ml); not routine in arrest", "source": "Section 01"},
+]
+
+# Age groups as used in the CPR section; the patient's group is estimated from weight
+CPR_GROUPS = [
+    {"group": "Infant", "upper_kg": 10, "depth": "3-4 cm (one third AP diameter)", "technique": "Two fingers or thumb-encircling",
+     "ratio": "15:2 (two rescuers), 30:2 (lone rescuer)", "intubated_rate": "30/min"},
+    {"group": "Child", "upper_kg": 40, "depth": "4-5 cm (one third AP diameter)", "technique": "Heel of 1-2 hands",
+     "ratio": "15:2 (two rescuers), 30:2 (lone rescuer)", "intubated_rate": "20/min"},
+    {"group": "Adolescent", "upper_kg": float("inf"), "depth": "4-6 cm (one third AP diameter)", "technique": "Heel of 2 hands",
+     "ratio": "30:2", "intubated_rate": "10-12/min"},
+]
+
+_PER_KG = np.array([d["per_kg"] for d in RESUS_DRUGS])
+_MAX = np.array([np.inf if d["max"] is None else d["max"] for d in RESUS_DRUGS])
+_ML_PER_UNIT = np.array([np.nan if d["ml_per_unit"] is None else d["ml_per_unit"] for d in RESUS_DRUGS])
+_GROUP_UPPER_KG = [g["upper_kg"] for g in CPR_GROUPS]
+
+
+def resus_doses(weights_kg) -> Dict[str, np.ndarray]:
+    """Dose and volume of every drug for every weight in one pass: arrays shaped (weights, drugs)"""
+    weights = np.asarray(weights_kg, dtype=float).reshape(-1, 1)
+    doses = np.minimum(weights * _PER_KG, _MAX)
+    return {"weight_kg": weights[:, 0], "dose": doses, "volume_ml": doses * _ML_PER_UNIT,
+            "capped": weights * _PER_KG > _MAX,
+            "group": np.searchsorted(_GROUP_UPPER_KG, weights[:, 0], side="left")}
+
+
+def _amount(value: float) -> str:
+    # Three significant figures without falling into exponent notation for large volumes
+    return f"{float(f'{value:.3g}'):g}"
+
+
+def _build_sheets(weights_kg) -> List[Dict[str, Any]]:
+    doses = resus_doses(weights_kg)
+    sheets = []
+    for i, weight in enumerate(doses["weight_kg"].tolist()):
+        drugs = []
+        for j, drug in enumerate(RESUS_DRUGS):
+            dose = float(doses["dose"][i, j])
+            volume = doses["volume_ml"][i, j]
+            drugs.append({
+                "item": drug["item"],
+                "dose": f"{_amount(dose)} {drug['unit']}" + (" (max)" if doses["capped"][i, j] else ""),
+                "volume": "" if np.isnan(volume) or drug["unit"] == "ml" else f"{_amount(volume)} ml",
+                "notes": drug["notes"],
+                "source": drug["source"],
+                "max_source": drug.get("max_source", drug["source"])
+            })
+        group = CPR_GROUPS[int(doses["group"][i])]
+        sheets.append({"weight_kg": weight, "cpr": group, "drugs": drugs})
+    return sheets
+
+
+# Standard bands are built together in a single vectorised pass when the module loads
+_STANDARD_SHEETS = dict(zip(STANDARD_WEIGHTS_KG, _build_sheets(STANDARD_WEIGHTS_KG)))
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_sheet(weight_kg: float) -> Dict[str, Any]:
+    return _build_sheets([weight_kg])[0]
+
+
+def resus_sheet(weight_kg: float) -> Dict[str, Any]:
+    """Drug and CPR sheet for one weight (rounded to 0.5 kg), from the cache where possible"""
+    weight = round(float(weight_kg) * 2) / 2
+    if weight <= 0:
+        raise ValueError("Weight must be positive")
+    if weight in _STANDARD_SHEETS:
+        return _STANDARD_SHEETS[weight]
+    return _cached_sheet(weight)
+
+
+def standard_chart() -> List[Dict[str, Any]]:
+    """Wall chart: one row per drug, one column per standard weight band"""
+    rows = []
+    for j, drug in enumerate(RESUS_DRUGS):
+        row = {"Drug / energy": drug["item"]}
+        for weight in STANDARD_WEIGHTS_KG:
+            entry = _STANDARD_SHEETS[weight]["drugs"][j]
+            row[f"{weight} kg"] = entry["volume"] or entry["dose"]
+        rows.append(row)
+    return rows
+
+
+def format_sheet(sheet: Dict[str, Any]) -> str:
+    """Markdown sheet for chat and printing"""
+    cpr = sheet["cpr"]
+    lines = [f"**🚑 Resuscitation sheet - {sheet['weight_kg']:g} kg** ({cpr['group']}, estimated from weight)", "",
+             "| Drug / energy | Dose | Volume | Notes |", "|---|---|---|---|"]
+    for drug in sheet["drugs"]:
+        flag = " †" if drug["source"] == "PALS" else " ‡" if drug["max_source"] == "PALS" else ""
+        lines.append(f"| {drug['item']}{flag} | {drug['dose']} | {drug['volume']} | {drug['notes']} |")
+    lines += ["",
+              f"• **Compressions:** 100-120/min, depth {cpr['depth']}, {cpr['technique']}",
+              f"• **Ratio:** {cpr['ratio']}; intubated: ventilate {cpr['intubated_rate']} without pausing compressions",
+              "• **Oxygen:** bag-mask with 100% O2 at ≥15 L/min; ETT size per Appendix III formulae",
+              "",
+              f"📖 *Source: {SOURCE}. † standard PALS value, not printed in Section 01. "
+              "‡ dose from Section 01, maximum from PALS.*"]
+    return "\n".join(lines)
+
+
+# --- Chat ----------------------------------------------------------------------------------
+
+# Adrenaline doses differ by indication (IM 1:1000 for anaphylaxis, IV 1:10 000 in arrest),
+# so a bare "adrenaline dose" is left to the other routes; only arrest wording brings up the sheet
+_ARREST = r"(?:cardiac\s+arrest|arrest|cpr|resus(?:citation)?|code\s+blue|pulseless)"
+_SHEET_RE = re.compile(
+    r"\b(?:resus(?:citation)?|code|arrest|crash|emergency)\s+(?:drug\s+)?(?:sheet|chart|drugs|doses|card)\b"
+    r"|\b(?:adrenaline|epinephrine)\s+dose\b(?=.*\b" + _ARREST + r"\b)"
+    r"|\b" + _ARREST + r"\b.*\b(?:adrenaline|epinephrine)\s+dose\b"
+    r"|\bdefib(?:rillation)?\s+(?:energy|joules|dose)\b",
+    re.IGNORECASE)
+ASK_FOR_WEIGHT = ("To build the resuscitation sheet I need the child's weight, e.g. *resus sheet 12 kg*. "
+                  "A printable chart for standard weights is on the Calculators page (🚑 Resus Sheet).")
+
+
+def answer_resus_query(text: str) -> Optional[str]:
+    """Resuscitation sheet for a chat request such as 'resus sheet 12 kg', or None"""
+    if not _SHEET_RE.search(text):
+        return None
+    weight = calculators.extract_entities(text).get("weight_kg")
+    if not weight:
+        return ASK_FOR_WEIGHT
+    try:
+        return format_sheet(resus_sheet(weight))
+    except ValueError:
+        # Rounds to 0 kg, e.g. "resus sheet 0.2 kg"
+        return ASK_FOR_WEIGHT
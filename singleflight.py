@@ -0,0 +1,93 @@
+"""
+Singleflight request coalescing
+Concurrent identical requests share one in-flight computation and all receive its result
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces calls by key; keys are tuples whose first element names the kind of work"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.executed: Dict[str, int] = {}
+        self.coalesced: Dict[str, int] = {}
+
+    def acquire(self, key: Tuple) -> Tuple[_Call, bool]:
+        """Register interest in key; returns (call, is_leader)
+
+        The leader must later call complete(); followers call wait().
+        """
+        kind = str(key[0])
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced[kind] = self.coalesced.get(kind, 0) + 1
+                return call, False
+            call = _Call()
+            self._calls[key] = call
+            self.executed[kind] = self.executed.get(kind, 0) + 1
+            return call, True
+
+    def complete(self, key: Tuple, call: _Call, result: Any = None, error: Optional[BaseException] = None):
+        """Publish the leader's result (or error) to every follower"""
+        call.result = result
+        call.error = error
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        if call.waiters:
+            logger.info(f"Coalesced {call.waiters} identical request(s) for {key[0]}")
+        call.done.set()
+
+    @staticmethod
+    def wait(call: _Call, timeout: Optional[float] = None) -> Any:
+        if not call.done.wait(timeout):
+            raise TimeoutError("Timed out waiting for coalesced request")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def do(self, key: Tuple, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn once per key at a time; concurrent callers with the same key get the same result"""
+        call, is_leader = self.acquire(key)
+        if not is_leader:
+            return self.wait(call)
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self.complete(key, call, error=e)
+            raise
+        self.complete(key, call, result=result)
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Executed and saved call counts per kind of work"""
+        with self._lock:
+            kinds = set(self.executed) | set(self.coalesced)
+            return {kind: {"executed": self.executed.get(kind, 0), "saved": self.coalesced.get(kind, 0)}
+                    for kind in sorted(kinds)}
+
+
+_shared_group = SingleFlight()
+
+
+def get_shared_group() -> SingleFlight:
+    """Process-wide group so identical questions from different Streamlit sessions coalesce"""
+    return _shared_group
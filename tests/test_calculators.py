@@ -0,0 +1,108 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+import calculators
+
+class TestCalculators(unittest.TestCase):
+
+    def test_entity_extraction_units(self):
+        """Test that quantities are normalised to kg, months, mL, hours, cm and mg/kg"""
+        entities = calculators.extract_entities("18 month old, 22 lb, 1.5 L over 90 mins, 15 mg/kg, 80 cm")
+        self.assertAlmostEqual(entities['weight_kg'], 9.98)
+        self.assertEqual(entities['age_months'], 18)
+        self.assertEqual(entities['volume_ml'], 1500)
+        self.assertEqual(entities['time_hours'], 1.5)
+        self.assertEqual(entities['dose_per_kg'], 15)
+        self.assertEqual(entities['height_cm'], 80)
+        self.assertEqual(calculators.extract_entities("a 3200 g baby")['weight_kg'], 3.2)
+        self.assertEqual(calculators.extract_entities("3 years old")['age_months'], 36)
+
+    def test_calculator_detection(self):
+        """Test that each calculator is detected and non-calculations are left alone"""
+        cases = {
+            "calculate fluid requirements for 10kg patient": "fluid",
+            "dose of 15 mg/kg for a 14 kg child": "dose",
+            "ceftriaxone 50 mcg/kg for 20 kg": "dose",
+            "what rate for 500 mL over 4 hours?": "iv_rate",
+            "BMI for 30 kg, 130 cm": "bmi",
+            "paracetamol dose for 12 kg 18 months": "paracetamol",
+            "is HR 190 normal for a neonate?": "vital_signs",
+        }
+        for query, expected in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(calculators.run_calculation(query)['calculator'], expected)
+
+        for query in ["paracetamol overdose in a 12 kg child", "What is the weight of a newborn?",
+                      "What are maintenance fluid requirements?", "fluid bolus for 10 kg",
+                      "What is the adrenaline dose for anaphylaxis in a 12 kg child?",
+                      "ceftriaxone dose for 20 kg", "dose of IM adrenaline 1:1000 for 15 kg"]:
+            with self.subTest(query=query):
+                self.assertIsNone(calculators.run_calculation(query))
+
+    def test_fluid_results(self):
+        """Test Holliday-Segar results and the chat answer built from them"""
+        for weight, daily, hourly in ((5, 500, 20), (15, 1250, 50), (25, 1600, 65)):
+            result = calculators.fluid_requirements(weight)
+            self.assertEqual(result['daily_ml'], daily)
+            self.assertEqual(result['hourly_ml'], hourly)
+        answer = calculators.answer_calculation("what is the fluid calculation for 15kg child")
+        self.assertIn("1250", answer)
+        self.assertIn("50", answer)
+
+    def test_missing_inputs_prompt(self):
+        """Test that a calculation without its inputs asks for them instead of guessing"""
+        calculation = calculators.run_calculation("dosage calculation for medication")
+        self.assertEqual(calculation['missing'], ['weight_kg', 'dose_per_kg'])
+        self.assertIsNone(calculation['result'])
+        answer = calculators.answer_calculation("dosage calculation for medication")
+        self.assertIn("weight", answer)
+        self.assertIn("mg/kg", answer)
+
+    def test_zero_inputs_are_asked_for(self):
+        """Test zero time, height or weight asks for the input instead of dividing by zero"""
+        calculation = calculators.run_calculation("rate for 500 mL over 0 hours")
+        self.assertEqual(calculation['missing'], ['time_hours'])
+        self.assertIsNone(calculation['result'])
+        self.assertIn("infusion time", calculators.answer_calculation("rate for 500 mL over 0 hours"))
+        self.assertIn("height", calculators.answer_calculation("BMI for 30 kg, 0 cm"))
+        self.assertIn("weight", calculators.answer_calculation("dose of 15 mg/kg for 0 kg"))
+
+    def test_vital_signs_check(self):
+        """Test vital signs from chat against the age-group ranges"""
+        result = calculators.run_calculation("is HR 190 and RR 50 normal for a neonate?")['result']
+        self.assertFalse(result['checks']['HR']['normal'])
+        self.assertTrue(result['checks']['RR']['normal'])
+        self.assertNotIn('SBP', result['checks'])
+        self.assertEqual(calculators.run_calculation("18 month old HR 120")['inputs']['age_group'], "Toddler (1-2yr)")
+
+    def test_batch_matches_scalar(self):
+        """Test that the vectorised calculators give exactly the scalar results"""
+        weights = [0.8, 5, 10, 10.1, 15, 20, 20.1, 25, 63.4]
+        fluids = calculators.fluid_requirements_batch(weights)
+        doses = calculators.medication_dose_batch(weights, 15)
+        paracetamol = calculators.paracetamol_dose_batch(weights)
+        for i, weight in enumerate(weights):
+            scalar = calculators.fluid_requirements(weight)
+            self.assertEqual(fluids['daily_ml'][i], scalar['daily_ml'])
+            self.assertEqual(fluids['hourly_ml'][i], scalar['hourly_ml'])
+            self.assertEqual(doses['total_mg'][i], calculators.medication_dose(weight, 15)['total_mg'])
+            self.assertEqual(paracetamol['daily_max_mg'][i], calculators.paracetamol_dose(weight)['daily_max_mg'])
+
+    def test_ward_list(self):
+        """Test ward list calculation keeps every row and flags invalid weights"""
+        ward = pd.DataFrame({"patient": ["Bed 1", "Bed 2", "Bed 3"], "weight_kg": [15, "", -2],
+                             "dose_per_kg": [10, 10, 10]})
+        results = calculators.calculate_ward_list(ward)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results['maintenance_ml_per_day'][0], 1250)
+        self.assertEqual(results['dose_mg'][0], 150)
+        self.assertEqual(list(results['check'] != ""), [False, True, True])
+        with self.assertRaises(ValueError):
+            calculators.calculate_ward_list(pd.DataFrame({"patient": ["Bed 1"]}))
+
+if __name__ == '__main__':
+    unittest.main()
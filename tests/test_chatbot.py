@@ -3,10 +3,26 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from mock_llm_server import MockLLMServer
 from app import NursingChatbot
 
 class TestNursingChatbot(unittest.TestCase):
     
+    @classmethod
+    def setUpClass(cls):
+        # Answer LLM calls from a local stand-in instead of the ward LM Studio box
+        cls.llm_server = MockLLMServer().start()
+        cls.previous_endpoint = os.environ.get('LLM_ENDPOINT')
+        os.environ['LLM_ENDPOINT'] = cls.llm_server.endpoint
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.llm_server.stop()
+        if cls.previous_endpoint is None:
+            os.environ.pop('LLM_ENDPOINT', None)
+        else:
+            os.environ['LLM_ENDPOINT'] = cls.previous_endpoint
+    
     def setUp(self):
         self.chatbot = NursingChatbot()
     
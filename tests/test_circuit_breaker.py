@@ -0,0 +1,60 @@
+import unittest
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from circuit_breaker import CircuitBreaker
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_after_consecutive_failures(self):
+        """Test that the breaker opens only after the failure threshold"""
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertTrue(breaker.allow_request())
+
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow_request())
+        self.assertEqual(breaker.snapshot()['short_circuited'], 1)
+
+    def test_success_resets_failure_count(self):
+        """Test that a success in between failures keeps the breaker closed"""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_background_probe_closes_breaker(self):
+        """Test that a healthy half-open probe closes the breaker"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01, probe=lambda: True)
+        breaker.record_failure()
+        time.sleep(0.02)
+
+        # Requests are still short-circuited while the probe runs in the background
+        self.assertFalse(breaker.allow_request())
+        for _ in range(100):
+            if breaker.state == CircuitBreaker.CLOSED:
+                break
+            time.sleep(0.01)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow_request())
+
+    def test_failed_probe_reopens_breaker(self):
+        """Test that an unhealthy probe re-opens the breaker for another cool-down"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01, probe=lambda: False)
+        breaker.record_failure()
+        time.sleep(0.02)
+        breaker.allow_request()
+        for _ in range(100):
+            if breaker.state == CircuitBreaker.OPEN:
+                break
+            time.sleep(0.01)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(breaker.trips, 2)
+
+if __name__ == '__main__':
+    unittest.main()
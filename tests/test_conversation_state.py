@@ -0,0 +1,62 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import conversation_state
+
+class TestConversationState(unittest.TestCase):
+
+    def test_facts_are_extracted_and_corrected(self):
+        """Test age, weight and presenting problem come from user messages, newest value winning"""
+        messages = [{"role": "user", "content": "2 year old, 12 kg, presenting with fever. What fluids?"},
+                    {"role": "assistant", "content": "**Maintenance** is 46 ml/hr. Reassess hourly."},
+                    {"role": "user", "content": "Sorry, she is 14 kg. Signs of dehydration?"}]
+        state = conversation_state.state_for(messages)
+        self.assertEqual(state['age_months'], 24)
+        self.assertEqual(state['weight_kg'], 14)
+        self.assertEqual(state['problems'], ['fever', 'dehydration'])
+        self.assertEqual(state['topics'], ['What fluids?', 'Signs of dehydration?'])
+        self.assertEqual(state['last_answer'], 'Maintenance is 46 ml/hr')
+
+    def test_remembered_state_is_resumed(self):
+        """Test a stored state is extended from where it stopped instead of refolding the chat"""
+        messages = [{"role": "user", "content": "8 month old with bronchiolitis"}]
+        conversation_state.remember_turn([], messages[0], "Give oxygen if saturation is below 92%.")
+        self.assertEqual(messages[0][conversation_state.STATE_KEY]['messages'], 2)
+        messages[0][conversation_state.STATE_KEY]['problems'] = ['stored']
+        messages += [{"role": "assistant", "content": "Give oxygen if saturation is below 92%."},
+                     {"role": "user", "content": "And feeding?"}]
+        state = conversation_state.state_for(messages)
+        self.assertEqual(state['problems'], ['stored'])
+        self.assertEqual(state['topics'], ['8 month old with bronchiolitis', 'And feeding?'])
+
+    def test_turn_is_found_behind_a_provisional_answer(self):
+        """Test the question is found and remembered even when an answer already follows it"""
+        messages = [{"role": "user", "content": "12 kg child with croup"},
+                    {"role": "assistant", "content": "Give dexamethasone."},
+                    {"role": "user", "content": "And fluids?"},
+                    {"role": "assistant", "content": "Provisional answer", "provisional": True}]
+        question, earlier = conversation_state.split_turn("And fluids?", messages)
+        self.assertIs(question, messages[2])
+        self.assertEqual(earlier, messages[:2])
+        conversation_state.remember_turn(earlier, question, "Maintenance is 44 ml/hr.")
+        self.assertEqual(messages[2][conversation_state.STATE_KEY]['messages'], 4)
+        self.assertEqual(messages[2][conversation_state.STATE_KEY]['last_answer'], "Maintenance is 44 ml/hr")
+        self.assertEqual(conversation_state.split_turn("Something else?", messages), (None, messages))
+
+    def test_history_stays_small(self):
+        """Test the prompt history is one bounded message however long the conversation"""
+        messages = []
+        for turn in range(50):
+            messages.append({"role": "user", "content": f"Question {turn} about a 10 kg child with asthma? " * 5})
+            conversation_state.remember_turn(messages[:-1], messages[-1], "• A long answer. " * 40)
+            messages.append({"role": "assistant", "content": "• A long answer. " * 40})
+        history = conversation_state.history_messages(conversation_state.state_for(messages))
+        self.assertEqual(len(history), 1)
+        self.assertLess(len(history[0]['content']), 500)
+        self.assertIn("10 kg", history[0]['content'])
+        self.assertEqual(conversation_state.history_messages(conversation_state.new_state()), [])
+
+if __name__ == '__main__':
+    unittest.main()
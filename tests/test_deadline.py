@@ -0,0 +1,90 @@
+import unittest
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import NursingChatbot, attach_background_answer, get_background_answers, PROVISIONAL_NOTICE
+
+def make_chatbot(delay, answer="• Final LLM answer"):
+    """Chatbot without models loaded whose LLM pipeline takes delay seconds"""
+    chatbot = NursingChatbot.__new__(NursingChatbot)
+    chatbot.histories = []
+
+    def slow_query(user_input, chat_history=None, prepared=None):
+        chatbot.histories.append(chat_history)
+        time.sleep(delay)
+        return answer
+
+    def slow_stream(user_input, chat_history=None, prepared=None):
+        time.sleep(delay)
+        yield "• Final"
+        yield answer
+
+    chatbot.background_answers = get_background_answers()
+    chatbot.prepare_query = lambda user_input, chat_history=None: {'context': "", 'question': user_input}
+    chatbot.process_query = slow_query
+    chatbot.process_query_stream = slow_stream
+    chatbot.provisional_answer = lambda user_input: f"{PROVISIONAL_NOTICE}\n\n• From the knowledge base"
+    return chatbot
+
+def make_routed_chatbot(answer):
+    """Chatbot without models loaded whose every question is answered by a deterministic route"""
+    chatbot = NursingChatbot.__new__(NursingChatbot)
+    chatbot.background_answers = get_background_answers()
+    chatbot.prepare_query = lambda user_input, chat_history=None: {'answer': answer}
+    chatbot.remember_turn = lambda *args: None
+    return chatbot
+
+class TestAnswerDeadline(unittest.TestCase):
+
+    def test_fast_answer_is_final(self):
+        """Test that an answer within the deadline is returned directly"""
+        response, pending = make_chatbot(0.0).process_query_with_deadline("cpr rate", deadline=1.0)
+        self.assertEqual(response, "• Final LLM answer")
+        self.assertIsNone(pending)
+
+    def test_slow_answer_replaces_provisional_message(self):
+        """Test that a late LLM answer replaces the provisional chat message"""
+        start = time.perf_counter()
+        response, pending = make_chatbot(0.3).process_query_with_deadline("cpr rate", deadline=0.05)
+        self.assertLess(time.perf_counter() - start, 0.25)
+        self.assertTrue(response.startswith(PROVISIONAL_NOTICE))
+
+        message = {"role": "assistant", "content": response}
+        attach_background_answer(message, pending)
+        self.assertTrue(message["provisional"])
+        pending.result(timeout=2)
+        self.assertEqual(message["content"], "• Final LLM answer")
+        self.assertFalse(message["provisional"])
+
+    def test_stream_deadline(self):
+        """Test that a stream without tokens by the deadline is finished in the background"""
+        stream, pending = make_chatbot(0.3).stream_query_with_deadline("cpr rate", deadline=0.05)
+        self.assertTrue(list(stream)[0].startswith(PROVISIONAL_NOTICE))
+        self.assertEqual(pending.result(timeout=2), "• Final LLM answer")
+
+        stream, pending = make_chatbot(0.0).stream_query_with_deadline("cpr rate", deadline=1.0)
+        self.assertIsNone(pending)
+        self.assertEqual(list(stream), ["• Final", "• Final LLM answer"])
+
+    def test_routed_answer_is_never_provisional(self):
+        """Test that fast-path, resus and calculator answers are final even with no time left"""
+        chatbot = make_routed_chatbot("• Adrenaline 0.1 mL/kg of 1:10,000")
+        self.assertEqual(chatbot.process_query_with_deadline("cpr drugs 10 kg", deadline=0.0),
+                         ("• Adrenaline 0.1 mL/kg of 1:10,000", None))
+        stream, pending = chatbot.stream_query_with_deadline("cpr drugs 10 kg", deadline=0.0)
+        self.assertIsNone(pending)
+        self.assertEqual(list(stream), ["• Adrenaline 0.1 mL/kg of 1:10,000"])
+
+    def test_background_answer_gets_history_snapshot(self):
+        """Test that appending the provisional message does not change the history the late answer sees"""
+        chatbot = make_chatbot(0.3)
+        messages = [{"role": "user", "content": "cpr rate"}]
+        response, pending = chatbot.process_query_with_deadline("cpr rate", messages, deadline=0.05)
+        messages.append({"role": "assistant", "content": response})
+        pending.result(timeout=2)
+        self.assertEqual(chatbot.histories, [[{"role": "user", "content": "cpr rate"}]])
+
+if __name__ == '__main__':
+    unittest.main()
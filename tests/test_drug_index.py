@@ -0,0 +1,75 @@
+import unittest
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from drug_index import DrugIndex, correction_note, edit_distance
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KB_TEXT = ("Give IV Atropine 0.02 mg/kg for bradycardia. Fomepizole 15 mg/kg loading dose. "
+           "Check the infusion rate and repeat doses as needed. Intubation may be required.")
+
+class TestDrugIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = DrugIndex.from_knowledge_base([KB_TEXT], os.path.join(ROOT, 'drug_names.yaml'))
+
+    def test_misspellings_resolve_to_canonical_name(self):
+        """Test one- and two-letter typos and swapped letters find the right drug"""
+        self.assertEqual(self.index.lookup('paracetemol')['canonical'], 'paracetamol')
+        self.assertEqual(self.index.lookup('acetylcystein')['canonical'], 'acetylcysteine')
+        self.assertEqual(self.index.lookup('adrenalin')['canonical'], 'adrenaline')
+        self.assertEqual(self.index.lookup('salbuatmol')['distance'], 1)
+        self.assertEqual(edit_distance('salbuatmol', 'salbutamol', 2), 1)
+
+    def test_synonyms_and_phrases_are_rewritten(self):
+        """Test brand, international and multi-word names become the canonical name"""
+        rewritten, matches = self.index.canonicalize("Acetaminophen overdose, when to start NAC?")
+        self.assertEqual(rewritten, "paracetamol overdose, when to start acetylcysteine?")
+        self.assertEqual([m['canonical'] for m in matches], ['paracetamol', 'acetylcysteine'])
+        self.assertEqual(self.index.canonicalize("dose of magnesium sulfate")[0], "dose of magnesium sulphate")
+
+    def test_ordinary_words_are_left_alone(self):
+        """Test knowledge base words and short words are never corrected into drugs"""
+        text = "Check the infusion rate and repeat doses; intubation may be needed"
+        self.assertEqual(self.index.canonicalize(text), (text, []))
+        self.assertIsNone(self.index.lookup('morp'))
+        self.assertEqual(self.index.lookup('fomepizol')['canonical'], 'fomepizole')
+
+    def test_other_drugs_are_not_rewritten(self):
+        """Test real drugs one or two edits from an indexed name are never turned into it"""
+        for text in ("ampicillin dose for 10 kg", "prednisone for asthma", "cefotaxime dose"):
+            self.assertEqual(self.index.canonicalize(text), (text, []))
+        # As close to ampicillin as to amoxicillin - left as typed
+        self.assertIsNone(self.index.lookup('ampicilin'))
+        self.assertEqual(self.index.lookup('amoxicilin')['canonical'], 'amoxicillin')
+        self.assertEqual(self.index.lookup('prednisolon')['canonical'], 'prednisolone')
+        self.assertGreater(self.index.stats()['ambiguous'], 0)
+
+    def test_two_edits_only_without_another_drug_nearby(self):
+        """Test a two-edit typo is corrected only when no other drug is within three edits"""
+        index = DrugIndex({'amoxicillin': []})
+        self.assertEqual(index.lookup('amoxcilin')['distance'], 2)
+        index = DrugIndex({'amoxicillin': []}, other_drugs=['ampicillin'])
+        self.assertIsNone(index.lookup('amoxcilin'))
+        self.assertIsNone(index.lookup('ampicillin'))
+
+    def test_correction_note_for_the_llm(self):
+        """Test corrected and translated names are explained, exact names are not"""
+        _, matches = self.index.canonicalize("paracetemol or acetaminophen with atropine")
+        note = correction_note(matches)
+        self.assertIn('"paracetemol" was read as paracetamol (did you mean paracetamol?)', note)
+        self.assertIn('"acetaminophen" is paracetamol', note)
+        self.assertNotIn('atropine', note)
+        self.assertEqual(correction_note(self.index.canonicalize("atropine dose")[1]), "")
+
+    def test_lookup_is_fast(self):
+        """Test a misspelt lookup takes well under a millisecond"""
+        start = time.perf_counter()
+        for _ in range(1000):
+            self.index.lookup('paracetemol')
+        self.assertLess((time.perf_counter() - start) / 1000, 0.001)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import sys
+import os
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fast_path import FastPathEngine
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fast_paths.yaml")
+
+class TestFastPathEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = FastPathEngine(RULES_FILE)
+
+    def test_fast_path_neonatal_heart_rate(self):
+        """Test that neonatal heart rate questions are answered without the LLM"""
+        answer = self.engine.answer("What is the normal heart rate range for neonate?")
+        self.assertIn("120-180", answer)
+        self.assertIsNone(self.engine.answer("How do I manage anaphylaxis?"))
+        self.assertEqual(self.engine.stats()['misses']['fast_path'], 1)
+
+    def test_fallback_rule_order(self):
+        """Test that fallback rules keep the original precedence"""
+        cases = {
+            "What are the steps of ABCDE assessment?": "abcde_assessment",
+            "What are normal vital signs for a newborn?": "neonatal_vital_signs_fallback",
+            "What are normal vital signs for a toddler?": "vital_signs",
+            "What is the dose of paracetamol?": "medication_safety",
+            "When should I call for help?": "when_to_call_for_help",
+            "When to escalate care?": "escalation_criteria",
+            "How do I comfort a parent?": "general_nursing_fallback",
+        }
+        for question, rule_id in cases.items():
+            self.assertEqual(self.engine.match(question, stage="fallback")["id"], rule_id, question)
+        hits = {rule['id']: rule['hits'] for rule in self.engine.stats()['rules']}
+        self.assertEqual(hits["vital_signs"], 1)
+
+    def test_overlapping_phrases_all_found(self):
+        """Test that phrases contained in longer matches are still detected"""
+        found = self.engine.phrases_in("normal heart rate range for neonate")
+        self.assertTrue({"normal heart rate range for neonate", "heart rate range for neonate",
+                         "heart rate", "neonate"} <= found)
+
+    def test_reload_on_change(self):
+        """Test that editing the data file changes answers without a restart"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "rules.yaml")
+            with open(path, "w") as f:
+                f.write("version: 1\nrules:\n  - id: cpr\n    any: [cpr rate]\n    answer: '• 100-120/min'\n")
+            engine = FastPathEngine(path, reload_interval=0)
+            self.assertEqual(engine.answer("cpr rate?"), "• 100-120/min")
+
+            time.sleep(0.01)
+            with open(path, "w") as f:
+                f.write("version: 2\nrules:\n  - id: cpr\n    any: [cpr rate]\n    answer: '• 100-120 per minute'\n")
+            os.utime(path, (time.time() + 5, time.time() + 5))
+            self.assertEqual(engine.answer("cpr rate?"), "• 100-120 per minute")
+            self.assertEqual(engine.stats()['version'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_client import LatencyStats, LLMClient
+from mock_llm_server import MockLLMConfig, MockLLMServer
+
+class TestLatencyStats(unittest.TestCase):
+
+    def test_summary_splits_connect_and_generation(self):
+        """Test averages, p95 and reuse over the window, with generation excluding connection setup"""
+        stats = LatencyStats(window=3)
+        self.assertEqual(stats.summary()['requests'], 0)
+        stats.record(0.0, 1.0, 200)
+        stats.record(0.5, 1.5, 200, first_token_s=0.75)
+        stats.record(0.0, 2.0, 200, first_token_s=0.25)
+        stats.record(0.0, 3.0, 500)
+        summary = stats.summary()
+        self.assertEqual(summary['requests'], 4)
+        self.assertAlmostEqual(summary['avg_connect_ms'], 500 / 3)
+        self.assertAlmostEqual(summary['avg_generation_ms'], (1000 + 2000 + 3000) / 3)
+        self.assertAlmostEqual(summary['avg_first_token_ms'], 500)
+        self.assertEqual(summary['p95_total_ms'], 3000)
+        self.assertAlmostEqual(summary['connection_reuse_pct'], 200 / 3)
+
+    def test_keep_alive_connection_is_reused(self):
+        """Test the pooled session connects once and reuses the connection for later requests"""
+        with MockLLMServer() as server:
+            client = LLMClient(server.endpoint)
+            payload = {"model": "mock", "messages": [{"role": "user", "content": "cpr"}]}
+            for _ in range(3):
+                self.assertEqual(client.post_chat(payload).status_code, 200)
+            summary = client.stats.summary()
+            client.close()
+        self.assertEqual(summary['requests'], 3)
+        self.assertAlmostEqual(summary['connection_reuse_pct'], 200 / 3)
+        self.assertGreater(summary['avg_connect_ms'], 0)
+
+class TestResolveModel(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockLLMServer(config=MockLLMConfig(model="phi-2")).start()
+        self.port = self.server._server.server_address[1]
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_discovered_model_is_cached_until_invalidated(self):
+        """Test /v1/models is probed once per TTL and again after invalidate_model"""
+        client = LLMClient(self.server.endpoint)
+        self.assertEqual(client.resolve_model(), "phi-2")
+        self.server.config.model = "llama-3"
+        self.assertEqual(client.resolve_model(), "phi-2")
+        client.invalidate_model()
+        self.assertEqual(client.resolve_model("missing-model"), "llama-3")
+        client.invalidate_model()
+        self.assertEqual(client.resolve_model("llama-3"), "llama-3")
+        client.close()
+
+    def test_failed_discovery_is_retried_soon(self):
+        """Test a failed probe falls back to "" and is retried after model_retry_ttl, not model_ttl"""
+        endpoint = self.server.endpoint
+        self.server.stop()
+        client = LLMClient(endpoint, model_ttl=600, model_retry_ttl=0)
+        patient = LLMClient(endpoint, model_ttl=600, model_retry_ttl=600)
+        self.assertEqual(client.resolve_model(), "")
+        self.assertEqual(patient.resolve_model(), "")
+
+        self.server = MockLLMServer(port=self.port, config=MockLLMConfig(model="phi-2")).start()
+        self.assertEqual(client.resolve_model(), "phi-2")
+        self.assertEqual(patient.resolve_model(), "")
+        client.close()
+        patient.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import sys
+import os
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_client import LLMClient
+from llm_pool import LLMPool, NoHealthyEndpoint
+
+def start_backend(name, delay=0.0):
+    """Minimal OpenAI-compatible backend answering with its own name after a delay"""
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._send({"data": [{"id": f"{name}-model"}]})
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(delay)
+            self._send({"choices": [{"message": {"content": f"{name}:{payload['model']}"}}]})
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+
+class TestLLMPool(unittest.TestCase):
+
+    def setUp(self):
+        self.servers = []
+
+    def tearDown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def backend(self, name, delay=0.0):
+        server, endpoint = start_backend(name, delay)
+        self.servers.append(server)
+        return LLMClient(endpoint)
+
+    def test_least_outstanding_and_unhealthy_skipped(self):
+        """Test that the least busy healthy endpoint is chosen"""
+        a = LLMClient("http://127.0.0.1:9/v1/chat/completions")
+        b = LLMClient("http://127.0.0.1:10/v1/chat/completions")
+        pool = LLMPool([a, b])
+
+        pool.outstanding[a.endpoint] = 2
+        self.assertIs(pool.select(), b)
+
+        for _ in range(3):
+            b.breaker.record_failure()
+        self.assertIs(pool.select(), a)
+
+        for _ in range(3):
+            a.breaker.record_failure()
+        with self.assertRaises(NoHealthyEndpoint):
+            pool.select()
+
+    def test_model_discovered_per_endpoint(self):
+        """Test that an empty model is filled with the model loaded on the chosen endpoint"""
+        pool = LLMPool([self.backend("box1")])
+        response = pool.post_chat({"model": "", "messages": []})
+        self.assertEqual(response.json()["choices"][0]["message"]["content"], "box1:box1-model")
+        self.assertEqual(pool.snapshot()[0]["outstanding"], 0)
+
+    def test_hedged_request_uses_faster_backend(self):
+        """Test that a request past the primary's p95 is hedged and the first answer wins"""
+        slow = self.backend("slow", delay=1.0)
+        fast = self.backend("fast")
+        for _ in range(20):
+            slow.stats.record(0.0, 0.05, 200)
+            fast.stats.record(0.0, 0.1, 200)
+        pool = LLMPool([slow, fast], discover_models=False, hedge=True, hedge_min_samples=20)
+
+        start = time.perf_counter()
+        response = pool.post_chat({"model": "m", "messages": []})
+        self.assertEqual(response.json()["choices"][0]["message"]["content"], "fast:m")
+        self.assertLess(time.perf_counter() - start, 0.9)
+        self.assertEqual(pool.hedge_stats(), {"enabled": True, "sent": 1, "won": 1})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_scheduler import LLMScheduler, SchedulerFull
+
+class TestLLMScheduler(unittest.TestCase):
+
+    def test_concurrency_limit(self):
+        """Test that no more than max_concurrency requests run at once"""
+        scheduler = LLMScheduler(max_concurrency=2, max_queue=16)
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+
+        def work():
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+
+        threads = [threading.Thread(target=scheduler.submit, args=(work,)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(peak[0], 2)
+        self.assertEqual(scheduler.snapshot()['completed'], 8)
+
+    def test_emergency_served_before_routine(self):
+        """Test that queued emergency requests jump ahead of earlier routine requests"""
+        scheduler = LLMScheduler(max_concurrency=1, max_queue=16)
+        order = []
+        release = threading.Event()
+
+        blocker = threading.Thread(target=scheduler.submit, args=(release.wait,))
+        blocker.start()
+        time.sleep(0.05)
+
+        threads = []
+        for label, priority in [("routine-1", LLMScheduler.ROUTINE), ("routine-2", LLMScheduler.ROUTINE),
+                                ("emergency", LLMScheduler.EMERGENCY)]:
+            t = threading.Thread(target=scheduler.submit, args=(order.append, label), kwargs={"priority": priority})
+            t.start()
+            threads.append(t)
+            time.sleep(0.02)
+
+        release.set()
+        for t in threads + [blocker]:
+            t.join()
+
+        self.assertEqual(order, ["emergency", "routine-1", "routine-2"])
+
+    def test_queue_timeout_rejects(self):
+        """Test that waiting longer than the timeout raises SchedulerFull"""
+        scheduler = LLMScheduler(max_concurrency=1, max_queue=4)
+        release = threading.Event()
+        blocker = threading.Thread(target=scheduler.submit, args=(release.wait,))
+        blocker.start()
+        time.sleep(0.05)
+
+        with self.assertRaises(SchedulerFull):
+            scheduler.submit(lambda: None, timeout=0.05)
+        release.set()
+        blocker.join()
+        self.assertEqual(scheduler.snapshot()['rejected'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from circuit_breaker import CircuitBreaker
+from llm_client import LLMClient
+from llm_pool import LLMPool
+from mock_llm_server import MockLLMConfig, MockLLMServer
+
+class TestMockLLMServer(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockLLMServer(config=MockLLMConfig(model="phi-2")).start()
+        self.client = LLMClient(self.server.endpoint, failure_threshold=2, reset_timeout=60)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_models_and_canned_answer(self):
+        """Test model discovery and keyword-matched canned answers"""
+        self.assertEqual(self.client.resolve_model(), "phi-2")
+        response = self.client.post_chat({"model": "phi-2", "messages": [
+            {"role": "user", "content": "What is the CPR compression rate?"}]})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("100-120", response.json()["choices"][0]["message"]["content"])
+        self.assertGreater(response.json()["usage"]["prompt_tokens"], 0)
+
+    def test_streaming_matches_full_answer(self):
+        """Test that streamed deltas join up to the non-streamed answer at the configured rate"""
+        self.server.config.tokens_per_second = 200
+        payload = {"model": "phi-2", "messages": [{"role": "user", "content": "paracetamol overdose"}]}
+        start = time.perf_counter()
+        deltas = list(self.client.stream_chat(payload))
+        self.assertGreater(len(deltas), 10)
+        self.assertGreater(time.perf_counter() - start, len(deltas) / 200 * 0.8)
+        full = self.client.post_chat(payload).json()["choices"][0]["message"]["content"]
+        self.assertEqual("".join(deltas), full)
+        self.assertIsNotNone(self.client.stats.summary()["avg_first_token_ms"])
+
+    def test_dropped_stream_is_not_finished(self):
+        """Test a stream cut off mid-answer raises and is not reported as finished"""
+        payload = {"model": "phi-2", "messages": [{"role": "user", "content": "cpr"}]}
+        state = {}
+        self.assertGreater(len(list(self.client.stream_chat(payload, state))), 5)
+        self.assertTrue(state["finished"])
+
+        self.server.config.drop_stream_after = 5
+        deltas = []
+        with self.assertRaises(requests.exceptions.RequestException):
+            for delta in self.client.stream_chat(payload, state):
+                deltas.append(delta)
+        self.assertEqual(len(deltas), 5)
+        self.assertFalse(state["finished"])
+
+    def test_injected_errors_open_breaker(self):
+        """Test that injected 500s trip the circuit breaker"""
+        self.server.config.error_rate = 1.0
+        for _ in range(2):
+            self.assertEqual(self.client.post_chat({"model": "phi-2", "messages": []}).status_code, 500)
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.OPEN)
+
+    def test_injected_model_error_is_retried(self):
+        """Test that a 422 is reported as a model error and the pool retries after re-discovery"""
+        self.server.config.model_error_rate = 1.0
+        response = self.client.post_chat({"model": "phi-2", "messages": []})
+        self.assertTrue(LLMClient.is_model_error(response.status_code, response.text))
+
+        pool = LLMPool([self.client])
+        self.server.config.model_error_rate = 0.0
+        served_before = self.server.requests_served
+        self.assertEqual(pool.post_chat({"model": "", "messages": []}).status_code, 200)
+        self.assertEqual(self.server.requests_served - served_before, 1)
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self.server.config.model_error_rate = 1.0
+            list(self.client.stream_chat({"model": "phi-2", "messages": []}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pews import PEWSEngine, vital_subscore
+
+class TestPEWSEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = PEWSEngine()
+
+    def test_subscores(self):
+        """Test subscores grow with distance outside the age-band range"""
+        self.assertEqual(vital_subscore(140, 100, 150), 0)
+        self.assertEqual(vital_subscore(160, 100, 150), 1)
+        self.assertEqual(vital_subscore(175, 100, 150), 2)
+        self.assertEqual(vital_subscore(70, 100, 150), 3)
+
+    def test_partial_sets_carry_forward(self):
+        """Test that vitals missing from a set keep their last subscore"""
+        self.engine.update("bed-1", 18, hr=175, rr=30, sbp=85, spo2=98)
+        result = self.engine.update("bed-1", rr=31)
+        self.assertEqual(result['subscores']['HR'], 2)
+        self.assertEqual(result['score'], 2)
+        self.assertEqual(result['observations'], 2)
+        with self.assertRaises(ValueError):
+            self.engine.update("bed-2", hr=120)
+
+    def test_invalid_avpu_is_rejected(self):
+        """Test that an empty or unknown AVPU raises ValueError without recording the set"""
+        self.assertEqual(self.engine.update("bed-1", 18, avpu="voice")['subscores']['AVPU'], 1)
+        for avpu in ("", " ", "X"):
+            with self.assertRaises(ValueError):
+                self.engine.update("bed-1", hr=175, avpu=avpu)
+            with self.assertRaises(ValueError):
+                self.engine.update("bed-2", 18, avpu=avpu)
+        self.assertEqual(self.engine.patient("bed-1")['observations'], 1)
+        self.assertIsNone(self.engine.patient("bed-2"))
+
+    def test_trend_flags(self):
+        """Test jump and sustained-rise deterioration flags"""
+        scores = []
+        for hr, rr in ((120, 30), (160, 30), (175, 30), (175, 38)):
+            result = self.engine.update("bed-1", 18, hr=hr, rr=rr)
+            scores.append(result['score'])
+        self.assertEqual(scores, [0, 1, 2, 3])
+        self.assertIn("rising for 3 sets", result['flags'])
+        self.assertIn("increase monitoring", result['flags'])
+
+        jumped = self.engine.update("bed-2", 18, hr=120, rr=30)
+        self.assertEqual(jumped['flags'], [])
+        jumped = self.engine.update("bed-2", hr=190, spo2=90)
+        self.assertIn("urgent review", jumped['flags'])
+        self.assertIn("score up 5 since last set", jumped['flags'])
+
+    def test_ward_order_and_band_change(self):
+        """Test the ward list puts flagged patients first and ages move between bands"""
+        self.engine.update("bed-1", 18, hr=120)
+        self.engine.update("bed-2", 18, hr=200)
+        self.assertEqual([p['patient_id'] for p in self.engine.ward()], ["bed-2", "bed-1"])
+        self.assertEqual(self.engine.update("bed-1", 24, hr=120)['band'], "Young child (2-7yr)")
+        self.assertEqual(self.engine.stats()['patients'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
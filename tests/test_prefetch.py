@@ -0,0 +1,117 @@
+import unittest
+import sys
+import os
+import threading
+import concurrent.futures
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import NursingChatbot
+from prefetch import Prefetcher
+
+class TestPrefetcher(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    def tearDown(self):
+        self.executor.shutdown(wait=True)
+
+    def test_prefetched_result_is_taken_once(self):
+        """Test a prepared suggestion is returned on click and counted as a hit"""
+        prefetcher = Prefetcher(executor=self.executor)
+        prefetcher.prefetch("batch-1", [("a", lambda: {"answer": "A"}), ("b", lambda: {"answer": "B"})])
+        self.executor.submit(lambda: None).result()
+        self.assertEqual(prefetcher.take("a"), {"answer": "A"})
+        self.assertIsNone(prefetcher.take("a"))
+        self.assertIsNone(prefetcher.take("unknown"))
+        self.executor.shutdown(wait=True)
+        stats = prefetcher.stats()
+        self.assertEqual(stats['scheduled'], 2)
+        self.assertEqual(stats['completed'], 2)
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['hit_rate_pct'], 50.0)
+
+    def test_new_batch_counts_unused_results_as_wasted(self):
+        """Test finished but unclicked suggestions are wasted when new suggestions replace them"""
+        prefetcher = Prefetcher(executor=self.executor)
+        prefetcher.prefetch("batch-1", [("a", lambda: "A"), ("b", lambda: "B")])
+        self.executor.submit(lambda: None).result()
+        self.assertEqual(prefetcher.take("a"), "A")
+        prefetcher.prefetch("batch-2", [("c", lambda: "C")])
+        self.executor.submit(lambda: None).result()
+        self.assertIsNone(prefetcher.take("b"))
+        self.assertEqual(prefetcher.take("c"), "C")
+        stats = prefetcher.stats()
+        self.assertEqual(stats['wasted'], 1)
+        self.assertEqual(stats['hits'], 2)
+
+    def test_same_batch_is_not_prefetched_twice(self):
+        """Test a rerun showing the same suggestions starts no new work"""
+        calls = []
+        prefetcher = Prefetcher(executor=self.executor)
+        for _ in range(3):
+            prefetcher.prefetch("batch-1", [("a", lambda: calls.append("a") or "A")])
+        self.executor.submit(lambda: None).result()
+        self.assertEqual(prefetcher.take("a"), "A")
+        self.assertEqual(calls, ["a"])
+        self.assertEqual(prefetcher.stats()['scheduled'], 1)
+
+    def test_budget_limits_prefetched_questions(self):
+        """Test only max_questions suggestions are prepared and none after the time budget"""
+        prefetcher = Prefetcher(max_questions=2, executor=self.executor)
+        prefetcher.prefetch("batch-1", [(key, lambda key=key: key) for key in "abcd"])
+        self.executor.submit(lambda: None).result()
+        self.assertIsNone(prefetcher.take("c"))
+        self.assertEqual(prefetcher.take("b"), "b")
+        self.assertEqual(prefetcher.stats()['skipped'], 2)
+
+        late = Prefetcher(time_budget=-1, executor=self.executor)
+        late.prefetch("batch-1", [("a", lambda: "A")])
+        self.executor.submit(lambda: None).result()
+        self.assertIsNone(late.take("a"))
+        self.assertEqual(late.stats()['skipped'], 1)
+        self.assertEqual(late.stats()['completed'], 0)
+
+    def test_click_waits_for_running_prefetch(self):
+        """Test clicking a suggestion that is still being prepared waits for it rather than starting again"""
+        started, release = threading.Event(), threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return "A"
+
+        prefetcher = Prefetcher(executor=self.executor)
+        prefetcher.prefetch("batch-1", [("a", slow)])
+        started.wait(5)
+        threading.Timer(0.05, release.set).start()
+        self.assertEqual(prefetcher.take("a"), "A")
+
+    def test_click_on_queued_suggestion_does_not_wait(self):
+        """Test a suggestion not yet started is dropped on click rather than waited for"""
+        release = threading.Event()
+        prefetcher = Prefetcher(executor=self.executor)
+        prefetcher.prefetch("batch-1", [("a", lambda: release.wait(5) and "A"), ("b", lambda: "B")])
+        self.assertIsNone(prefetcher.take("b"))
+        release.set()
+        self.assertEqual(prefetcher.take("a"), "A")
+
+    def test_failed_prefetch_is_a_miss(self):
+        """Test a suggestion whose preparation raised is answered normally instead"""
+        prefetcher = Prefetcher(executor=self.executor)
+        prefetcher.prefetch("batch-1", [("a", lambda: 1 / 0)])
+        self.executor.submit(lambda: None).result()
+        self.assertIsNone(prefetcher.take("a"))
+        self.assertEqual(prefetcher.stats()['hits'], 0)
+
+    def test_prefetch_key_includes_patient_facts(self):
+        """Test the same suggestion in chats about different patients gets different prefetch keys"""
+        chatbot = NursingChatbot.__new__(NursingChatbot)
+        def chat(weight):
+            return [{"role": "user", "content": f"{weight} kg toddler with fever"},
+                    {"role": "assistant", "content": "• Check temperature"}]
+        self.assertEqual(chatbot.prefetch_key("What fluids?", chat(15)), chatbot.prefetch_key("What fluids?", chat(15)))
+        self.assertNotEqual(chatbot.prefetch_key("What fluids?", chat(15)), chatbot.prefetch_key("What fluids?", chat(20)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_builder import PromptBuilder, TokenCounter, estimate_tokens
+
+class TestPromptBuilder(unittest.TestCase):
+
+    def setUp(self):
+        # Unknown model name, so counts come from the estimator
+        self.builder = PromptBuilder(TokenCounter("test-model"), max_prompt_tokens=120,
+                                     question_tokens=30, history_tokens=30)
+
+    def test_trim_keeps_whole_sentences(self):
+        """Test that trimming stops at a sentence boundary instead of cutting words"""
+        text = "Check the airway first. Then assess breathing effort and rate. Finally check circulation."
+        trimmed = self.builder.trim(text, estimate_tokens("Check the airway first. Then assess breathing effort and rate.") + 1)
+        self.assertEqual(trimmed, "Check the airway first. Then assess breathing effort and rate.")
+
+    def test_build_stays_within_budget(self):
+        """Test that the assembled prompt respects the token budget and reports its size"""
+        evidence = ["Neonatal heart rate is 120-180 beats per minute. " * 10,
+                    "Respiratory rate is 40-60 breaths per minute. " * 10]
+        history = [{"role": "user", "content": "What is ABCDE? " * 20},
+                   {"role": "assistant", "content": "Airway, breathing, circulation."}]
+        result = self.builder.build("Return bullet points.", "What is the neonatal heart rate?", evidence, history)
+
+        self.assertLessEqual(result['prompt_tokens'], 120)
+        self.assertEqual(result['prompt_tokens'], sum(result['breakdown'].values()))
+        self.assertEqual(result['messages'][0], {"role": "system", "content": "Return bullet points."})
+        self.assertTrue(result['messages'][-1]['content'].endswith("What is the neonatal heart rate?"))
+        self.assertIn("120-180", result['messages'][-1]['content'])
+        self.assertEqual(self.builder.summary()['requests'], 1)
+
+    def test_static_text_tokenised_once(self):
+        """Test that repeated system prompts hit the tokenisation cache"""
+        for _ in range(3):
+            self.builder.build("Return bullet points.", "What is CPR?")
+        self.assertGreater(self.builder.counter.cache_info().hits, 0)
+
+if __name__ == '__main__':
+    unittest.main()
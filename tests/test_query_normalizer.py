@@ -0,0 +1,50 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_normalizer import QueryNormalizer, normalize_query, query_key
+
+class TestQueryNormalizer(unittest.TestCase):
+
+    def test_spelling_units_numbers_and_synonyms(self):
+        """Test American spellings, unit variants, number words and abbreviations are unified"""
+        self.assertEqual(normalize_query("How do I recognize Hypoglycemia in kids?"),
+                         "how do i recognise hypoglycaemia in children")
+        self.assertEqual(normalize_query("Fluids for a twelve kilo child, 1,000 mls at 2.50 ml per hr"),
+                         "fluids for a 12 kg child 1000 ml at 2.5 ml/hr")
+        self.assertEqual(normalize_query("hr 150, bp 80/50 in a 2yr old"),
+                         "heart rate 150 blood pressure 80/50 in a 2 years")
+
+    def test_courtesy_is_stripped_and_idempotent(self):
+        """Test greetings and politeness are dropped and normalising twice changes nothing"""
+        normalised = normalize_query("Hi, can you tell me the Pediatric HR for a newborn pls?")
+        self.assertEqual(normalised, "the paediatric heart rate for a neonate")
+        self.assertEqual(normalize_query(normalised), normalised)
+        self.assertEqual(normalize_query("Thank you!"), "thank you")
+
+    def test_keys_match_equivalent_questions(self):
+        """Test reworded questions share a key, but numbers and words keep their order"""
+        self.assertEqual(query_key("What is the normal heart rate range for neonate?"),
+                         query_key("HR for a newborn"))
+        self.assertNotEqual(query_key("2 kg baby over 10 hours"), query_key("10 kg baby over 2 hours"))
+
+    def test_reordered_questions_get_different_keys(self):
+        """Test questions with the same words in a different order are not coalesced"""
+        self.assertNotEqual(query_key("give ibuprofen before paracetamol"),
+                            query_key("give paracetamol before ibuprofen"))
+        self.assertNotEqual(query_key("switch IV to oral antibiotics"), query_key("switch oral to IV antibiotics"))
+        self.assertNotEqual(query_key("fever and rash"), query_key("fever and rash and fever"))
+
+    def test_repeat_rates_before_and_after(self):
+        """Test the raw and normalised repeat rates are measured side by side"""
+        normalizer = QueryNormalizer()
+        for question in ["Pediatric HR for newborn?", "paediatric heart rate for a neonate", "Pediatric HR for newborn?"]:
+            normalizer.normalize(question)
+        stats = normalizer.stats()
+        self.assertEqual(stats['queries'], 3)
+        self.assertAlmostEqual(stats['raw_repeat_pct'], 100 / 3)
+        self.assertAlmostEqual(stats['normalised_repeat_pct'], 200 / 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import query_rewriter
+
+class TestQueryRewriter(unittest.TestCase):
+
+    def test_new_patient_replaces_earlier_one(self):
+        """Test a follow-up about another age or weight keeps the question and swaps the patient"""
+        topic = "What is the normal heart rate for a neonate?"
+        self.assertEqual(query_rewriter.rewrite("what about for a 5-year-old?", topic),
+                         "What is the normal heart rate for a 5-year-old?")
+        self.assertEqual(query_rewriter.rewrite("And a 12 kg child?", topic),
+                         "What is the normal heart rate for a 12 kg child?")
+        self.assertEqual(query_rewriter.rewrite("what about 14 kg?", "NAC dose for 12 kg"), "NAC dose for 14 kg?")
+
+    def test_other_follow_ups_carry_the_topic(self):
+        """Test follow-ups without a new patient are joined to the topic question"""
+        self.assertEqual(query_rewriter.rewrite("and the dose?", "Paracetamol for fever in a 12 kg child"),
+                         "Paracetamol for fever in a 12 kg child - the dose?")
+        earlier = [{"role": "user", "content": "How do I manage croup?"},
+                   {"role": "assistant", "content": "• Dexamethasone 0.15 mg/kg"},
+                   {"role": "user", "content": "and in infants?"},
+                   {"role": "assistant", "content": "• Same dose"}]
+        self.assertIs(query_rewriter.topic_message("what about the nebulised adrenaline?", earlier), earlier[0])
+        self.assertIsNone(query_rewriter.topic_message("How do I manage asthma in a 6 year old child?", earlier))
+
+    def test_embeddings_are_cached_and_blended(self):
+        """Test message embeddings are stored on the message, left out of exports, and blended"""
+        message = {"role": "user", "content": "How do I manage croup?"}
+        query_rewriter.remember_embedding(message, [3.0, 4.0])
+        np.testing.assert_allclose(query_rewriter.message_embedding(message), [3, 4])
+        self.assertEqual(query_rewriter.strip_runtime_keys([message]), [{"role": "user", "content": "How do I manage croup?"}])
+        blended = query_rewriter.blend([1.0, 0.0], [0.0, 2.0], topic_weight=0.5)
+        np.testing.assert_allclose(blended, [2 ** -0.5, 2 ** -0.5], rtol=1e-6)
+        np.testing.assert_allclose(query_rewriter.blend([2.0, 0.0], None), [1, 0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limiter import RateLimiter, UsageTracker, backoff_delay, parse_retry_after
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_requests_per_minute_limit(self):
+        """Test that requests beyond the bucket wait, then give up past max_wait"""
+        limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=100000)
+        self.assertTrue(limiter.acquire(10, max_wait=0))
+        self.assertTrue(limiter.acquire(10, max_wait=0))
+        self.assertFalse(limiter.acquire(10, max_wait=0.1))
+
+    def test_brief_queueing(self):
+        """Test that a short wait for refill queues instead of failing"""
+        limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=100000)
+        for _ in range(600):
+            limiter.acquire(1, max_wait=0)
+        start = time.monotonic()
+        self.assertTrue(limiter.acquire(1, max_wait=1.0))
+        self.assertGreater(time.monotonic() - start, 0.05)
+        self.assertEqual(limiter.snapshot()['throttled'], 1)
+
+    def test_penalize_pauses_callers(self):
+        """Test that a 429 pause blocks acquisition until it expires"""
+        limiter = RateLimiter()
+        limiter.penalize(5.0)
+        self.assertFalse(limiter.acquire(1, max_wait=0.1))
+        self.assertEqual(limiter.snapshot()['rate_limited'], 1)
+
+    def test_retry_after_and_backoff(self):
+        """Test Retry-After parsing and jittered backoff bounds"""
+        self.assertEqual(parse_retry_after({"Retry-After": "3"}), 3.0)
+        self.assertIsNone(parse_retry_after({}))
+        self.assertGreaterEqual(parse_retry_after({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}), 0.0)
+        delay = backoff_delay(0, retry_after=2.0)
+        self.assertTrue(2.0 <= delay <= 2.45)
+        self.assertTrue(0 <= backoff_delay(3) <= 8)
+
+    def test_usage_per_session_and_day(self):
+        """Test that usage is totalled per session and per day"""
+        usage = UsageTracker()
+        usage.record("a", 100, 20)
+        usage.record("a", 50, 10)
+        usage.record("b", 10, 5)
+        usage.record("b", rate_limited=True)
+        self.assertEqual(usage.session_usage("a"), {"requests": 2, "prompt_tokens": 150,
+                                                    "completion_tokens": 30, "rate_limited": 0})
+        today = usage.daily_usage()[0]
+        self.assertEqual((today['requests'], today['prompt_tokens'], today['rate_limited']), (3, 160, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import sys
+import os
+import tempfile
+import sqlite3
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import conversation_state
+from response_cache import SemanticResponseCache, context_key
+
+class TestSemanticResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "cache.sqlite3")
+        self.cache = SemanticResponseCache(self.db_path, threshold=0.9)
+        self.cache.set_kb_version("kb-v1")
+
+    def tearDown(self):
+        self.cache._conn.close()
+        self.tmpdir.cleanup()
+
+    def test_similar_query_hits_and_counts(self):
+        """Test that a near-identical embedding reuses the answer and increments its hit count"""
+        self.cache.store("abcde assessment", np.array([1.0, 0.0, 0.0]), "• Airway")
+        self.assertIsNone(self.cache.lookup(np.array([0.0, 1.0, 0.0])))
+
+        hit = self.cache.lookup(np.array([0.99, 0.05, 0.0]))
+        self.assertEqual(hit['response'], "• Airway")
+        self.assertEqual(hit['hit_count'], 1)
+        self.assertEqual(self.cache.top_entries(1)[0]['hit_count'], 1)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_persisted_and_invalidated_on_kb_change(self):
+        """Test that entries survive a reopen but are dropped when the KB hash changes"""
+        self.cache.store("cpr rate", np.array([0.0, 1.0, 0.0]), "• 100-120/min")
+        self.cache._conn.close()
+
+        self.cache = SemanticResponseCache(self.db_path, threshold=0.9)
+        self.cache.set_kb_version("kb-v1")
+        self.assertIsNotNone(self.cache.lookup(np.array([0.0, 1.0, 0.0])))
+
+        self.cache.set_kb_version("kb-v2")
+        self.assertIsNone(self.cache.lookup(np.array([0.0, 1.0, 0.0])))
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_eviction_keeps_most_used(self):
+        """Test that the least used entry is evicted beyond max_entries"""
+        self.cache.max_entries = 2
+        self.cache.store("a", np.array([1.0, 0.0, 0.0]), "A")
+        self.cache.store("b", np.array([0.0, 1.0, 0.0]), "B")
+        self.cache.lookup(np.array([1.0, 0.0, 0.0]))
+        self.cache.store("c", np.array([0.0, 0.0, 1.0]), "C")
+
+        self.assertEqual(self.cache.stats()['entries'], 2)
+        self.assertIsNone(self.cache.lookup(np.array([0.0, 1.0, 0.0])))
+        self.assertEqual(self.cache.lookup(np.array([1.0, 0.0, 0.0]))['response'], "A")
+
+    def test_answer_is_only_reused_in_the_same_context(self):
+        """Test that histories differing only in patient weight do not share cached answers"""
+        def history(weight):
+            messages = [{"role": "user", "content": f"{weight} kg toddler with fever"},
+                        {"role": "assistant", "content": "• Check temperature"}]
+            return conversation_state.history_messages(conversation_state.state_for(messages))
+
+        question = np.array([1.0, 0.0, 0.0])
+        self.cache.store("fluids for this child", question, "• 1250 mL/day", context_key(history(15), ""))
+        self.assertIsNone(self.cache.lookup(question, context_key(history(20), "")))
+        self.assertIsNone(self.cache.lookup(question))
+        hit = self.cache.lookup(np.array([0.99, 0.05, 0.0]), context_key(history(15), ""))
+        self.assertEqual(hit['response'], "• 1250 mL/day")
+
+        self.cache._conn.close()
+        self.cache = SemanticResponseCache(self.db_path, threshold=0.9)
+        self.cache.set_kb_version("kb-v1")
+        self.assertIsNone(self.cache.lookup(question, context_key(history(20), "")))
+        self.assertIsNotNone(self.cache.lookup(question, context_key(history(15), "")))
+
+    def test_entries_without_context_are_dropped_on_upgrade(self):
+        """Test that a cache file from before context keys is emptied rather than reused in any chat"""
+        self.cache._conn.close()
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("DROP TABLE responses")
+        conn.execute("CREATE TABLE responses (id INTEGER PRIMARY KEY AUTOINCREMENT, query TEXT NOT NULL, "
+                     "embedding BLOB NOT NULL, response TEXT NOT NULL, kb_hash TEXT NOT NULL, "
+                     "created_at REAL NOT NULL, hit_count INTEGER NOT NULL DEFAULT 0, last_hit_at REAL)")
+        conn.execute("INSERT INTO responses (query, embedding, response, kb_hash, created_at) VALUES (?, ?, ?, ?, 0)",
+                     ("cpr rate", np.array([0.0, 1.0, 0.0], dtype=np.float32).tobytes(), "• 100-120/min", "kb-v1"))
+        conn.commit()
+        conn.close()
+
+        self.cache = SemanticResponseCache(self.db_path, threshold=0.9)
+        self.cache.set_kb_version("kb-v1")
+        self.assertEqual(self.cache.stats()['entries'], 0)
+        self.cache.store("cpr rate", np.array([0.0, 1.0, 0.0]), "• 100-120/min")
+        self.assertIsNotNone(self.cache.lookup(np.array([0.0, 1.0, 0.0])))
+
+if __name__ == '__main__':
+    unittest.main()
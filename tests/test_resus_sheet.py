@@ -0,0 +1,60 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import resus_sheet
+
+class TestResusSheet(unittest.TestCase):
+
+    def test_vectorised_doses(self):
+        """Test one pass gives per-kg doses for every weight, capped at the maximum"""
+        doses = resus_sheet.resus_doses([10, 150])
+        adrenaline = [d['item'] for d in resus_sheet.RESUS_DRUGS].index("Adrenaline IV/IO (1:10 000)")
+        self.assertAlmostEqual(doses['dose'][0, adrenaline], 0.1)
+        self.assertAlmostEqual(doses['volume_ml'][0, adrenaline], 1.0)
+        self.assertEqual(doses['dose'][1, adrenaline], 1.0)
+        self.assertTrue(doses['capped'][1, adrenaline])
+        self.assertEqual(list(doses['group']), [0, 2])
+
+    def test_adrenaline_maximums_are_attributed_to_pals(self):
+        """Test both adrenaline routes are capped and the caps are marked as PALS values"""
+        items = [d['item'] for d in resus_sheet.RESUS_DRUGS]
+        endotracheal = items.index("Adrenaline ET (1:1000)")
+        doses = resus_sheet.resus_doses([20, 40])
+        self.assertAlmostEqual(doses['dose'][0, endotracheal], 2.0)
+        self.assertEqual(doses['dose'][1, endotracheal], 2.5)
+        self.assertEqual(doses['volume_ml'][1, endotracheal], 2.5)
+        answer = resus_sheet.format_sheet(resus_sheet.resus_sheet(40))
+        self.assertIn("| Adrenaline IV/IO (1:10 000) ‡ | 0.4 mg |", answer)
+        self.assertIn("| Adrenaline ET (1:1000) ‡ | 2.5 mg (max) |", answer)
+        self.assertIn("maximum from PALS", answer)
+
+    def test_sheets_are_cached(self):
+        """Test standard weights come from the prebuilt sheets and others are cached"""
+        self.assertIs(resus_sheet.resus_sheet(12), resus_sheet.resus_sheet(12.1))
+        self.assertIs(resus_sheet.resus_sheet(13), resus_sheet.resus_sheet(13))
+        self.assertEqual(len(resus_sheet.standard_chart()), len(resus_sheet.RESUS_DRUGS))
+
+    def test_chat_request(self):
+        """Test chat requests produce the sheet and ask for a weight when it is missing"""
+        answer = resus_sheet.answer_resus_query("resus sheet 12 kg")
+        self.assertIn("0.12 mg", answer)
+        self.assertIn("24 J", answer)
+        self.assertIn("Section 01", answer)
+        self.assertIn("weight", resus_sheet.answer_resus_query("code drugs please"))
+        self.assertIsNone(resus_sheet.answer_resus_query("how deep are chest compressions for infants?"))
+
+    def test_adrenaline_dose_needs_arrest_wording(self):
+        """Test anaphylaxis and other adrenaline questions never get the cardiac arrest doses"""
+        self.assertIsNone(resus_sheet.answer_resus_query("adrenaline dose for anaphylaxis 12 kg"))
+        self.assertIsNone(resus_sheet.answer_resus_query("What is the epinephrine dose for a 20 kg child?"))
+        self.assertIn("0.12 mg", resus_sheet.answer_resus_query("adrenaline dose in cardiac arrest 12 kg"))
+        self.assertIn("0.12 mg", resus_sheet.answer_resus_query("CPR on a 12 kg child, adrenaline dose?"))
+
+    def test_weight_rounding_to_zero_asks_for_weight(self):
+        """Test a weight that rounds to 0 kg asks for the weight instead of raising"""
+        self.assertEqual(resus_sheet.answer_resus_query("resus sheet 0.2 kg"), resus_sheet.ASK_FOR_WEIGHT)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from singleflight import SingleFlight
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_identical_calls_share_result(self):
+        """Test that concurrent calls with the same key run the function once"""
+        group = SingleFlight()
+        calls = []
+        results = []
+
+        def slow_answer():
+            calls.append(1)
+            time.sleep(0.05)
+            return "• Airway - Check for obstruction"
+
+        threads = [threading.Thread(target=lambda: results.append(group.do(("llm", "abcde"), slow_answer)))
+                   for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["• Airway - Check for obstruction"] * 5)
+        self.assertEqual(group.stats()["llm"], {"executed": 1, "saved": 4})
+
+    def test_errors_propagate_to_followers(self):
+        """Test that followers receive the leader's exception"""
+        group = SingleFlight()
+        call, is_leader = group.acquire(("llm", "q"))
+        follower, follower_is_leader = group.acquire(("llm", "q"))
+        self.assertTrue(is_leader)
+        self.assertFalse(follower_is_leader)
+
+        group.complete(("llm", "q"), call, error=ValueError("backend down"))
+        with self.assertRaises(ValueError):
+            group.wait(follower)
+
+        # A later call with the same key starts a fresh computation
+        self.assertEqual(group.do(("llm", "q"), lambda: "fresh"), "fresh")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import NursingChatbot, StreamingResponseCleaner
+from llm_client import LLMClient
+from llm_pool import LLMPool
+from llm_scheduler import LLMScheduler
+from mock_llm_server import MockLLMConfig, MockLLMServer
+from singleflight import SingleFlight
+
+def make_chatbot(endpoint):
+    """Chatbot without models loaded that streams from endpoint and records what it caches"""
+    chatbot = NursingChatbot.__new__(NursingChatbot)
+    chatbot.llm_pool = LLMPool([LLMClient(endpoint)], discover_models=False)
+    chatbot.llm_scheduler = LLMScheduler()
+    chatbot.singleflight = SingleFlight()
+    chatbot.queue_timeout = 5
+    chatbot.max_retries = 0
+    chatbot.build_llm_payload = lambda prompt, context, history, guidance: {
+        "model": "mock", "messages": [{"role": "user", "content": prompt}]}
+    chatbot.estimate_request_tokens = lambda payload: 0
+    chatbot.reserve_quota = lambda tokens: True
+    chatbot.record_usage = lambda *args: None
+    chatbot.prepare_query = lambda user_input, chat_history=None: {
+        'context': "", 'history': [], 'guidance': "", 'is_follow_up': False,
+        'query_embedding': [1.0], 'question': user_input}
+    chatbot.cached = []
+    chatbot.cache_response = lambda question, prepared, answer: chatbot.cached.append(answer)
+    return chatbot
+
+RESPONSES = [
+    "• Compression rate 100-120 per minute\n• Depth 4 cm in infants\n• Ratio 15:2\n• Allow full recoil",
+    "Here are the key points:\n1. Check airway\n2. Give oxygen\n3. Ask for help\n4. Reassess\n5. Document",
+    "Here are • Give oxygen",
+    "- Monitor HR\n\n* Heart rate between 100 and 160 beats per minute is normal\n- Escalate",
+    "• Assess\n```python\nprint('exercise')\n```\n• Monitor\n• Escalate",
+    "• Give fluids\nA) option one\nB) option two\n• Reassess",
+    "Answer: • Use ABCDE\n• Escalate early\n• Exercise 1: write code\n• Document\n• Fifth\n• Sixth",
+]
+
+def cleaned_in_chunks(chatbot, chunks):
+    cleaner = StreamingResponseCleaner(chatbot)
+    for chunk in chunks:
+        cleaner.feed(chunk)
+    return cleaner.preview()
+
+class TestStreamingResponseCleaner(unittest.TestCase):
+
+    def setUp(self):
+        self.chatbot = NursingChatbot.__new__(NursingChatbot)
+
+    def test_matches_clean_response_at_every_chunk_boundary(self):
+        """Test the streamed result equals clean_response on the full text however the text is split"""
+        for text in RESPONSES:
+            expected = self.chatbot.clean_response(text)
+            for size in range(1, len(text)):
+                with self.subTest(text=text[:20], size=size):
+                    self.assertEqual(cleaned_in_chunks(self.chatbot, [text[:size], text[size:]]), expected)
+                    self.assertEqual(cleaned_in_chunks(
+                        self.chatbot, [text[i:i + size] for i in range(0, len(text), size)]), expected)
+
+    def test_markers_split_across_chunks(self):
+        """Test code fences, prefixes and numbered markers split mid-token are still recognised"""
+        chunks = ["Here a", "re the points:\n1", ". Check airway\n`", "``py", "thon\nimport os\n``", "`\n- Mon", "itor"]
+        self.assertEqual(cleaned_in_chunks(self.chatbot, chunks), "• the points:\n• Check airway\n• Monitor")
+
+    def test_partial_line_preview(self):
+        """Test an unfinished line is previewed but a partial code block is never shown"""
+        cleaner = StreamingResponseCleaner(self.chatbot)
+        cleaner.feed("Here are • Give oxy")
+        self.assertEqual(cleaner.preview(), "• Give oxy")
+        cleaner.feed("gen\n```\nprint(1)")
+        self.assertEqual(cleaner.preview(), "• Give oxygen")
+
+class TestStreamedAnswers(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockLLMServer(config=MockLLMConfig(model="mock")).start()
+        self.chatbot = make_chatbot(self.server.endpoint)
+
+    def tearDown(self):
+        self.chatbot.llm_pool.clients[0].close()
+        self.server.stop()
+
+    def test_complete_stream_is_cached(self):
+        """Test an answer that streamed to the end is stored in the response cache"""
+        answer = list(self.chatbot._stream_answer("What is the CPR compression rate?"))[-1]
+        self.assertIn("100-120", answer)
+        self.assertEqual(self.chatbot.cached, [answer])
+
+    def test_final_answer_equals_clean_response(self):
+        """Test the last value streamed is the same answer clean_response gives for the full text"""
+        answers = list(self.chatbot._stream_answer("What is the CPR compression rate?"))
+        full = self.server.config.answers["cpr"]
+        self.assertEqual(answers[-1], self.chatbot.clean_response(full))
+
+    def test_stream_cut_off_is_not_cached(self):
+        """Test a stream that fails mid-answer is shown but never cached for later users"""
+        self.server.config.drop_stream_after = 6
+        answer = list(self.chatbot._stream_answer("What is the CPR compression rate?"))[-1]
+        self.assertIn("Compression rate", answer)
+        self.assertNotIn("recoil", answer)
+        self.assertEqual(self.chatbot.cached, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from topic_guard import TopicGuard, chunk_text, topic_centroids
+
+VOCABULARY = ["cpr", "compressions", "airway", "poisoning", "overdose", "charcoal", "python", "football"]
+
+def encode(texts):
+    """Bag-of-words stand-in for the sentence embedding model"""
+    return np.array([[text.lower().count(word) for word in VOCABULARY] for text in texts], dtype=np.float32)
+
+DOCUMENTS = [
+    ("pediatric_cpr", "Start CPR with chest compressions.\n\nOpen the airway and give compressions at 100-120/min."),
+    ("pediatric_toxicology", "Poisoning and overdose.\n\nGive activated charcoal within 1 hour of an overdose."),
+]
+
+class TestTopicGuard(unittest.TestCase):
+
+    def setUp(self):
+        self.guard = TopicGuard.from_documents(DOCUMENTS, encode, threshold=0.3)
+
+    def test_on_and_off_topic(self):
+        """Test clinical questions pass and unrelated ones are refused, nearest topic reported"""
+        decision = self.guard.check(encode(["charcoal for overdose?"])[0], "charcoal for overdose?")
+        self.assertTrue(decision['on_topic'])
+        self.assertEqual(decision['topic'], "pediatric_toxicology")
+        self.assertFalse(self.guard.check(encode(["write python code"])[0], "write python code")['on_topic'])
+        self.assertEqual(self.guard.stats()['refused'], 1)
+        self.assertEqual(self.guard.recent_decisions(1)[0]['query'], "write python code")
+
+    def test_chunks_and_centroids(self):
+        """Test documents split on paragraphs and long topics keep several centroids"""
+        self.assertEqual(chunk_text("a b\n\nc d", max_chars=3), ["a b", "c d"])
+        embeddings = np.array([[1, 0], [0.9, 0.1], [0, 1], [0.1, 0.9]], dtype=np.float32)
+        centroids = topic_centroids(embeddings, per_topic=2)
+        self.assertEqual(centroids.shape, (2, 2))
+        np.testing.assert_allclose(np.linalg.norm(centroids, axis=1), 1, rtol=1e-5)
+
+    def test_saved_centroids_follow_kb_version(self):
+        """Test saved centroids are reused for the same knowledge base and ignored once it changes"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "centroids.npz")
+            self.guard.save(path, "v1")
+            loaded = TopicGuard.load(path, "v1", threshold=0.3)
+            np.testing.assert_allclose(loaded.centroids, self.guard.centroids)
+            self.assertEqual(loaded.labels, self.guard.labels)
+            self.assertIsNone(TopicGuard.load(path, "v2"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import toxicology
+
+class TestToxicology(unittest.TestCase):
+
+    def test_treatment_line_interpolation(self):
+        """Test the treatment line halves every 4 hours and is undefined outside 4-24 hours"""
+        line = toxicology.treatment_line([4, 6, 8, 12, 3.5, 25])
+        np.testing.assert_allclose(line[:4], [150, 150 / 2 ** 0.5, 75, 37.5])
+        self.assertTrue(np.isnan(line[4:]).all())
+
+    def test_nac_volume_bands(self):
+        """Test bag volumes follow the Section 01 weight bands, boundaries in the lower band"""
+        regimen = toxicology.nac_regimen_batch([10, 10.5, 25, 26, 50, 80, 81])
+        self.assertEqual(list(regimen['Bag 1']['volume_ml']), [100, 100, 100, 500, 500, 500, 1000])
+        self.assertEqual(list(regimen['Bag 2']['volume_ml']), [100, 500, 500, 500, 500, 1000, 1000])
+        np.testing.assert_allclose(regimen['Bag 1']['dose_mg'], np.array([10, 10.5, 25, 26, 50, 80, 81]) * 200)
+        self.assertEqual(toxicology.nac_chart()[17]['Bag 2 dose (mg)'], 1800)
+
+    def test_high_level_increases_second_bag(self):
+        """Test a level at double or triple the line increases bag 2"""
+        assessment = toxicology.assess_ingestion(30, hours_since=4, level_mg_l=350)
+        self.assertTrue(assessment['above_line'])
+        self.assertEqual(assessment['bag2_multiplier'], 2)
+        self.assertEqual(assessment['regimen'][1]['dose_mg'], 6000)
+        self.assertEqual(toxicology.assess_ingestion(30, hours_since=4, level_mg_l=460)['bag2_multiplier'], 3)
+
+    def test_chat_answers(self):
+        """Test poisoning questions get deterministic, cited answers and dosing questions do not"""
+        answer = toxicology.answer_poisoning_query("12 kg child took 3 g paracetamol 6 hours ago, level 90 mg/L")
+        self.assertIn("Toxic ingestion", answer)
+        self.assertIn("below the line", answer)
+        self.assertIn("Section 01", answer)
+        self.assertIn("3600 mg", toxicology.answer_poisoning_query("paracetamol overdose, NAC dose for 18 kg"))
+        self.assertIsNone(toxicology.answer_poisoning_query("paracetamol dose for 12 kg"))
+
+    def test_nac_needs_poisoning_context(self):
+        """Test a bare NAC mention is not treated as paracetamol poisoning"""
+        self.assertIsNone(toxicology.answer_poisoning_query("NAC dose for 18 kg"))
+        self.assertIsNone(toxicology.answer_poisoning_query("nebulised acetylcysteine for thick secretions"))
+        self.assertIsNotNone(toxicology.answer_poisoning_query("NAC for overdose, 18 kg"))
+
+    def test_mg_dl_level_follows_source_scale(self):
+        """Test a level in mg/dL is read on the Section 01 scale (300 at 4 h doubles bag 2) and flagged"""
+        answer = toxicology.answer_poisoning_query("paracetamol level 300 mg/dL at 4 hours, 30 kg")
+        self.assertIn("2.0x the line", answer)
+        self.assertIn("Bag 2 increased x2", answer)
+        self.assertIn("6000 mg", answer)
+        self.assertIn("confirm the lab's units", answer)
+        self.assertNotIn("confirm the lab's units",
+                         toxicology.answer_poisoning_query("paracetamol level 300 mg/L at 4 hours, 30 kg"))
+
+    def test_first_bag_is_capped(self):
+        """Test bag 1 never exceeds the 22 g maximum for heavy patients"""
+        regimen = toxicology.nac_regimen_batch([100, 110, 130])
+        np.testing.assert_allclose(regimen['Bag 1']['dose_mg'], [20000, 22000, 22000])
+        np.testing.assert_allclose(regimen['Bag 2']['dose_mg'], [10000, 11000, 13000])
+        answer = toxicology.answer_poisoning_query("paracetamol overdose, NAC for 130 kg")
+        self.assertIn("22000 mg (maximum)", answer)
+
+    def test_charcoal_cap_is_marked_as_not_from_source(self):
+        """Test the 50 g charcoal maximum is applied and shown as an addition to Section 01"""
+        answer = toxicology.answer_poisoning_query("paracetamol overdose, NAC for 70 kg")
+        self.assertIn("**Activated charcoal:** 50 g (1 g/kg; max 50 g, the usual adult dose, not printed in Section 01)",
+                      answer)
+        self.assertIn("**Activated charcoal:** 18 g", toxicology.answer_poisoning_query("paracetamol overdose, NAC for 18 kg"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+import vital_signs
+
+class TestVitalSigns(unittest.TestCase):
+
+    def test_band_lookup(self):
+        """Test that ages in months fall into the right band at the boundaries"""
+        cases = {0: "Neonate", 0.9: "Neonate", 1: "Infant (1m-1yr)", 11: "Infant (1m-1yr)",
+                 12: "Toddler (1-2yr)", 24: "Young child (2-7yr)", 84: "Older child (7-12yr)", 144: "Adult"}
+        for age, band in cases.items():
+            with self.subTest(age=age):
+                self.assertEqual(vital_signs.band_for_age(age), band)
+        self.assertEqual(vital_signs.band_for_text("normal heart rate for a newborn baby"), "Neonate")
+        self.assertIsNone(vital_signs.band_for_text("normal heart rate"))
+        self.assertEqual(vital_signs.band_for_text("toddler ranges in the Baby Bear Book"), "Toddler (1-2yr)")
+        self.assertIsNone(vital_signs.band_for_text("heart rate ranges in the baby bear book"))
+        self.assertEqual(vital_signs.band_for_text("Baby Bear Book range for a baby"), "Infant (1m-1yr)")
+
+    def test_check_vitals(self):
+        """Test single-patient checks against the band limits"""
+        result = vital_signs.check_vitals("Neonate", hr=190, rr=50)
+        self.assertFalse(result['checks']['HR']['normal'])
+        self.assertTrue(result['checks']['RR']['normal'])
+        self.assertNotIn('SBP', result['checks'])
+
+    def test_screen_observations(self):
+        """Test that bulk screening flags the same values as single checks"""
+        observations = pd.DataFrame({
+            "patient": ["Bed 1", "Bed 2", "Bed 3", "Bed 4"],
+            "age_months": [0.5, 18, 60, None],
+            "hr": [190, 120, 80, 200],
+            "sbp": [70, 70, 100, 50],
+        })
+        screened = vital_signs.screen_observations(observations)
+        self.assertEqual(list(screened['age_band']), ["Neonate", "Toddler (1-2yr)", "Young child (2-7yr)", ""])
+        self.assertEqual(list(screened['hr_flag']), ["high", "", "low", ""])
+        self.assertEqual(list(screened['sbp_flag']), ["", "low", "", ""])
+        self.assertEqual(list(screened['abnormal_count']), [1, 1, 1, 0])
+        self.assertNotIn('rr_flag', screened.columns)
+        with self.assertRaises(ValueError):
+            vital_signs.screen_observations(pd.DataFrame({"hr": [100]}))
+
+    def test_reference_answer_uses_table(self):
+        """Test that chat answers quote the same ranges as the table"""
+        self.assertIn("100-150", vital_signs.reference_answer("normal vital signs for a toddler"))
+        self.assertIn("120-180", vital_signs.reference_answer("What are normal vital signs?"))
+
+if __name__ == '__main__':
+    unittest.main()
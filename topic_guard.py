@@ -0,0 +1,165 @@
+"""
+Embedding-based off-topic guard
+Knowledge base passages are embedded once and grouped into topic centroids; a question
+whose embedding is far from every centroid gets a templated refusal straight away,
+before any retrieval or LLM call. Every decision is recorded for threshold tuning
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+REFUSAL = (
+    "I can only help with nursing and paediatric clinical questions covered by the KKH knowledge base, "
+    "so I can't answer that one.\n\n"
+    "Try asking about:\n"
+    "• Recognising the critically ill child and normal vital signs\n"
+    "• Paediatric CPR, resuscitation drugs and emergencies\n"
+    "• Poisoning and overdose management\n"
+    "• Infection control, medication safety and clinical calculations"
+)
+
+
+def chunk_text(text: str, max_chars: int = 600) -> List[str]:
+    """Split a document into passages of whole paragraphs, each up to about max_chars"""
+    chunks, current = [], ""
+    for paragraph in (p.strip() for p in text.split("\n\n")):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        if current and len(current) + len(paragraph) > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current} {paragraph}".strip()
+        while len(current) > max_chars * 2:
+            chunks.append(current[:max_chars])
+            current = current[max_chars:]
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def topic_centroids(embeddings: np.ndarray, per_topic: int, iterations: int = 10) -> np.ndarray:
+    """Spherical k-means over one topic's passage embeddings, so a long chapter keeps several centroids"""
+    embeddings = _unit_rows(np.asarray(embeddings, dtype=np.float32))
+    k = max(1, min(per_topic, len(embeddings)))
+    # Deterministic start: passages spread evenly through the document
+    centroids = embeddings[np.linspace(0, len(embeddings) - 1, k).astype(int)]
+    for _ in range(iterations):
+        assignment = np.argmax(embeddings @ centroids.T, axis=1)
+        for j in range(k):
+            members = embeddings[assignment == j]
+            if len(members):
+                centroids[j] = members.mean(axis=0)
+        centroids = _unit_rows(centroids)
+    return centroids
+
+
+class TopicGuard:
+    """Cosine similarity of a question to the nearest knowledge base topic centroid
+
+    Questions scoring below threshold are off-topic. The most recent decisions are kept
+    for the admin panel, so the threshold can be tuned from real questions.
+    """
+
+    def __init__(self, centroids: np.ndarray, labels: List[str], threshold: float = 0.2,
+                 history: int = 200):
+        self.centroids = _unit_rows(np.asarray(centroids, dtype=np.float32))
+        self.labels = list(labels)
+        self.threshold = threshold
+        self.checked = 0
+        self.refused = 0
+        self.decisions: deque = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Tuple[str, str]], encode: Callable[[List[str]], np.ndarray],
+                       threshold: float = 0.2, per_topic: int = 6) -> "TopicGuard":
+        """Build centroids from (topic, text) pairs, embedding every passage with encode"""
+        passages: Dict[str, List[str]] = {}
+        for topic, text in documents:
+            passages.setdefault(topic, []).extend(chunk_text(text))
+        centroids, labels = [], []
+        for topic, chunks in passages.items():
+            if not chunks:
+                continue
+            # Roughly one centroid per ten passages, so short entries stay a single topic
+            topic_centroid = topic_centroids(encode(chunks), min(per_topic, 1 + len(chunks) // 10))
+            centroids.append(topic_centroid)
+            labels.extend([topic] * len(topic_centroid))
+        logger.info(f"Topic guard built with {len(labels)} centroids over {len(passages)} topics")
+        return cls(np.vstack(centroids), labels, threshold)
+
+    def check(self, embedding, query: str = "") -> Dict[str, Any]:
+        """Nearest topic and whether the question is on topic; the decision is logged and recorded"""
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        scores = self.centroids @ vector
+        best = int(np.argmax(scores))
+        decision = {"query": query, "score": float(scores[best]), "topic": self.labels[best],
+                    "on_topic": bool(scores[best] >= self.threshold), "at": time.time()}
+        with self._lock:
+            self.checked += 1
+            self.refused += not decision["on_topic"]
+            self.decisions.append(decision)
+        logger.info(f"Topic guard {'allowed' if decision['on_topic'] else 'refused'} "
+                    f"(score {decision['score']:.3f}, nearest {decision['topic']}): {query[:80]!r}")
+        return decision
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"checked": self.checked, "refused": self.refused, "threshold": self.threshold,
+                    "centroids": len(self.labels),
+                    "refusal_rate_pct": 100.0 * self.refused / self.checked if self.checked else 0.0}
+
+    def recent_decisions(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self.decisions)[-limit:][::-1]
+
+    def save(self, path: str, kb_version: str):
+        np.savez(path, centroids=self.centroids, labels=np.array(self.labels), kb_version=np.array(kb_version))
+
+    @classmethod
+    def load(cls, path: str, kb_version: str, threshold: float = 0.2) -> Optional["TopicGuard"]:
+        """Centroids saved for this knowledge base version, or None if missing or stale"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                if str(data["kb_version"]) != kb_version:
+                    return None
+                return cls(data["centroids"], [str(label) for label in data["labels"]], threshold)
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Could not load topic centroids from {path}: {e}")
+            return None
+
+
+_shared_guards: Dict[Tuple[str, str], TopicGuard] = {}
+_shared_guards_lock = threading.Lock()
+
+
+def get_shared_topic_guard(documents: Callable[[], Iterable[Tuple[str, str]]], encode: Callable[[List[str]], np.ndarray],
+                           kb_version: str, path: str = "topic_centroids.npz", threshold: float = 0.2) -> TopicGuard:
+    """Process-wide guard per knowledge base version; centroids are saved to path and reused across restarts"""
+    key = (path, kb_version)
+    with _shared_guards_lock:
+        guard = _shared_guards.get(key)
+        if guard is None:
+            guard = TopicGuard.load(path, kb_version, threshold)
+            if guard is None:
+                guard = TopicGuard.from_documents(documents(), encode, threshold)
+                guard.save(path, kb_version)
+            _shared_guards[key] = guard
+        return guard
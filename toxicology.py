@@ -0,0 +1,226 @@
+"""
+Paracetamol poisoning lookups (Section 01 - Medical Emergencies, Paracetamol Poisoning)
+The treatment nomogram line and the 2-bag IV NAC regimen are precomputed tables;
+lookups interpolate by time since ingestion and band by weight, for one patient or many
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+import calculators
+
+SOURCE = "Section 01 - Medical Emergencies, Paracetamol Poisoning (KKH Baby Bear Book)"
+
+# Rumack-Matthew treatment line: 150 mg/L at 4 hours, halving every 4 hours, valid 4-24 hours
+NOMOGRAM_HOURS = np.arange(4.0, 24.5, 0.5)
+NOMOGRAM_LINE_MG_L = 150.0 * 0.5 ** ((NOMOGRAM_HOURS - 4.0) / 4.0)
+_NOMOGRAM_LOG = np.log(NOMOGRAM_LINE_MG_L)
+MICROMOL_L_TO_MG_L = 0.15117  # paracetamol molar mass 151.17 g/mol
+
+# 2-bag regimen: (phase, mg/kg, hours, upper weight of each volume band in kg, bag volume in mL, maximum dose)
+NAC_PHASES = [
+    {"phase": "Bag 1", "mg_per_kg": 200, "hours": 4, "band_upper_kg": [25, 80], "volumes_ml": [100, 500, 1000],
+     "max_mg": 22000},
+    {"phase": "Bag 2", "mg_per_kg": 100, "hours": 16, "band_upper_kg": [10, 50], "volumes_ml": [100, 500, 1000],
+     "max_mg": None},
+]
+
+TOXIC_MG_PER_KG, TOXIC_MG = 200, 10000
+MASSIVE_MG_PER_KG, MASSIVE_MG = 500, 30000
+# Section 01 gives charcoal as 1 g/kg with no maximum; the 50 g cap is the usual adult single
+# dose, added here so heavy adolescents are not given more, and marked as such in answers
+CHARCOAL_G_PER_KG, CHARCOAL_MAX_G = 1, 50
+
+# Printable chart of the regimen for whole-kg weights; lookups compute the same values directly
+CHART_WEIGHTS_KG = np.arange(1, 101, dtype=float)
+
+
+def treatment_line(hours) -> np.ndarray:
+    """Treatment line in mg/L at the given hours since ingestion (NaN outside 4-24 hours)
+
+    Interpolates the precomputed table in log space, which is exact for a line that halves
+    every 4 hours. Accepts a scalar or an array.
+    """
+    hours = np.asarray(hours, dtype=float)
+    line = np.exp(np.interp(hours, NOMOGRAM_HOURS, _NOMOGRAM_LOG))
+    return np.where((hours >= NOMOGRAM_HOURS[0]) & (hours <= NOMOGRAM_HOURS[-1]), line, np.nan)
+
+
+def second_bag_multiplier(level_ratio) -> np.ndarray:
+    """Bag 2 multiplier from level / treatment line: x2 at double the line, x3 at triple"""
+    ratio = np.nan_to_num(np.asarray(level_ratio, dtype=float))
+    return np.select([ratio >= 3, ratio >= 2], [3, 2], 1)
+
+
+def nac_regimen_batch(weights_kg, bag2_multiplier=1) -> Dict[str, Dict[str, np.ndarray]]:
+    """Dose, bag volume and rates of each NAC bag for an array of weights"""
+    weights = np.asarray(weights_kg, dtype=float)
+    multiplier = np.broadcast_to(np.asarray(bag2_multiplier, dtype=float), weights.shape)
+    regimen = {}
+    for phase in NAC_PHASES:
+        mg_per_kg = phase["mg_per_kg"] * (multiplier if phase["phase"] == "Bag 2" else 1)
+        # Bands are "<= upper", so a weight exactly on a boundary stays in the lower band
+        band = np.searchsorted(phase["band_upper_kg"], weights, side="left")
+        volume = np.asarray(phase["volumes_ml"], dtype=float)[band]
+        dose_mg = weights * mg_per_kg
+        if phase["max_mg"]:
+            dose_mg = np.minimum(dose_mg, phase["max_mg"])
+        regimen[phase["phase"]] = {
+            "mg_per_kg": mg_per_kg * np.ones_like(weights),
+            "dose_mg": dose_mg,
+            "volume_ml": volume,
+            "hours": np.full(weights.shape, float(phase["hours"])),
+            "mg_per_hour": dose_mg / phase["hours"],
+            "ml_per_hour": volume / phase["hours"]
+        }
+    return regimen
+
+
+def nac_regimen(weight_kg: float, bag2_multiplier: int = 1) -> List[Dict[str, Any]]:
+    """The 2-bag NAC regimen for one patient"""
+    regimen = nac_regimen_batch([weight_kg], bag2_multiplier)
+    return [dict(phase=name, **{key: float(values[0]) for key, values in phase.items()})
+            for name, phase in regimen.items()]
+
+
+def nac_chart() -> List[Dict[str, Any]]:
+    """Precomputed standard-dose regimen for 1-100 kg, for the printable chart"""
+    regimen = nac_regimen_batch(CHART_WEIGHTS_KG)
+    bag1, bag2 = regimen["Bag 1"], regimen["Bag 2"]
+    return [{"Weight (kg)": int(w),
+             "Bag 1 dose (mg)": round(bag1["dose_mg"][i]), "Bag 1 volume (mL)": int(bag1["volume_ml"][i]),
+             "Bag 1 rate (mL/hr)": round(bag1["ml_per_hour"][i], 1),
+             "Bag 2 dose (mg)": round(bag2["dose_mg"][i]), "Bag 2 volume (mL)": int(bag2["volume_ml"][i]),
+             "Bag 2 rate (mL/hr)": round(bag2["ml_per_hour"][i], 1)}
+            for i, w in enumerate(CHART_WEIGHTS_KG)]
+
+
+def assess_ingestion(weight_kg: Optional[float] = None, ingested_mg: Optional[float] = None,
+                     hours_since: Optional[float] = None, level_mg_l: Optional[float] = None) -> Dict[str, Any]:
+    """Toxic/massive thresholds, nomogram position, NAC regimen and charcoal dose from what is known"""
+    result: Dict[str, Any] = {"weight_kg": weight_kg, "ingested_mg": ingested_mg,
+                              "hours_since": hours_since, "level_mg_l": level_mg_l}
+    if weight_kg:
+        result["toxic_threshold_mg"] = min(TOXIC_MG_PER_KG * weight_kg, TOXIC_MG)
+        result["massive_threshold_mg"] = min(MASSIVE_MG_PER_KG * weight_kg, MASSIVE_MG)
+        result["charcoal_g"] = min(CHARCOAL_G_PER_KG * weight_kg, CHARCOAL_MAX_G)
+    if ingested_mg is not None and weight_kg:
+        result["ingested_mg_per_kg"] = ingested_mg / weight_kg
+        result["toxic"] = ingested_mg >= result["toxic_threshold_mg"]
+        result["massive"] = ingested_mg >= result["massive_threshold_mg"]
+
+    multiplier = 1
+    if hours_since is not None:
+        line = float(treatment_line(hours_since))
+        result["treatment_line_mg_l"] = None if np.isnan(line) else line
+        if level_mg_l is not None and result["treatment_line_mg_l"]:
+            ratio = level_mg_l / line
+            result["level_ratio"] = ratio
+            result["above_line"] = ratio >= 1
+            multiplier = int(second_bag_multiplier(ratio))
+    result["bag2_multiplier"] = multiplier
+    if weight_kg:
+        result["regimen"] = nac_regimen(weight_kg, multiplier)
+    return result
+
+
+# --- Chat ----------------------------------------------------------------------------------
+
+_PARACETAMOL_WORDS = ("paracetamol", "acetaminophen", "panadol", "tylenol")
+_POISONING_WORDS = ("overdose", "poison", "toxic", "ingest", "swallow", "nomogram", "level")
+_NAC_RE = re.compile(r"\b(?:nac|n-?acetyl-?cysteine|acetylcysteine|parvolex)\b", re.IGNORECASE)
+_LEVEL_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(mg/l|mg/dl|micromol/l|umol/l|µmol/l)", re.IGNORECASE)
+_AMOUNT_RE = re.compile(
+    r"(?:took|taken|ingested|swallowed|ate|overdose of|ingestion of)\s+(?:about\s+|~)?(\d+(?:\.\d+)?)\s*(g|grams?|mg)\b",
+    re.IGNORECASE)
+
+
+def is_poisoning_query(text: str) -> bool:
+    """Paracetamol or NAC mentioned together with poisoning, overdose or a level"""
+    lowered = text.lower()
+    drug = _NAC_RE.search(text) or any(w in lowered for w in _PARACETAMOL_WORDS)
+    return bool(drug) and any(w in lowered for w in _POISONING_WORDS)
+
+
+def _level_mg_l(text: str) -> Optional[float]:
+    match = _LEVEL_RE.search(text)
+    if not match:
+        return None
+    value, unit = float(match.group(1)), match.group(2).lower()
+    if unit.endswith("mol/l"):
+        return value * MICROMOL_L_TO_MG_L
+    # Section 01 writes the treatment-line values (150/300/450 at 4 h) as "mg/dL", so a level
+    # quoted in mg/dL is read on the same scale as mg/L rather than multiplied by 10
+    return value
+
+
+def _ingested_mg(text: str) -> Optional[float]:
+    match = _AMOUNT_RE.search(text)
+    if not match:
+        return None
+    value, unit = float(match.group(1)), match.group(2).lower()
+    return value if unit == "mg" else value * 1000
+
+
+def format_assessment(assessment: Dict[str, Any]) -> str:
+    lines = []
+    weight = assessment["weight_kg"]
+    if "toxic" in assessment:
+        status = "⚠️ **Massive ingestion**" if assessment["massive"] else \
+            "⚠️ **Toxic ingestion**" if assessment["toxic"] else "✅ Below the toxic threshold"
+        lines.append(f"• {status}: {assessment['ingested_mg'] / 1000:g} g = "
+                     f"{assessment['ingested_mg_per_kg']:.0f} mg/kg (toxic ≥200 mg/kg or 10 g, whichever is less)")
+    elif weight:
+        lines.append(f"• **Toxic dose for {weight:g} kg:** {assessment['toxic_threshold_mg'] / 1000:g} g "
+                     f"(≥200 mg/kg or 10 g, whichever is less); massive ≥{assessment['massive_threshold_mg'] / 1000:g} g")
+    else:
+        lines.append("• **Toxic ingestion:** ≥200 mg/kg or 10 g (whichever is less); massive ≥500 mg/kg or 30 g")
+
+    if assessment.get("treatment_line_mg_l"):
+        line = assessment["treatment_line_mg_l"]
+        text = f"• **Treatment line at {assessment['hours_since']:g} h:** {line:.0f} mg/L"
+        if "level_ratio" in assessment:
+            verdict = "above the line - **start IV NAC**" if assessment["above_line"] else "below the line"
+            text += f"; level {assessment['level_mg_l']:.0f} mg/L is {assessment['level_ratio']:.1f}x the line, {verdict}"
+        lines.append(text)
+        if assessment.get("level_unit") == "mg/dl":
+            lines.append("• ⚠️ Level read on the Section 01 scale (treatment line 150 at 4 h, written as mg/dL there); "
+                         "**confirm the lab's units** - a level that is truly in mg/dL is 10x higher in mg/L")
+    elif assessment["hours_since"] is not None:
+        lines.append("• Nomogram applies 4-24 h after a single acute ingestion; take the level at least 4 h post-ingestion")
+    else:
+        lines.append("• Serum paracetamol level at least 4 h post-ingestion; treat if above the treatment line "
+                     "(150 mg/L at 4 h, halving every 4 h)")
+
+    if weight:
+        for phase in assessment["regimen"]:
+            capped = " (maximum)" if phase['dose_mg'] < phase['mg_per_kg'] * weight else ""
+            lines.append(f"• **NAC {phase['phase']}:** {phase['mg_per_kg']:g} mg/kg = {phase['dose_mg']:.0f} mg{capped} "
+                         f"in {phase['volume_ml']:.0f} mL over {phase['hours']:g} h ({phase['ml_per_hour']:.1f} mL/hr)")
+        if assessment["bag2_multiplier"] > 1:
+            lines.append(f"• Bag 2 increased x{assessment['bag2_multiplier']} for a level "
+                         f"≥{assessment['bag2_multiplier']}x the line (consult pharmacists/toxicologists)")
+        lines.append(f"• **Activated charcoal:** {assessment['charcoal_g']:g} g (1 g/kg; max {CHARCOAL_MAX_G} g, "
+                     "the usual adult dose, not printed in Section 01), most useful within 2 hours of ingestion")
+    else:
+        lines.append("• **NAC 2-bag regimen:** 200 mg/kg (max 22 g) over 4 h, then 100 mg/kg over 16 h "
+                     "(total 300 mg/kg over ≈20 h)")
+        lines.append("• **Activated charcoal:** 1 g/kg, most useful within 2 hours of ingestion")
+        lines.append("Tell me the weight (e.g. *paracetamol overdose, NAC dose for 18 kg*) for exact doses and bag volumes.")
+
+    lines.append(f"\n📖 *Source: {SOURCE}. Check against your institution's NAC dilution chart.*")
+    return "\n".join(lines)
+
+
+def answer_poisoning_query(text: str) -> Optional[str]:
+    """Deterministic answer to a paracetamol poisoning / NAC question, or None if it isn't one"""
+    if not is_poisoning_query(text):
+        return None
+    entities = calculators.extract_entities(text)
+    assessment = assess_ingestion(entities.get("weight_kg"), _ingested_mg(text),
+                                  entities.get("time_hours"), _level_mg_l(text))
+    level = _LEVEL_RE.search(text)
+    assessment["level_unit"] = level.group(2).lower() if level else None
+    return format_assessment(assessment)
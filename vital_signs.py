@@ -0,0 +1,144 @@
+"""
+Age-banded vital sign reference (KKH Baby Bear Book Table 1.1; adult values for reference)
+One table, built once at import: single lookups bisect on age in months and bulk
+screening of many patients' observations is vectorised over the same limits
+"""
+
+import bisect
+import math
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+VITALS = ("HR", "RR", "SBP")
+VITAL_UNITS = {"HR": "bpm", "RR": "/min", "SBP": "mmHg"}
+
+# Ordered by age; a patient belongs to the first band whose upper_months is above their age
+VITAL_SIGN_BANDS: List[Dict[str, Any]] = [
+    {"band": "Neonate", "label": "Neonatal", "upper_months": 1,
+     "words": ("neonate", "neonatal", "newborn"),
+     "HR": (120, 180), "RR": (40, 60), "SBP": (60, 80)},
+    {"band": "Infant (1m-1yr)", "label": "Infant", "upper_months": 12,
+     "words": ("infant", "baby"),
+     "HR": (110, 160), "RR": (30, 40), "SBP": (70, 90)},
+    {"band": "Toddler (1-2yr)", "label": "Toddler", "upper_months": 24,
+     "words": ("toddler",),
+     "HR": (100, 150), "RR": (25, 35), "SBP": (80, 95)},
+    {"band": "Young child (2-7yr)", "label": "Young child", "upper_months": 84,
+     "words": ("preschool", "young child"),
+     "HR": (95, 140), "RR": (25, 30), "SBP": (90, 110)},
+    {"band": "Older child (7-12yr)", "label": "Older child", "upper_months": 144,
+     "words": ("older child", "school-age", "school age"),
+     "HR": (80, 120), "RR": (20, 25), "SBP": (100, 120)},
+    {"band": "Adult", "label": "Adult", "upper_months": math.inf,
+     "words": ("adult",),
+     "HR": (60, 100), "RR": (12, 20), "SBP": (90, 140)},
+]
+
+VITAL_SIGN_RANGES = {b["band"]: {vital: b[vital] for vital in VITALS} for b in VITAL_SIGN_BANDS}
+TEMPERATURE_RANGE = "36.5-37.5°C (axillary measurement preferred)"
+
+_BANDS_BY_NAME = {b["band"]: b for b in VITAL_SIGN_BANDS}
+_UPPER_MONTHS = [b["upper_months"] for b in VITAL_SIGN_BANDS]
+_BAND_NAMES = np.array([b["band"] for b in VITAL_SIGN_BANDS], dtype=object)
+# limits[band, vital] -> (low, high), for indexing with whole arrays of band numbers
+_LIMITS = np.array([[b[vital] for vital in VITALS] for b in VITAL_SIGN_BANDS], dtype=float)
+# "Baby Bear Book" names the guideline, not the patient's age
+_BOOK_TITLE = re.compile(r"baby\s*bear(\s*book)?")
+
+
+def band_index(age_months: float) -> int:
+    """Position of the age band in VITAL_SIGN_BANDS"""
+    return bisect.bisect_right(_UPPER_MONTHS, age_months)
+
+
+def band_for_age(age_months: float) -> str:
+    """Age band name for an age in months"""
+    return VITAL_SIGN_BANDS[band_index(age_months)]["band"]
+
+
+def band_for_text(text: str) -> Optional[str]:
+    """Age band named in free text ('toddler', 'newborn', ...), or None"""
+    lowered = _BOOK_TITLE.sub(" ", text.lower())
+    for b in VITAL_SIGN_BANDS:
+        if any(word in lowered for word in b["words"]):
+            return b["band"]
+    return None
+
+
+def check_vitals(band: str, hr: Optional[float] = None, rr: Optional[float] = None,
+                 sbp: Optional[float] = None) -> Dict[str, Any]:
+    """Compare the given vital signs with the normal range for the age band"""
+    ranges = VITAL_SIGN_RANGES[band]
+    checks = {}
+    for vital, value in zip(VITALS, (hr, rr, sbp)):
+        if value is None:
+            continue
+        low, high = ranges[vital]
+        normal = low <= value <= high
+        checks[vital] = {"value": value, "range": (low, high), "normal": normal,
+                         "status": "✅ Normal" if normal else "⚠️ Abnormal"}
+    return {"age_group": band, "ranges": ranges, "checks": checks}
+
+
+def screen_observations(observations: pd.DataFrame) -> pd.DataFrame:
+    """Flag out-of-range HR/RR/SBP for many patients at once
+
+    Needs an age_months column and any of hr, rr and sbp. Adds age_band, a <vital>_flag
+    column per vital ("low", "high" or "") and abnormal_count; rows with no usable age
+    are kept with age_band left empty.
+    """
+    columns = {str(c).strip().lower(): c for c in observations.columns}
+    if "age_months" not in columns:
+        raise ValueError("Observations need an 'age_months' column")
+    present = [vital for vital in VITALS if vital.lower() in columns]
+    if not present:
+        raise ValueError("Observations need at least one of 'hr', 'rr' or 'sbp'")
+
+    result = observations.copy()
+    ages = pd.to_numeric(observations[columns["age_months"]], errors="coerce").to_numpy(dtype=float)
+    valid_age = ages >= 0
+    bands = np.searchsorted(_UPPER_MONTHS, np.where(valid_age, ages, 0), side="right")
+    result["age_band"] = np.where(valid_age, _BAND_NAMES[bands], "")
+
+    abnormal = np.zeros(len(result), dtype=int)
+    for vital in present:
+        j = VITALS.index(vital)
+        values = pd.to_numeric(observations[columns[vital.lower()]], errors="coerce").to_numpy(dtype=float)
+        low = values < _LIMITS[bands, j, 0]
+        high = values > _LIMITS[bands, j, 1]
+        low &= valid_age
+        high &= valid_age
+        result[f"{vital.lower()}_flag"] = np.select([low, high], ["low", "high"], "")
+        abnormal += low | high
+    result["abnormal_count"] = abnormal
+    return result
+
+
+def describe_band(band: str) -> str:
+    """Bullet-point normal ranges for one age band"""
+    b = _BANDS_BY_NAME[band]
+    return f"""• {b['label']} heart rate: {b['HR'][0]}-{b['HR'][1]} beats per minute (KKH Baby Bear Book)
+• {b['label']} respiratory rate: {b['RR'][0]}-{b['RR'][1]} breaths per minute
+• {b['label']} blood pressure: {b['SBP'][0]}-{b['SBP'][1]} mmHg systolic
+• Temperature: {TEMPERATURE_RANGE}"""
+
+
+def describe_all_bands() -> str:
+    """Bullet-point normal ranges across the paediatric age bands"""
+    paediatric = [b for b in VITAL_SIGN_BANDS if b["band"] != "Adult"]
+    lines = []
+    for vital, heading in (("HR", "Heart rate (bpm)"), ("RR", "Respiratory rate (/min)"),
+                           ("SBP", "Systolic BP (mmHg)")):
+        lines.append(f"• {heading}: " + ", ".join(
+            f"{b['label'].lower()} {b[vital][0]}-{b[vital][1]}" for b in paediatric))
+    lines.append(f"• Temperature: {TEMPERATURE_RANGE}")
+    return "\n".join(lines)
+
+
+def reference_answer(text: str) -> str:
+    """Normal ranges for the age band asked about, or for every band if none is named"""
+    band = band_for_text(text)
+    return describe_band(band) if band else describe_all_bands()